@@ -0,0 +1,88 @@
+# Copyright (C) 2017 O.S. Systems Software LTDA.
+# This software is released under the MIT License
+
+"""Compare pooled sessions with one connection per call.
+
+Run with ``python -m benchmarks.connection_reuse``.
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from unittest.mock import patch
+
+import requests
+
+from hydra.oauth2 import Client, Token
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    connections = 0
+
+    def process_request(self, request, client_address):
+        self.connections += 1
+        super().process_request(request, client_address)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    body = json.dumps({'active': True}).encode()
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self.rfile.read(length)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+def run(calls, pooled):
+    server = _Server(('127.0.0.1', 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host = 'http://127.0.0.1:{}'.format(server.server_address[1])
+    token = Token(access_token='token')
+    try:
+        with Client(host, host, 'client', 'secret') as client:
+            start = time.perf_counter()
+            if pooled:
+                for _ in range(calls):
+                    client.instrospect_token(token)
+            else:
+                with patch.object(client.transport, 'session',
+                                  lambda host: requests):
+                    for _ in range(calls):
+                        client.instrospect_token(token)
+            elapsed = time.perf_counter() - start
+    finally:
+        server.shutdown()
+        server.server_close()
+    return {
+        'pooled': pooled,
+        'calls': calls,
+        'connections': server.connections,
+        'seconds': round(elapsed, 4),
+        'calls_per_second': round(calls / elapsed, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--calls', type=int, default=500)
+    args = parser.parse_args()
+    for pooled in (False, True):
+        print(json.dumps(run(args.calls, pooled)))
+
+
+if __name__ == '__main__':
+    main()
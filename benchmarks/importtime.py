@@ -0,0 +1,74 @@
+# Copyright (C) 2017 O.S. Systems Software LTDA.
+# This software is released under the MIT License
+
+"""Measure what importing the SDK costs a cold process.
+
+Each statement runs in a fresh interpreter under ``python -X importtime``
+and only the imports it triggers are counted (interpreter startup and
+``site`` are excluded). Run with ``python -m benchmarks.importtime``.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STATEMENTS = (
+    'import hydra',
+    'from hydra import Hydra',
+    "from hydra import Hydra; Hydra('http://a', 'http://b', 'c', 's')",
+    "from hydra import Hydra; Hydra('http://a', 'http://b', 'c', 's').clients",
+)
+
+
+def measure(statement, runs=5):
+    """Return the best total import time in microseconds and the modules
+    imported by statement, slowest first."""
+    best = None
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', statement],
+            cwd=ROOT, stderr=subprocess.PIPE, universal_newlines=True,
+            check=True).stderr
+        total, modules, started = 0, [], False
+        for line in output.splitlines():
+            if not line.startswith('import time:') or 'self [us]' in line:
+                continue
+            self_us, cumulative, name = line[len('import time:'):].split('|')
+            # One leading space separates the column; the rest is nesting
+            name = name[1:]
+            if not started:
+                started = name == 'site'
+                continue
+            if not name.startswith(' '):
+                total += int(cumulative)
+            modules.append((name.strip(), int(self_us)))
+        if best is None or total < best[0]:
+            best = (total, modules)
+    total, modules = best
+    modules.sort(key=lambda module: module[1], reverse=True)
+    return total, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+    results = []
+    for statement in STATEMENTS:
+        total, modules = measure(statement, args.runs)
+        results.append({
+            'statement': statement,
+            'import_ms': round(total / 1e3, 3),
+            'modules': len(modules),
+            'slowest': modules[:args.top],
+        })
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+# Copyright (C) 2017 O.S. Systems Software LTDA.
+# This software is released under the MIT License
+
+"""Measure what the bearer token middleware adds to each request.
+
+A WSGI app is called in process, bare and behind BearerTokenMiddleware
+with and without an introspection cache, while introspection goes to a
+FakeHydraServer in a child process. Run with
+``python -m benchmarks.middleware``.
+"""
+
+import argparse
+import json
+from wsgiref.util import setup_testing_defaults
+
+from hydra import Hydra
+from hydra.cache import IntrospectionCache
+from hydra.middleware import BearerTokenMiddleware
+
+from .suite import StandIn, run_load
+
+
+def app(environ, start_response):
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    return [b'ok']
+
+
+def call(wsgi, tokens):
+    def operation(index):
+        environ = {'HTTP_AUTHORIZATION': 'Bearer ' + tokens[
+            index % len(tokens)]}
+        setup_testing_defaults(environ)
+        status = []
+        b''.join(wsgi(environ, lambda s, h: status.append(s)))
+        assert status == ['200 OK'], status
+    return operation
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--tokens', type=int, default=100)
+    args = parser.parse_args()
+    tokens = ['token-{}'.format(index) for index in range(args.tokens)]
+    stand_in = StandIn(clients=0, tokens=args.tokens)
+    results = []
+    try:
+        for name, cache in (('bare', None), ('uncached', None),
+                            ('cached', IntrospectionCache())):
+            with Hydra(stand_in.url, stand_in.url, 'client', 'secret',
+                       pool_maxsize=args.concurrency,
+                       introspection_cache=cache) as hydra:
+                wsgi = app
+                if name != 'bare':
+                    wsgi = BearerTokenMiddleware(app, hydra,
+                                                 scopes=['devices'])
+                result = run_load(call(wsgi, tokens), args.requests,
+                                  args.concurrency)
+                result['mode'] = name
+                results.append(result)
+    finally:
+        stand_in.stop()
+    bare = results[0]['p50_ms']
+    for result in results:
+        result['added_p50_ms'] = round(result['p50_ms'] - bare, 3)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+# Copyright (C) 2017 O.S. Systems Software LTDA.
+# This software is released under the MIT License
+
+"""Compare the schema-driven models with the previous hand-written ones.
+
+Run with ``python -m benchmarks.models``.
+"""
+
+import argparse
+import json
+import sys
+import timeit
+from datetime import datetime
+
+from hydra.clients import Client
+from hydra.oauth2 import Token
+
+
+class LegacyClient:
+
+    def __init__(self, **kwargs):
+        self.id = kwargs.get('client_id')
+        self.owner = kwargs.get('owner')
+        self.name = kwargs.get('name') or kwargs.get('client_name')
+        self.secret = kwargs.get('secret') or kwargs.get('client_secret')
+        self.uri = kwargs.get('uri') or kwargs.get('client_uri')
+        self.policy_uri = kwargs.get('policy_uri')
+        self.client_secret_expires_at = kwargs.get('client_secret_expires_at')
+        self.tos_uri = kwargs.get('tos_uri')
+        self.logo_uri = kwargs.get('logo_uri')
+        self.contacts = kwargs.get('contacts')
+        self.redirect_uris = kwargs.get('redirect_uris')
+        self.grant_types = kwargs.get('grant_types')
+        self.response_types = kwargs.get('response_types')
+        self.scopes = kwargs.get('scope', '').split() or kwargs.get('scopes', [])  # nopep8
+        self.sector_identifier_uri = kwargs.get('sector_identifier_uri')
+        self.subject_type = kwargs.get('subject_type')
+        self.token_endpoint_auth_method = kwargs.get(
+            'token_endpoint_auth_method')
+        self.userinfo_signed_response_alg = kwargs.get(
+            'userinfo_signed_response_alg')
+
+    def as_dict(self):
+        data = {
+            'client_id': self.id,
+            'owner': self.owner,
+            'client_name': self.name,
+            'client_secret': self.secret,
+            'client_uri': self.uri,
+            'policy_uri': self.policy_uri,
+            'tos_uri': self.tos_uri,
+            'logo_uri': self.logo_uri,
+            'contacts': self.contacts,
+            'scope': ' '.join(self.scopes),
+            'redirect_uris': self.redirect_uris,
+            'grant_types': self.grant_types,
+            'response_types': self.response_types,
+            'client_secret_expires_at': self.client_secret_expires_at,
+            'sector_identifier_uri': self.sector_identifier_uri,
+            'subject_type': self.subject_type,
+            'token_endpoint_auth_method': self.token_endpoint_auth_method,
+            'userinfo_signed_response_alg': self.userinfo_signed_response_alg
+        }
+        return {k: v for k, v in data.items() if v is not None}
+
+
+class LegacyToken:
+
+    def __init__(self, **kwargs):
+        self.issue_time = datetime.now()
+        self.expires_in = kwargs.get('expires_in', 0)
+        self.scope = kwargs.get('scope')
+        self.token = kwargs.get('access_token')
+        self.type = kwargs.get('token_type')
+        self.aud = kwargs.get('aud')
+        self.client_id = kwargs.get('client_id')
+        self.exp = kwargs.get('exp')
+        self.ext = kwargs.get('exp')
+        self.iat = kwargs.get('iat')
+        self.iss = kwargs.get('iss')
+        self.nbf = kwargs.get('nbf')
+        self.obfuscated_subject = kwargs.get('obfuscated_subject')
+        self.sub = kwargs.get('sub')
+        self.username = kwargs.get('username')
+
+
+CLIENT = {
+    'client_id': 'c0ffee',
+    'client_name': 'benchmark',
+    'owner': 'ops',
+    'scope': 'openid offline devices products',
+    'redirect_uris': ['https://example.com/callback'],
+    'grant_types': ['authorization_code', 'refresh_token'],
+    'response_types': ['code'],
+    'subject_type': 'public',
+    'token_endpoint_auth_method': 'client_secret_basic',
+}
+
+TOKEN = {
+    'access_token': 'super-token',
+    'token_type': 'bearer',
+    'expires_in': 3600,
+    'scope': 'devices products',
+    'client_id': 'c0ffee',
+    'sub': 'user',
+    'iss': 'http://localhost:4444/',
+    'exp': 1700000000,
+    'iat': 1699996400,
+}
+
+
+def measure(stmt, number):
+    best = min(timeit.repeat(stmt, number=number, repeat=7))
+    return round(best / number * 1e9, 1)
+
+
+def run(number):
+    client, legacy_client = Client(**CLIENT), LegacyClient(**CLIENT)
+    payload = json.dumps([CLIENT] * 100)
+    return {
+        'client_init_ns': {
+            'schema': measure(lambda: Client(**CLIENT), number),
+            'legacy': measure(lambda: LegacyClient(**CLIENT), number),
+        },
+        'client_as_dict_ns': {
+            'schema': measure(client.as_dict, number),
+            'legacy': measure(legacy_client.as_dict, number),
+        },
+        'client_list_from_json_ns': {
+            'schema': measure(
+                lambda: Client.from_json_list(payload), number // 100),
+            'legacy': measure(
+                lambda: [LegacyClient(**data)
+                         for data in json.loads(payload)], number // 100),
+        },
+        'token_init_ns': {
+            'schema': measure(lambda: Token(**TOKEN), number),
+            'legacy': measure(lambda: LegacyToken(**TOKEN), number),
+        },
+        'token_size_bytes': {
+            'schema': sys.getsizeof(Token(**TOKEN)),
+            'legacy': sys.getsizeof(LegacyToken(**TOKEN)) + sys.getsizeof(
+                LegacyToken(**TOKEN).__dict__),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--number', type=int, default=20000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.number), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,269 @@
+# Copyright (C) 2017 O.S. Systems Software LTDA.
+# This software is released under the MIT License
+
+"""Offline benchmark suite for the SDK hot paths.
+
+A FakeHydraServer runs in a child process so that the CPU time measured
+in this process belongs to the SDK (models, JSON, HTTP client) and not
+to the stand-in server. Results are written as JSON and can be compared
+with a previous run::
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --output new.json --compare results.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import platform
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from hydra import Client, Hydra
+from hydra.fake import FakeHydra, FakeHydraServer
+from hydra.models import loads
+from hydra.oauth2 import Token
+
+
+def _serve(connection, clients, tokens, challenges):
+    fake = FakeHydra()
+    fake.add_client('client', 'secret', scope='hydra.clients')
+    for index in range(clients):
+        fake.add_client('bench-{}'.format(index), client_name='bench',
+                        scope='openid offline devices',
+                        redirect_uris=['https://example.com/callback'],
+                        grant_types=['authorization_code'])
+    for index in range(tokens):
+        fake.issue_token(token='token-{}'.format(index), scope='devices')
+    for index in range(challenges):
+        for kind in ('login', 'consent'):
+            challenge = '{}-{}'.format(kind, index)
+            fake.add_login_request(challenge, subject='user')
+            fake.add_consent_request(challenge, 'user')
+    server = FakeHydraServer(fake)
+    connection.send(server.url)
+    server.serve_forever(0.05)
+
+
+class StandIn:
+
+    def __init__(self, clients=10, tokens=0, challenges=0):
+        parent, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=_serve, args=(child, clients, tokens, challenges),
+            daemon=True)
+        self.process.start()
+        self.url = parent.recv()
+
+    def stop(self):
+        self.process.terminate()
+        self.process.join()
+
+
+def percentile(values, quantile):
+    index = min(len(values) - 1, int(round(quantile * (len(values) - 1))))
+    return values[index]
+
+
+def run_load(operation, requests, concurrency):
+    latencies = []
+
+    def timed(index):
+        started = time.perf_counter()
+        operation(index)
+        latencies.append(time.perf_counter() - started)
+
+    cpu_started = time.process_time()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(timed, range(requests)))
+    wall = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+    latencies.sort()
+    return {
+        'requests': requests,
+        'concurrency': concurrency,
+        'throughput': round(requests / wall, 1),
+        'p50_ms': round(percentile(latencies, 0.5) * 1e3, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1e3, 3),
+        'sdk_cpu_us_per_op': round(cpu / requests * 1e6, 1),
+    }
+
+
+def operations(hydra, requests):
+    token = Token(access_token='token-0')
+    return {
+        'instrospect_token': lambda i: hydra.instrospect_token(token),
+        'revoke_token': lambda i: hydra.revoke_token(
+            Token(access_token='token-{}'.format(i + 1))),
+        'accept_login_request': lambda i: hydra.accept_login_request(
+            'login-{}'.format(i), {'subject': 'user'}),
+        'reject_login_request': lambda i: hydra.reject_login_request(
+            'login-{}'.format(requests + i), {'error': 'access_denied'}),
+        'accept_consent_request': lambda i: hydra.accept_consent_request(
+            'consent-{}'.format(i), {'grant_scope': ['devices']}),
+        'reject_consent_request': lambda i: hydra.reject_consent_request(
+            'consent-{}'.format(requests + i), {'error': 'access_denied'}),
+        'clients.create': lambda i: hydra.clients.create(
+            Client(client_id='new-{}'.format(i), name='new')),
+        'clients.get': lambda i: hydra.clients.get('new-{}'.format(i)),
+        'clients.update': lambda i: hydra.clients.update(
+            Client(client_id='new-{}'.format(i), name='updated')),
+        'clients.delete': lambda i: hydra.clients.delete('new-{}'.format(i)),
+    }
+
+
+def bench_operations(requests, levels):
+    results = []
+    for concurrency in levels:
+        # Fresh state per level: revocations and challenges are consumed
+        stand_in = StandIn(tokens=requests + 1, challenges=requests * 2)
+        try:
+            with Hydra(stand_in.url, stand_in.url, 'client', 'secret',
+                       pool_maxsize=max(levels)) as hydra:
+                for name, operation in operations(hydra, requests).items():
+                    result = run_load(operation, requests, concurrency)
+                    result['operation'] = name
+                    results.append(result)
+        finally:
+            stand_in.stop()
+    return results
+
+
+PAGE_SIZE = 500
+
+
+def list_page(hydra, limit):
+    response = hydra.request(
+        'GET', '/clients', params={'limit': limit, 'offset': 0})
+    return [Client(**data) for data in response.json()]
+
+
+def bench_listing(sizes, levels, requests):
+    # Under load each request fetches one explicit page, labelled with
+    # the number of clients it actually carries; walking the whole fleet
+    # is measured once per size
+    results = []
+    for size in sizes:
+        stand_in = StandIn(clients=size)
+        try:
+            with Hydra(stand_in.url, stand_in.url, 'client', 'secret',
+                       pool_maxsize=max(levels)) as hydra:
+                returned = len(list_page(hydra, PAGE_SIZE))
+                for concurrency in levels:
+                    result = run_load(
+                        lambda i: list_page(hydra, PAGE_SIZE),
+                        requests, concurrency)
+                    result.update(operation='clients.page', clients=size,
+                                  returned=returned)
+                    results.append(result)
+                listed = []
+                result = run_load(
+                    lambda i: listed.append(sum(
+                        1 for _ in hydra.clients.iter_all(
+                            page_size=PAGE_SIZE))),
+                    1, 1)
+                result.update(operation='clients.iter_all', clients=size,
+                              returned=listed[0])
+                results.append(result)
+                results.append(bench_listing_cpu(hydra, size))
+        finally:
+            stand_in.stop()
+    return results
+
+
+def bench_listing_cpu(hydra, size):
+    # Split one full listing into I/O, JSON decoding and model work
+    pages = []
+    started = time.perf_counter()
+    offset = 0
+    while True:
+        response = hydra.request(
+            'GET', '/clients',
+            params={'limit': PAGE_SIZE, 'offset': offset})
+        pages.append(response.content)
+        offset += PAGE_SIZE
+        if offset >= size + 1:
+            break
+    io = time.perf_counter() - started
+
+    started = time.process_time()
+    decoded = [loads(page) for page in pages]
+    json_decode = time.process_time() - started
+
+    started = time.process_time()
+    clients = [Client(**data) for page in decoded for data in page]
+    model_build = time.process_time() - started
+
+    started = time.process_time()
+    for client in clients:
+        client.as_dict()
+    as_dict = time.process_time() - started
+    return {
+        'operation': 'clients.listing_breakdown',
+        'clients': size,
+        'io_ms': round(io * 1e3, 3),
+        'json_decode_ms': round(json_decode * 1e3, 3),
+        'model_build_ms': round(model_build * 1e3, 3),
+        'as_dict_ms': round(as_dict * 1e3, 3),
+    }
+
+
+def key(result):
+    return (result['operation'], result.get('concurrency'),
+            result.get('clients'))
+
+
+def compare(results, baseline):
+    previous = {key(result): result for result in baseline['results']}
+    for result in results['results']:
+        old = previous.get(key(result))
+        if old is None:
+            continue
+        for metric in ('throughput', 'p50_ms', 'p99_ms',
+                       'sdk_cpu_us_per_op', 'json_decode_ms',
+                       'model_build_ms', 'as_dict_ms'):
+            if metric in result and old.get(metric):
+                change = (result[metric] - old[metric]) / old[metric] * 100
+                print('{:<28} {:>6} {:>6} {:<18} {:>10} -> {:>10} '
+                      '({:+.1f}%)'.format(
+                          result['operation'],
+                          str(result.get('concurrency', '')),
+                          str(result.get('clients', '')), metric,
+                          old[metric], result[metric], change))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', default='1,8,32')
+    parser.add_argument('--clients', default='10,50000')
+    parser.add_argument('--output', default='-')
+    parser.add_argument('--compare')
+    args = parser.parse_args()
+    levels = [int(level) for level in args.concurrency.split(',')]
+    sizes = [int(size) for size in args.clients.split(',')]
+
+    results = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.time(),
+        'results': (bench_operations(args.requests, levels) +
+                    bench_listing(sizes, levels, args.requests)),
+    }
+    if args.output == '-':
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2)
+    if args.compare:
+        with open(args.compare) as baseline:
+            compare(results, json.load(baseline))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,28 @@
 # Copyright (C) 2017 O.S. Systems Software LTDA.
 # This software is released under the MIT License
 
-from .clients import Client
-from .hydra import Hydra
+import importlib
+
+__all__ = ['AsyncHydra', 'Client', 'Hydra']
+
+# Public names load their modules on first access, so that importing the
+# package stays cheap for short-lived processes
+_exports = {
+    'AsyncHydra': '.aio',
+    'Client': '.clients',
+    'Hydra': '.hydra',
+}
+
+
+def __getattr__(name):
+    module = _exports.get(name)
+    if module is None:
+        raise AttributeError(
+            'module {!r} has no attribute {!r}'.format(__name__, name))
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
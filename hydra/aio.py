@@ -0,0 +1,270 @@
+# Copyright (C) 2017 O.S. Systems Software LTDA.
+# This software is released under the MIT License
+
+import asyncio
+from urllib.parse import urljoin
+
+from .base import HydraManager
+from .cache import TokenStore
+from .clients import Client
+from .exceptions import HydraRequestError
+from .oauth2 import Token
+
+
+def _ok(response):
+    return not response.is_error
+
+
+class AsyncClient:
+
+    def __init__(self, publichost, adminhost, client, secret,
+                 max_connections=100, max_keepalive_connections=20,
+                 keepalive_expiry=5.0, transport=None,
+                 introspection_cache=None, token_refresh_margin=30):
+        self.publichost = publichost
+        self.adminhost = adminhost
+        self.client = client
+        self.secret = secret
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.transport = transport
+        self.introspection_cache = introspection_cache
+        self.token_refresh_margin = token_refresh_margin
+        self._http = None
+        self._errors = ()
+        self._tokens = TokenStore()
+        self._revocations = 0
+        self._token_fetches = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        http, self._http = self._http, None
+        if http is not None:
+            await http.aclose()
+
+    def _session(self):
+        if self._http is None:
+            try:
+                import httpx
+            except ImportError:  # pragma: no cover
+                raise ImportError(
+                    'AsyncHydra requires httpx: pip install hydra-sdk[async]')
+            limits = httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry)
+            self._http = httpx.AsyncClient(
+                limits=limits, transport=self.transport)
+            self._errors = (httpx.TransportError,)
+        return self._http
+
+    async def request(self, method, path, token=False, **kwargs):
+        host = self.publichost if token else self.adminhost
+        send = self._basic_request if token else self._admin_request
+        url = urljoin(host, path)
+        try:
+            return await send(method, url, **kwargs)
+        except self._errors as error:
+            # Same contract as the sync client: transport failures are
+            # HydraRequestErrors
+            raise HydraRequestError(
+                '{} {} failed: {}'.format(method, url, error)) from error
+
+    async def _admin_request(self, method, url, **kwargs):
+        return await self._session().request(method, url, **kwargs)
+
+    async def _basic_request(self, method, url, scope=None, **kwargs):
+        kwargs['auth'] = (self.client, self.secret)
+        return await self._session().request(method, url, **kwargs)
+
+    async def get_access_token(self, scopes=None):
+        if isinstance(scopes, str):
+            scopes = scopes.split()
+        key = frozenset(scopes or ())
+        token = self._tokens.get(key)
+        if token is not None and not token.is_expired():
+            if (token.needs_refresh(self.token_refresh_margin) and
+                    key not in self._token_fetches):
+                self._start_token_fetch(key)
+            return token
+        fetch = self._token_fetches.get(key) or self._start_token_fetch(key)
+        return await asyncio.shield(fetch)
+
+    def _start_token_fetch(self, key):
+        fetch = asyncio.ensure_future(self._fetch_access_token(key))
+        self._token_fetches[key] = fetch
+
+        def done(fetch):
+            del self._token_fetches[key]
+            if not fetch.cancelled():
+                fetch.exception()  # background refreshes fail quietly
+
+        fetch.add_done_callback(done)
+        return fetch
+
+    async def _fetch_access_token(self, scopes):
+        data = {'grant_type': 'client_credentials'}
+        if scopes:
+            data['scope'] = ' '.join(sorted(scopes))
+        response = await self.request(
+            'POST', '/oauth2/token', token=True, data=data)
+        if _ok(response):
+            token = Token(**response.json())
+            self._tokens[scopes] = token
+            return token
+
+    async def instrospect_token(self, token):
+        return await self.lookup_token(token.token)
+
+    async def lookup_token(self, token):
+        """Introspect a raw access token string, answering from the
+        introspection cache when it holds it."""
+        cache = self.introspection_cache
+        if cache is not None:
+            result = cache.get(token)
+            if result is not None:
+                return result
+        revocations = self._revocations
+        response = await self.request(
+            'POST', '/oauth2/introspect', data={'token': token})
+        if _ok(response):
+            result = response.json()
+            # Not cached when a token was revoked while this was in flight
+            if cache is not None and revocations == self._revocations:
+                cache.set(token, result)
+            return result
+
+    async def revoke_token(self, token):
+        response = await self.request(
+            'POST', '/oauth2/revoke', token=True, data={'token': token.token})
+        self._revocations += 1
+        if self.introspection_cache is not None:
+            self.introspection_cache.pop(token.token)
+        return _ok(response)
+
+    async def get_login_request(self, challenge):
+        response = await self.request(
+            'GET', '/oauth2/auth/requests/login',
+            params={'login_challenge': challenge})
+        if _ok(response):
+            return response.json()
+
+    async def get_consent_request(self, challenge):
+        response = await self.request(
+            'GET', '/oauth2/auth/requests/consent',
+            params={'consent_challenge': challenge})
+        if _ok(response):
+            return response.json()
+
+    async def accept_login_request(self, challenge, accept_login_config):
+        response = await self.request(
+            'PUT', '/oauth2/auth/requests/login/accept',
+            params={'login_challenge': challenge},
+            json=accept_login_config)
+        if _ok(response):
+            return response.json()
+
+    async def accept_consent_request(self, challenge, accept_consent_config):
+        response = await self.request(
+            'PUT', '/oauth2/auth/requests/consent/accept',
+            params={'consent_challenge': challenge},
+            json=accept_consent_config)
+        if _ok(response):
+            return response.json()
+
+    async def reject_login_request(self, challenge, reject_login_config):
+        response = await self.request(
+            'PUT', '/oauth2/auth/requests/login/reject',
+            params={'login_challenge': challenge},
+            json=reject_login_config)
+        if _ok(response):
+            return response.json()
+
+    async def reject_consent_request(self, challenge, reject_consent_config):
+        response = await self.request(
+            'PUT', '/oauth2/auth/requests/consent/reject',
+            params={'consent_challenge': challenge},
+            json=reject_consent_config)
+        if _ok(response):
+            return response.json()
+
+    async def revokes_all_previous_consent_session_user(self, user):
+        response = await self.request(
+            'DELETE', '/oauth2/auth/sessions/consent',
+            params={'subject': user})
+        return _ok(response)
+
+    async def revokes_consent_sessions_oAuth2_client(self, user, client):
+        response = await self.request(
+            'DELETE', '/oauth2/auth/sessions/consent',
+            params={'subject': user, 'client': client})
+        return _ok(response)
+
+    async def lists_all_consent_sessions_user(self, user):
+        response = await self.request(
+            'GET', '/oauth2/auth/sessions/consent', params={'subject': user})
+        if _ok(response):
+            return response.json()
+
+    async def logs_user_out_deleting_session_cookie(self):
+        response = await self.request(
+            'GET', '/oauth2/auth/sessions/login/revoke')
+        if _ok(response):
+            return response.json()
+
+    async def invalidates_users_authentication_session(self, user):
+        response = await self.request(
+            'DELETE', '/oauth2/auth/sessions/login', params={'subject': user})
+        if _ok(response):
+            return response
+
+    async def flush_expired_oAuth2_access_tokens(self, not_after):
+        response = await self.request(
+            'POST', '/oauth2/flush', json=not_after)
+        if _ok(response):
+            return response
+
+
+class AsyncClientManager(HydraManager):
+
+    async def create(self, client):
+        response = await self.hydra.request(
+            'POST', '/clients', json=client.as_dict())
+        if _ok(response):
+            return Client(**response.json())
+
+    async def get(self, client_id):
+        path = '/clients/{}'.format(client_id)
+        response = await self.hydra.request('GET', path)
+        if _ok(response):
+            return Client(**response.json())
+
+    async def update(self, client):
+        path = '/clients/{}'.format(client.id)
+        response = await self.hydra.request(
+            'PUT', path, json=client.as_dict())
+        if _ok(response):
+            return Client(**response.json())
+
+    async def delete(self, client_id):
+        path = '/clients/{}'.format(client_id)
+        response = await self.hydra.request('DELETE', path)
+        return _ok(response)
+
+    async def all(self):
+        response = await self.hydra.request('GET', '/clients')
+        if _ok(response):
+            return [Client(**data) for data in response.json()]
+
+
+class AsyncHydra(AsyncClient):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.clients = AsyncClientManager(self)
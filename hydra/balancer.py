@@ -0,0 +1,110 @@
+# Copyright (C) 2017 O.S. Systems Software LTDA.
+# This software is released under the MIT License
+
+import random
+import threading
+import time
+
+
+class Node:
+
+    def __init__(self, url):
+        self.url = url
+        self.outstanding = 0
+        self.failures = 0
+        self.ejections = 0
+        self.ejected_until = None
+        self.probing = False
+
+    @property
+    def healthy(self):
+        return self.ejected_until is None
+
+
+class LoadBalancer:
+    """Spread requests over several Hydra replicas of the same plane.
+
+    Nodes are picked with the power of two choices (two random nodes,
+    the one with fewer outstanding requests wins) or by the least
+    outstanding requests overall. A node is ejected after
+    ``failure_threshold`` consecutive failures; once its ejection time
+    has passed a single probe request is let through, and the ejection
+    time doubles (up to ``max_ejection_time``) every time a probe fails.
+    """
+
+    P2C = 'p2c'
+    LEAST_OUTSTANDING = 'least-outstanding'
+
+    def __init__(self, hosts, strategy=P2C, failure_threshold=3,
+                 ejection_time=10, max_ejection_time=300):
+        if not hosts:
+            raise ValueError('At least one host is required')
+        if strategy not in (self.P2C, self.LEAST_OUTSTANDING):
+            raise ValueError('Unknown strategy: {}'.format(strategy))
+        self.nodes = [Node(host) for host in hosts]
+        self.strategy = strategy
+        self.failure_threshold = failure_threshold
+        self.ejection_time = ejection_time
+        self.max_ejection_time = max_ejection_time
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            node = self._probe() or self._pick()
+            node.outstanding += 1
+            return node
+
+    def release(self, node, ok=None):
+        # ok=None releases a node that was picked but never sent to
+        with self._lock:
+            node.outstanding -= 1
+            if ok is None:
+                if node.probing:
+                    node.probing = False
+                return
+            if ok:
+                node.failures = 0
+                node.ejections = 0
+                node.ejected_until = None
+                node.probing = False
+                return
+            node.failures += 1
+            if node.probing or (node.healthy and
+                                node.failures >= self.failure_threshold):
+                self._eject(node)
+
+    def _probe(self):
+        now = time.monotonic()
+        for node in self.nodes:
+            if (not node.healthy and not node.probing and
+                    node.ejected_until <= now):
+                node.probing = True
+                return node
+        return None
+
+    def _pick(self):
+        nodes = [node for node in self.nodes if node.healthy]
+        if not nodes:
+            # Every replica is ejected: failing open beats failing everything
+            nodes = self.nodes
+        if len(nodes) == 1:
+            return nodes[0]
+        if self.strategy == self.P2C:
+            nodes = random.sample(nodes, 2)
+        return min(nodes, key=lambda node: node.outstanding)
+
+    def _eject(self, node):
+        delay = min(self.max_ejection_time,
+                    self.ejection_time * 2 ** node.ejections)
+        node.ejections += 1
+        node.ejected_until = time.monotonic() + delay
+        node.probing = False
+
+    def stats(self):
+        with self._lock:
+            return [{
+                'url': node.url,
+                'healthy': node.healthy,
+                'outstanding': node.outstanding,
+                'failures': node.failures,
+            } for node in self.nodes]
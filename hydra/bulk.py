@@ -0,0 +1,141 @@
+# Copyright (C) 2017 O.S. Systems Software LTDA.
+# This software is released under the MIT License
+
+import json
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .exceptions import HydraResponseError
+
+BulkResult = namedtuple('BulkResult', ['item', 'ok', 'value', 'error'])
+
+Progress = namedtuple(
+    'Progress', ['completed', 'failed', 'total', 'elapsed', 'rate'])
+
+
+def _call(fn, item):
+    try:
+        value = fn(item)
+    except Exception as error:
+        return BulkResult(item, False, None, error)
+    if value is None or value is False:
+        error = HydraResponseError(
+            'Hydra rejected {} for {!r}'.format(fn.__name__, item))
+        return BulkResult(item, False, None, error)
+    return BulkResult(item, True, value, None)
+
+
+def iter_many(fn, items, max_workers=8, progress=None):
+    """Yield (index, BulkResult) pairs as calls complete.
+
+    Items are pulled lazily so at most twice max_workers calls are queued
+    at any time, whatever the size of the iterable.
+    """
+    total = len(items) if hasattr(items, '__len__') else None
+    items = enumerate(items)
+    started = time.monotonic()
+    completed = failed = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {}
+
+        def fill():
+            while len(pending) < max_workers * 2:
+                try:
+                    index, item = next(items)
+                except StopIteration:
+                    return
+                pending[executor.submit(_call, fn, item)] = index
+
+        fill()
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                index = pending.pop(future)
+                result = future.result()
+                completed += 1
+                failed += not result.ok
+                if progress is not None:
+                    elapsed = time.monotonic() - started
+                    rate = completed / elapsed if elapsed else 0.0
+                    progress(Progress(completed, failed, total, elapsed, rate))
+                yield index, result
+            fill()
+
+
+def run_many(fn, items, max_workers=8, progress=None):
+    results = dict(iter_many(fn, items, max_workers, progress))
+    return [results[index] for index in range(len(results))]
+
+
+def _key(item):
+    # Subject/client pairs come back from JSON as lists
+    return tuple(item) if isinstance(item, list) else item
+
+
+class BulkReport:
+    """Outcome of a bulk run that can be saved and resumed.
+
+    Items that succeeded are remembered so that running the same input
+    again with this report skips them, and failed ones keep their error
+    message until a later run gets them through.
+    """
+
+    def __init__(self, succeeded=(), failed=None):
+        self.succeeded = set(_key(item) for item in succeeded)
+        self.failed = {_key(item): error
+                       for item, error in (failed or {}).items()}
+
+    def __len__(self):
+        return len(self.succeeded) + len(self.failed)
+
+    @property
+    def ok(self):
+        return not self.failed
+
+    def failed_items(self):
+        return list(self.failed)
+
+    def record(self, result):
+        item = _key(result.item)
+        if result.ok:
+            self.succeeded.add(item)
+            self.failed.pop(item, None)
+        else:
+            self.failed[item] = str(result.error)
+
+    def save(self, path):
+        data = {
+            'succeeded': list(self.succeeded),
+            'failed': [[item, error] for item, error in self.failed.items()],
+        }
+        # Write then rename so an interrupted save never loses the report
+        with open(path + '.tmp', 'w') as fp:
+            json.dump(data, fp)
+        os.replace(path + '.tmp', path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as fp:
+            data = json.load(fp)
+        return cls(data['succeeded'], {
+            _key(item): error for item, error in data['failed']})
+
+
+def run_report(fn, items, max_workers=8, progress=None, report=None,
+               checkpoint=None):
+    """Run fn over items, recording the outcome in a BulkReport.
+
+    Items already in report.succeeded are skipped. With a checkpoint
+    path the report is saved when the run ends, even if interrupted.
+    """
+    report = report if report is not None else BulkReport()
+    items = (item for item in items if _key(item) not in report.succeeded)
+    try:
+        for _, result in iter_many(fn, items, max_workers, progress):
+            report.record(result)
+    finally:
+        if checkpoint is not None:
+            report.save(checkpoint)
+    return report
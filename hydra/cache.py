@@ -0,0 +1,170 @@
+# Copyright (C) 2017 O.S. Systems Software LTDA.
+# This software is released under the MIT License
+
+import hashlib
+import heapq
+import itertools
+import threading
+import time
+from collections import OrderedDict
+
+
+def token_key(token):
+    # Raw bearer tokens never stay in memory or on disk as cache keys
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def introspection_ttl(result, ttl, negative_ttl):
+    if not result.get('active'):
+        return negative_ttl
+    if result.get('exp'):
+        return min(ttl, result['exp'] - time.time())
+    return ttl
+
+
+class TTLCache:
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            deadline, value = item
+            if deadline <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            self.pop(key)
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key):
+        with self._lock:
+            found = self._data.pop(key, None) is not None
+            if found:
+                self.invalidations += 1
+            return found
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations,
+        }
+
+
+class IntrospectionCache(TTLCache):
+
+    def __init__(self, maxsize=10000, ttl=60, negative_ttl=5):
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self.negative_ttl = negative_ttl
+
+    key = staticmethod(token_key)
+
+    def get(self, token):
+        return super().get(self.key(token))
+
+    def set(self, token, result, ttl=None):
+        if ttl is None:
+            ttl = introspection_ttl(result, self.ttl, self.negative_ttl)
+        super().set(self.key(token), result, ttl)
+
+    def pop(self, token):
+        return super().pop(self.key(token))
+
+
+class TokenStore:
+    """Tokens keyed by any hashable, dropped once their deadline passes.
+
+    Expiry is indexed by a heap of monotonic deadlines, so removing
+    expired tokens costs O(log n) each and never scans the store.
+    Replaced tokens leave stale heap entries behind; they are skipped
+    when popped and compacted away if they pile up.
+    """
+
+    def __init__(self):
+        self._tokens = {}
+        self._heap = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._tokens)
+
+    def __contains__(self, key):
+        return key in self._tokens
+
+    def __getitem__(self, key):
+        return self._tokens[key]
+
+    def __setitem__(self, key, token):
+        self.set(key, token)
+
+    def get(self, key, default=None):
+        return self._tokens.get(key, default)
+
+    def set(self, key, token):
+        with self._lock:
+            self._tokens[key] = token
+            heapq.heappush(
+                self._heap, (token.deadline, next(self._counter), key, token))
+            self._purge(time.monotonic())
+            if len(self._heap) > 2 * len(self._tokens) + 64:
+                self._heap = [entry for entry in self._heap
+                              if self._tokens.get(entry[2]) is entry[3]]
+                heapq.heapify(self._heap)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._tokens.pop(key, default)
+
+    def purge(self):
+        """Drop expired tokens and return how many were removed."""
+        with self._lock:
+            return self._purge(time.monotonic())
+
+    def _purge(self, now):
+        removed = 0
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            _, _, key, token = heapq.heappop(heap)
+            if self._tokens.get(key) is token:
+                del self._tokens[key]
+                removed += 1
+        return removed
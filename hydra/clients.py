@@ -1,85 +1,286 @@
 # Copyright (C) 2017 O.S. Systems Software LTDA.
 # This software is released under the MIT License
 
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlsplit
+
 from .base import HydraManager
+from .bulk import run_many
+from .exceptions import HydraResponseError
+from .models import Model, field
+from .streaming import iter_response_array
+
+
+class Client(Model):
+
+    fields = (
+        field('id', 'client_id'),
+        field('owner'),
+        field('name', 'client_name', aliases=['name']),
+        field('secret', 'client_secret', aliases=['secret']),
+        field('uri', 'client_uri', aliases=['uri']),
+        field('policy_uri'),
+        field('tos_uri'),
+        field('logo_uri'),
+        field('contacts'),
+        field('scopes', 'scope', aliases=['scope', 'scopes'], default=[],
+              load=str.split, dump=' '.join),
+        field('redirect_uris'),
+        field('grant_types'),
+        field('response_types'),
+        field('client_secret_expires_at'),
+        field('sector_identifier_uri'),
+        field('subject_type'),
+        field('token_endpoint_auth_method'),
+        field('userinfo_signed_response_alg'),
+    )
+
+
+def _normalize(client):
+    # Hydra never returns secrets, and list ordering carries no meaning
+    data = client.as_dict()
+    data.pop('client_secret', None)
+    if 'scope' in data:
+        data['scope'] = ' '.join(sorted(data['scope'].split()))
+    return {
+        key: sorted(value) if isinstance(value, list) else value
+        for key, value in data.items() if value not in ('', [])
+    }
+
 
+# Fields Hydra fills in when a client leaves them unset
+SERVER_DEFAULTED = frozenset([
+    'scope', 'grant_types', 'response_types', 'subject_type',
+    'token_endpoint_auth_method', 'userinfo_signed_response_alg',
+    'client_secret_expires_at',
+])
 
-class Client:
-
-    def __init__(self, **kwargs):
-        self.id = kwargs.get('client_id')
-        self.owner = kwargs.get('owner')
-        self.name = kwargs.get('name') or kwargs.get('client_name')
-        self.secret = kwargs.get('secret') or kwargs.get('client_secret')
-        self.uri = kwargs.get('uri') or kwargs.get('client_uri')
-        self.policy_uri = kwargs.get('policy_uri')
-        self.client_secret_expires_at = kwargs.get('client_secret_expires_at')
-        self.tos_uri = kwargs.get('tos_uri')
-        self.logo_uri = kwargs.get('logo_uri')
-        self.contacts = kwargs.get('contacts')
-        self.redirect_uris = kwargs.get('redirect_uris')
-        self.grant_types = kwargs.get('grant_types')
-        self.response_types = kwargs.get('response_types')
-        self.scopes = kwargs.get('scope', '').split() or kwargs.get('scopes', [])  # nopep8
-        self.sector_identifier_uri = kwargs.get('sector_identifier_uri')
-        self.subject_type = kwargs.get('subject_type')
-        self.token_endpoint_auth_method = kwargs.get(
-            'token_endpoint_auth_method')
-        self.userinfo_signed_response_alg = kwargs.get(
-            'userinfo_signed_response_alg')
-
-    def as_dict(self):
-        data = {
-            'client_id': self.id,
-            'owner': self.owner,
-            'client_name': self.name,
-            'client_secret': self.secret,
-            'client_uri': self.uri,
-            'policy_uri': self.policy_uri,
-            'tos_uri': self.tos_uri,
-            'logo_uri': self.logo_uri,
-            'contacts': self.contacts,
-            'scope': ' '.join(self.scopes),
-            'redirect_uris': self.redirect_uris,
-            'grant_types': self.grant_types,
-            'response_types': self.response_types,
-            'client_secret_expires_at': self.client_secret_expires_at,
-            'sector_identifier_uri': self.sector_identifier_uri,
-            'subject_type': self.subject_type,
-            'token_endpoint_auth_method': self.token_endpoint_auth_method,
-            'userinfo_signed_response_alg': self.userinfo_signed_response_alg
-        }
-        return {k: v for k, v in data.items() if v is not None}
+
+def _differs(desired, current):
+    # Every field is compared, so clearing one is an update, except
+    # server-defaulted fields the desired client leaves unset
+    keys = set(desired) | (set(current) - SERVER_DEFAULTED)
+    return any(current.get(key) != desired.get(key) for key in keys)
+
+
+class SyncPlan(namedtuple('SyncPlan', ['create', 'update', 'delete',
+                                       'unchanged'])):
+
+    def __str__(self):
+        lines = ['+ {}'.format(client.id) for client in self.create]
+        lines += ['~ {}'.format(client.id) for client in self.update]
+        lines += ['- {}'.format(client_id) for client_id in self.delete]
+        return '\n'.join(lines)
+
+
+SyncResult = namedtuple('SyncResult', ['plan', 'created', 'updated',
+                                       'deleted'])
 
 
 class ClientManager(HydraManager):
 
     # SCOPE = 'hydra.clients'
 
+    def __init__(self, hydra, cache=None):
+        super().__init__(hydra)
+        # Raw client data keyed by id; a fresh Client is built per get so
+        # callers can modify what they receive
+        self.cache = cache
+        # Bumped by every write, so a read that raced one is not cached
+        # over the newer data
+        self._generation = 0
+        self._cache_lock = threading.Lock()
+
     def create(self, client):
         response = self.hydra.request(
             'POST', '/clients', json=client.as_dict())
         if response.ok:
-            return Client(**response.json())
+            return self._cached(response.json())
 
     def get(self, client_id):
+        if self.cache is not None:
+            data = self.cache.get(client_id)
+            if data is not None:
+                return Client(**data)
+        generation = self._generation
         path = '/clients/{}'.format(client_id)
         response = self.hydra.request('GET', path)
         if response.ok:
-            return Client(**response.json())
+            return self._cached(response.json(), generation)
 
     def update(self, client):
         path = '/clients/{}'.format(client.id)
         response = self.hydra.request(
             'PUT', path, json=client.as_dict())
         if response.ok:
-            return Client(**response.json())
+            return self._cached(response.json())
+        self._invalidate(client.id)
 
     def delete(self, client_id):
         path = '/clients/{}'.format(client_id)
-        self.hydra.request('DELETE', path)
+        response = self.hydra.request('DELETE', path)
+        self._invalidate(client_id)
+        return response.ok
 
-    def all(self):
+    def _cached(self, data, generation=None):
+        # Without a generation the data comes from a write and always
+        # replaces the entry; reads pass the generation they started at
+        if self.cache is not None and data.get('client_id'):
+            # Hydra only returns the secret on create; get never does
+            self._store(data['client_id'], {
+                key: value for key, value in data.items()
+                if key != 'client_secret'}, generation)
+        return Client(**data)
+
+    def _store(self, client_id, data, generation):
+        with self._cache_lock:
+            if generation is None:
+                self._generation += 1
+            elif generation != self._generation:
+                return False
+            self.cache.set(client_id, data)
+            return True
+
+    def _invalidate(self, client_id):
+        if self.cache is not None:
+            with self._cache_lock:
+                self._generation += 1
+                self.cache.pop(client_id)
+
+    def warm(self, page_size=500):
+        """Preload the cache with every client; returns how many were
+        cached. Clients listed after a concurrent write are skipped."""
+        if self.cache is None:
+            raise ValueError('warm() needs a client cache; create Hydra '
+                             'with client_cache=...')
+        generation = self._generation
+        count = 0
+        for client in self.iter_all(page_size=page_size):
+            if self._store(client.id, client.as_dict(), generation):
+                count += 1
+        return count
+
+    def all(self, stream=False):
+        """List clients; with stream=True return a generator of clients
+        decoded incrementally from each page's response body."""
+        if stream:
+            return self.iter_all(stream=True)
         response = self.hydra.request('GET', '/clients')
         if response.ok:
             return [Client(**data) for data in response.json()]
+
+    def create_many(self, clients, max_workers=8, progress=None):
+        return run_many(self.create, clients, max_workers, progress)
+
+    def update_many(self, clients, max_workers=8, progress=None):
+        return run_many(self.update, clients, max_workers, progress)
+
+    def delete_many(self, client_ids, max_workers=8, progress=None):
+        return run_many(self.delete, client_ids, max_workers, progress)
+
+    def iter_all(self, page_size=100, prefetch=False, stream=False):
+        """Iterate over every client, one page at a time. With
+        stream=True each page is decoded as it arrives; prefetch=True
+        fetches the next page while the current one is consumed."""
+        page = ('/clients', {'limit': page_size, 'offset': 0})
+        if stream:
+            if prefetch:
+                raise ValueError('prefetch and stream cannot be combined')
+            while page is not None:
+                page = yield from self._stream_page(*page)
+            return
+        if not prefetch:
+            while page is not None:
+                data, page = self._fetch_page(*page)
+                for item in data:
+                    yield Client(**item)
+            return
+        executor = ThreadPoolExecutor(max_workers=1)
+        try:
+            future = executor.submit(self._fetch_page, *page)
+            while future is not None:
+                data, page = future.result()
+                future = None
+                if page is not None:
+                    future = executor.submit(self._fetch_page, *page)
+                for item in data:
+                    yield Client(**item)
+        finally:
+            executor.shutdown(wait=False)
+
+    def _request_page(self, path, params, **kwargs):
+        response = self.hydra.request('GET', path, params=params, **kwargs)
+        if not response.ok:
+            if kwargs.get('stream'):
+                response.close()
+            # Ending quietly would pass off the pages so far as the
+            # whole fleet
+            raise HydraResponseError(
+                'Listing clients at offset {} failed'.format(
+                    params.get('offset')), response)
+        return response
+
+    def _fetch_page(self, path, params):
+        response = self._request_page(path, params)
+        data = response.json()
+        return data, self._next_page(response, path, params, len(data))
+
+    def _stream_page(self, path, params):
+        # Yields the page's clients and returns the next page
+        response = self._request_page(path, params, stream=True)
+        count = 0
+        for item in iter_response_array(response):
+            count += 1
+            yield Client(**item)
+        return self._next_page(response, path, params, count)
+
+    def _next_page(self, response, path, params, count):
+        if not count:
+            return None
+        if response.links:
+            # Hydra advertises pages through the Link header when it can
+            link = response.links.get('next')
+            if link is None:
+                return None
+            url = urlsplit(link['url'])
+            return url.path, dict(parse_qsl(url.query))
+        if count < int(params['limit']):
+            return None
+        return path, dict(params, offset=int(params['offset']) + count)
+
+    def plan_sync(self, desired_clients, delete=False, page_size=500):
+        existing = {client.id: _normalize(client)
+                    for client in self.iter_all(page_size=page_size)}
+        create, update, unchanged = [], [], []
+        desired_ids = set()
+        for client in desired_clients:
+            if not client.id:
+                raise ValueError('Clients to sync must have an id')
+            if client.id in desired_ids:
+                raise ValueError(
+                    'Client {} is listed more than once'.format(client.id))
+            desired_ids.add(client.id)
+            current = existing.get(client.id)
+            if current is None:
+                create.append(client)
+            elif _differs(_normalize(client), current):
+                update.append(client)
+            else:
+                unchanged.append(client)
+        to_delete = []
+        if delete:
+            to_delete = sorted(set(existing) - desired_ids)
+        return SyncPlan(create, update, to_delete, unchanged)
+
+    def sync(self, desired_clients, delete=False, dry_run=False,
+             max_workers=8, progress=None):
+        plan = self.plan_sync(desired_clients, delete=delete)
+        if dry_run:
+            return SyncResult(plan, [], [], [])
+        return SyncResult(
+            plan,
+            run_many(self.create, plan.create, max_workers, progress),
+            run_many(self.update, plan.update, max_workers, progress),
+            run_many(self.delete, plan.delete, max_workers, progress))
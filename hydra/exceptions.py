@@ -3,8 +3,23 @@
 
 
 class HydraResponseError(Exception):
-    pass
+
+    def __init__(self, message, response=None):
+        super().__init__(message)
+        self.response = response
 
 
 class HydraRequestError(Exception):
     pass
+
+
+class CircuitOpenError(HydraRequestError):
+    pass
+
+
+class DeadlineExceededError(HydraRequestError):
+    pass
+
+
+class LimitExceededError(HydraRequestError):
+    pass
@@ -0,0 +1,372 @@
+# Copyright (C) 2017 O.S. Systems Software LTDA.
+# This software is released under the MIT License
+
+import json
+import re
+import threading
+import time
+import uuid
+from base64 import b64decode
+from collections import defaultdict
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from .transports import Response, Transport, basic_auth, encode_body
+
+
+def _json(status, data, headers=None):
+    headers = dict(headers or {})
+    headers['Content-Type'] = 'application/json'
+    return status, headers, json.dumps(data).encode()
+
+
+def _error(status, error):
+    return _json(status, {'error': error, 'status_code': status})
+
+
+def _empty():
+    return 204, {}, b''
+
+
+class FakeHydra:
+    """In-memory stand-in for the Hydra endpoints used by the SDK.
+
+    It covers clients, the client credentials token endpoint,
+    introspection, revocation, login/consent requests and sessions, and
+    token flushing, with enough fidelity for offline tests and
+    benchmarks.
+    """
+
+    def __init__(self, publichost='http://localhost:4444'):
+        self.publichost = publichost
+        self.clients = {}
+        self.tokens = {}
+        self.login_requests = {}
+        self.consent_requests = {}
+        self.consent_sessions = defaultdict(list)
+        self.login_sessions = set()
+        self.flushes = []
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._routes = [
+            ('GET', r'/clients', self._list_clients),
+            ('POST', r'/clients', self._create_client),
+            ('GET', r'/clients/(?P<id>[^/]+)', self._get_client),
+            ('PUT', r'/clients/(?P<id>[^/]+)', self._update_client),
+            ('DELETE', r'/clients/(?P<id>[^/]+)', self._delete_client),
+            ('POST', r'/oauth2/token', self._token),
+            ('POST', r'/oauth2/introspect', self._introspect),
+            ('POST', r'/oauth2/revoke', self._revoke),
+            ('POST', r'/oauth2/flush', self._flush),
+            ('GET', r'/oauth2/auth/requests/(?P<kind>login|consent)',
+             self._get_flow_request),
+            ('PUT', r'/oauth2/auth/requests/(?P<kind>login|consent)/'
+             r'(?P<action>accept|reject)', self._finish_flow_request),
+            ('GET', r'/oauth2/auth/sessions/consent',
+             self._list_consent_sessions),
+            ('DELETE', r'/oauth2/auth/sessions/consent',
+             self._revoke_consent_sessions),
+            ('DELETE', r'/oauth2/auth/sessions/login',
+             self._revoke_login_sessions),
+            ('GET', r'/\.well-known/jwks\.json', self._jwks),
+        ]
+        self._routes = [(method, re.compile(pattern + '$'), handler)
+                        for method, pattern, handler in self._routes]
+
+    def add_client(self, client_id=None, client_secret=None, **fields):
+        data = dict(fields, client_id=client_id or str(uuid.uuid4()))
+        if client_secret is not None:
+            data['client_secret'] = client_secret
+        self.clients[data['client_id']] = data
+        return data
+
+    def issue_token(self, client_id='client', scope='', expires_in=3600,
+                    subject=None, token=None, **claims):
+        token = token or uuid.uuid4().hex
+        now = int(time.time())
+        self.tokens[token] = dict(
+            claims, active=True, client_id=client_id, scope=scope,
+            sub=subject or client_id, iat=now, exp=now + expires_in,
+            iss=self.publichost.rstrip('/') + '/',
+            token_type='access_token')
+        return token
+
+    def add_login_request(self, challenge, subject='', skip=False,
+                          client_id='client', **fields):
+        self.login_requests[challenge] = dict(
+            fields, challenge=challenge, subject=subject, skip=skip,
+            client={'client_id': client_id})
+
+    def add_consent_request(self, challenge, subject, skip=False,
+                            client_id='client', requested_scope=(),
+                            **fields):
+        self.consent_requests[challenge] = dict(
+            fields, challenge=challenge, subject=subject, skip=skip,
+            client={'client_id': client_id},
+            requested_scope=list(requested_scope))
+
+    def handle(self, method, path, query, body, headers):
+        self.calls += 1
+        for route_method, pattern, handler in self._routes:
+            match = pattern.match(path)
+            if route_method == method and match:
+                request = _Request(query, body, headers, match.groupdict())
+                with self._lock:
+                    return handler(request)
+        return _error(404, 'not_found')
+
+    def _authenticate(self, request):
+        header = request.headers.get('Authorization', '')
+        if not header.startswith('Basic '):
+            return None
+        client_id, _, secret = b64decode(
+            header[6:]).decode().partition(':')
+        client = self.clients.get(client_id)
+        if client is None or client.get('client_secret') != secret:
+            return None
+        return client
+
+    def _list_clients(self, request):
+        clients = list(self.clients.values())
+        limit = int(request.query.get('limit', 100))
+        offset = int(request.query.get('offset', 0))
+        page = [_public(client) for client in clients[offset:offset + limit]]
+        links = ['</clients?{}>; rel="first"'.format(
+            urlencode({'limit': limit, 'offset': 0}))]
+        if offset + limit < len(clients):
+            links.append('</clients?{}>; rel="next"'.format(
+                urlencode({'limit': limit, 'offset': offset + limit})))
+        return _json(200, page, {'Link': ', '.join(links)})
+
+    def _create_client(self, request):
+        data = request.json()
+        if data.get('client_id') in self.clients:
+            return _error(409, 'resource_conflict')
+        data.setdefault('client_secret', uuid.uuid4().hex)
+        client = self.add_client(**data)
+        return _json(201, client)
+
+    def _get_client(self, request):
+        client = self.clients.get(request.args['id'])
+        if client is None:
+            return _error(404, 'not_found')
+        return _json(200, _public(client))
+
+    def _update_client(self, request):
+        client_id = request.args['id']
+        if client_id not in self.clients:
+            return _error(404, 'not_found')
+        data = dict(request.json(), client_id=client_id)
+        if 'client_secret' not in data:
+            data['client_secret'] = self.clients[client_id].get(
+                'client_secret')
+        self.clients[client_id] = data
+        return _json(200, data)
+
+    def _delete_client(self, request):
+        if self.clients.pop(request.args['id'], None) is None:
+            return _error(404, 'not_found')
+        return _empty()
+
+    def _token(self, request):
+        client = self._authenticate(request)
+        if client is None:
+            return _error(401, 'invalid_client')
+        form = request.form()
+        if form.get('grant_type') != 'client_credentials':
+            return _error(400, 'unsupported_grant_type')
+        scope = form.get('scope', '')
+        allowed = set(client.get('scope', '').split())
+        if not set(scope.split()) <= allowed:
+            return _error(400, 'invalid_scope')
+        token = self.issue_token(client['client_id'], scope)
+        return _json(200, {
+            'access_token': token,
+            'token_type': 'bearer',
+            'expires_in': 3600,
+            'scope': scope,
+        })
+
+    def _introspect(self, request):
+        data = self.tokens.get(request.form().get('token'))
+        if data is None or data['exp'] <= time.time():
+            return _json(200, {'active': False})
+        return _json(200, data)
+
+    def _revoke(self, request):
+        if self._authenticate(request) is None:
+            return _error(401, 'invalid_client')
+        self.tokens.pop(request.form().get('token'), None)
+        return _empty()
+
+    def _flush(self, request):
+        not_after = request.json().get('notAfter')
+        limit = time.time()
+        if not_after:
+            limit = datetime.strptime(
+                not_after[:19], '%Y-%m-%dT%H:%M:%S').replace(
+                    tzinfo=timezone.utc).timestamp()
+        self.flushes.append(not_after)
+        for token, data in list(self.tokens.items()):
+            if data['exp'] < min(limit, time.time()):
+                del self.tokens[token]
+        return _empty()
+
+    def _flow_requests(self, kind):
+        if kind == 'login':
+            return self.login_requests
+        return self.consent_requests
+
+    def _get_flow_request(self, request):
+        kind = request.args['kind']
+        challenge = request.query.get('{}_challenge'.format(kind))
+        data = self._flow_requests(kind).get(challenge)
+        if data is None:
+            return _error(404, 'not_found')
+        return _json(200, data)
+
+    def _finish_flow_request(self, request):
+        kind, action = request.args['kind'], request.args['action']
+        challenge = request.query.get('{}_challenge'.format(kind))
+        data = self._flow_requests(kind).pop(challenge, None)
+        if data is None:
+            return _error(404, 'not_found')
+        body = request.json()
+        if action == 'accept':
+            if kind == 'login':
+                self.login_sessions.add(body.get('subject'))
+            else:
+                self.consent_sessions[data['subject']].append({
+                    'consent_request': data,
+                    'grant_scope': body.get('grant_scope', []),
+                    'remember': body.get('remember', False),
+                })
+        query = {'{}_verifier'.format(kind): uuid.uuid4().hex}
+        if action == 'reject':
+            query['error'] = body.get('error', 'access_denied')
+        redirect = '{}/oauth2/auth?{}'.format(
+            self.publichost.rstrip('/'), urlencode(query))
+        return _json(200, {'redirect_to': redirect})
+
+    def _list_consent_sessions(self, request):
+        return _json(
+            200, self.consent_sessions.get(request.query.get('subject'), []))
+
+    def _revoke_consent_sessions(self, request):
+        subject = request.query.get('subject')
+        client = request.query.get('client')
+        if client is None:
+            self.consent_sessions.pop(subject, None)
+        else:
+            self.consent_sessions[subject] = [
+                session for session in self.consent_sessions[subject]
+                if _client_id(session) != client]
+        return _empty()
+
+    def _revoke_login_sessions(self, request):
+        self.login_sessions.discard(request.query.get('subject'))
+        return _empty()
+
+    def _jwks(self, request):
+        return _json(200, {'keys': []})
+
+
+def _client_id(session):
+    return session['consent_request']['client']['client_id']
+
+
+def _public(client):
+    return {key: value for key, value in client.items()
+            if key != 'client_secret'}
+
+
+class _Request:
+
+    def __init__(self, query, body, headers, args):
+        self.query = query
+        self.body = body
+        self.headers = headers
+        self.args = args
+
+    def json(self):
+        return json.loads(self.body or b'{}')
+
+    def form(self):
+        return dict(parse_qsl((self.body or b'').decode()))
+
+
+class FakeTransport(Transport):
+
+    def __init__(self, hydra=None):
+        self.hydra = hydra or FakeHydra()
+
+    def request(self, method, url, params=None, data=None, json=None,
+                auth=None, headers=None, timeout=None, stream=False):
+        parts = urlsplit(url)
+        query = dict(parse_qsl(parts.query))
+        for key, value in (params or {}).items():
+            query[key] = str(value)
+        body, headers = encode_body(data, json, headers)
+        if auth is not None:
+            headers['Authorization'] = basic_auth(auth)
+        status, headers, content = self.hydra.handle(
+            method, parts.path, query, body, headers)
+        return Response(status, headers, content, url=url)
+
+
+class FakeHydraServer(ThreadingMixIn, HTTPServer):
+    """Serve a FakeHydra over HTTP on a background thread."""
+
+    daemon_threads = True
+
+    def __init__(self, hydra=None, address=('127.0.0.1', 0)):
+        self.hydra = hydra or FakeHydra()
+        super().__init__(address, _Handler)
+        self._thread = None
+
+    @property
+    def url(self):
+        return 'http://{}:{}'.format(*self.server_address[:2])
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self.serve_forever, args=(0.05,), daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def _dispatch(self):
+        parts = urlsplit(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        status, headers, content = self.server.hydra.handle(
+            self.command, parts.path, dict(parse_qsl(parts.query)), body,
+            dict(self.headers))
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _dispatch
+
+    def log_message(self, *args):
+        pass
@@ -0,0 +1,194 @@
+# Copyright (C) 2017 O.S. Systems Software LTDA.
+# This software is released under the MIT License
+
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from .exceptions import HydraResponseError
+
+FlowResult = namedtuple(
+    'FlowResult', ['redirect_to', 'request', 'accepted', 'skipped',
+                   'timings'])
+
+
+class _Timer:
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.timings = {}
+
+    def run(self, step, fn, *args):
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self.timings[step] = time.perf_counter() - started
+
+    def result(self, *fields):
+        self.timings['total'] = time.perf_counter() - self.started
+        return FlowResult(*fields, timings=self.timings)
+
+
+def _required(value, step, challenge):
+    if value is None:
+        raise HydraResponseError('{} failed for challenge {}'.format(
+            step, challenge))
+    return value
+
+
+class LoginConsentFlow:
+    """Drive Hydra's login and consent requests with few round trips.
+
+    When Hydra reports ``skip`` the user was already authenticated (or
+    already consented), so the accept call is sent right away without
+    calling back into the application. Otherwise fetching the request
+    from Hydra runs concurrently with the application's own work.
+    Every result carries per-step timings in seconds.
+
+    At most ``max_prefetched`` consent prefetches are kept, each for
+    ``prefetch_ttl`` seconds, so flows the browser abandons do not pile
+    up in a long-running server.
+    """
+
+    def __init__(self, hydra, max_workers=8, max_prefetched=256,
+                 prefetch_ttl=30):
+        self.hydra = hydra
+        self.max_prefetched = max_prefetched
+        self.prefetch_ttl = prefetch_ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        # challenge -> (started, future), oldest first
+        self._prefetched = OrderedDict()
+        self._prefetched_lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+    def login(self, challenge, authenticate, remember=False,
+              remember_for=0, concurrent=True):
+        """Finish a login request.
+
+        ``authenticate()`` checks the credentials the user submitted and
+        returns the subject, or None to reject the login. With
+        ``concurrent`` it runs while the login request is being fetched,
+        which saves a round trip when credentials come with the request;
+        its result is discarded when Hydra says the login can be
+        skipped.
+        """
+        timer = _Timer()
+        future = self._executor.submit(
+            timer.run, 'get_login_request', self.hydra.get_login_request,
+            challenge)
+        subject = None
+        if concurrent:
+            subject = timer.run('authenticate', authenticate)
+        request = _required(future.result(), 'get_login_request', challenge)
+        if request.get('skip'):
+            response = timer.run(
+                'accept_login_request', self.hydra.accept_login_request,
+                challenge, {'subject': request['subject']})
+            return timer.result(
+                _required(response, 'accept_login_request',
+                          challenge)['redirect_to'], request, True, True)
+        if not concurrent:
+            subject = timer.run('authenticate', authenticate)
+        if subject is None:
+            response = timer.run(
+                'reject_login_request', self.hydra.reject_login_request,
+                challenge, {'error': 'access_denied',
+                            'error_description': 'Invalid credentials'})
+            return timer.result(
+                _required(response, 'reject_login_request',
+                          challenge)['redirect_to'], request, False, False)
+        response = timer.run(
+            'accept_login_request', self.hydra.accept_login_request,
+            challenge, {'subject': subject, 'remember': remember,
+                        'remember_for': remember_for})
+        return timer.result(
+            _required(response, 'accept_login_request',
+                      challenge)['redirect_to'], request, True, False)
+
+    def prefetch_consent(self, challenge):
+        """Start fetching a consent request in the background.
+
+        Hydra only reveals the consent challenge when the browser
+        follows the login redirect, so call this as soon as the consent
+        endpoint receives it, before any other per-request work.
+        """
+        now = time.monotonic()
+        with self._prefetched_lock:
+            self._expire_prefetched(now)
+            if challenge in self._prefetched:
+                return
+            while len(self._prefetched) >= self.max_prefetched:
+                self._prefetched.popitem(last=False)
+            self._prefetched[challenge] = (now, self._executor.submit(
+                self._timed_get_consent, challenge))
+
+    def _expire_prefetched(self, now):
+        while self._prefetched:
+            started, _ = next(iter(self._prefetched.values()))
+            if now - started < self.prefetch_ttl:
+                break
+            self._prefetched.popitem(last=False)
+
+    def _take_prefetched(self, challenge):
+        with self._prefetched_lock:
+            self._expire_prefetched(time.monotonic())
+            entry = self._prefetched.pop(challenge, None)
+        return entry[1] if entry is not None else None
+
+    def _timed_get_consent(self, challenge):
+        started = time.perf_counter()
+        request = self.hydra.get_consent_request(challenge)
+        return request, time.perf_counter() - started
+
+    def consent(self, challenge, grant, session=None, remember=False,
+                remember_for=0):
+        """Finish a consent request.
+
+        ``grant(request)`` returns the scopes to grant, or None to
+        reject; it is skipped when Hydra already has the user's consent
+        and every requested scope is granted again. ``session``, when
+        given, is called concurrently with the fetch and its result is
+        sent as the session (id token and access token claims).
+        """
+        timer = _Timer()
+        future = self._take_prefetched(challenge)
+        if future is None:
+            future = self._executor.submit(self._timed_get_consent, challenge)
+        claims = None
+        if session is not None:
+            claims = timer.run('session', session)
+        request, elapsed = future.result()
+        timer.timings['get_consent_request'] = elapsed
+        request = _required(request, 'get_consent_request', challenge)
+        skipped = bool(request.get('skip'))
+        scopes = request.get('requested_scope', [])
+        if not skipped:
+            scopes = timer.run('grant', grant, request)
+        if scopes is None:
+            response = timer.run(
+                'reject_consent_request', self.hydra.reject_consent_request,
+                challenge, {'error': 'access_denied',
+                            'error_description': 'Consent was denied'})
+            return timer.result(
+                _required(response, 'reject_consent_request',
+                          challenge)['redirect_to'], request, False, False)
+        config = {'grant_scope': list(scopes), 'remember': remember,
+                  'remember_for': remember_for}
+        if claims is not None:
+            config['session'] = claims
+        response = timer.run(
+            'accept_consent_request', self.hydra.accept_consent_request,
+            challenge, config)
+        return timer.result(
+            _required(response, 'accept_consent_request',
+                      challenge)['redirect_to'], request, True, skipped)
@@ -0,0 +1,116 @@
+# Copyright (C) 2017 O.S. Systems Software LTDA.
+# This software is released under the MIT License
+
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from .exceptions import HydraResponseError
+
+logger = logging.getLogger(__name__)
+
+
+def rfc3339(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime(
+        '%Y-%m-%dT%H:%M:%SZ')
+
+
+class FlushScheduler:
+    """Flush expired access tokens a time window at a time.
+
+    Instead of one flush that deletes every expired token at once, the
+    ``notAfter`` cursor walks forward from ``since`` in windows. The
+    window doubles while flushes finish well under ``target_duration``
+    and halves when they take longer, and the scheduler pauses for
+    ``pause`` times the last flush duration between windows. Progress is
+    kept in ``state_path`` so an interrupted run resumes where it
+    stopped.
+    """
+
+    def __init__(self, client, since=None, window=3600, min_window=60,
+                 max_window=7 * 86400, target_duration=1.0, pause=1.0,
+                 state_path=None):
+        self.client = client
+        self.window = window
+        self.min_window = min_window
+        self.max_window = max_window
+        self.target_duration = target_duration
+        self.pause = pause
+        self.state_path = state_path
+        self.cursor = since.timestamp() if since is not None else None
+        if state_path is not None and os.path.exists(state_path):
+            self._load()
+        if self.cursor is None:
+            raise ValueError('A start time (since) or saved state is '
+                             'required')
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _load(self):
+        with open(self.state_path) as fp:
+            state = json.load(fp)
+        self.cursor = state['cursor']
+        self.window = state['window']
+
+    def _save(self):
+        if self.state_path is None:
+            return
+        with open(self.state_path + '.tmp', 'w') as fp:
+            json.dump({'cursor': self.cursor, 'window': self.window}, fp)
+        os.replace(self.state_path + '.tmp', self.state_path)
+
+    @property
+    def caught_up(self):
+        # Windows shorter than min_window are left for the next round
+        return time.time() - self.cursor < self.min_window
+
+    def step(self):
+        """Flush one window and return how long the flush took."""
+        not_after = min(self.cursor + self.window, time.time())
+        started = time.monotonic()
+        response = self.client.flush_expired_oAuth2_access_tokens(
+            {'notAfter': rfc3339(not_after)})
+        duration = time.monotonic() - started
+        if response is None:
+            raise HydraResponseError(
+                'Flush up to {} failed'.format(rfc3339(not_after)))
+        self.cursor = not_after
+        if duration < self.target_duration / 2:
+            self.window = min(self.max_window, self.window * 2)
+        elif duration > self.target_duration:
+            self.window = max(self.min_window, self.window / 2)
+        self._save()
+        return duration
+
+    def run(self):
+        """Flush window by window until the cursor reaches now."""
+        while not self.caught_up and not self._stop.is_set():
+            duration = self.step()
+            if not self.caught_up:
+                self._stop.wait(duration * self.pause)
+
+    def start(self, interval=3600):
+        """Run in a background thread, catching up every interval."""
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._loop, args=(interval,), daemon=True)
+        self._thread.start()
+        return self
+
+    def _loop(self, interval):
+        while not self._stop.is_set():
+            try:
+                self.run()
+            except Exception:
+                # Keep the schedule alive; the next round retries the window
+                logger.exception('Flushing expired tokens failed')
+            self._stop.wait(interval)
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
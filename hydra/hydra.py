@@ -1,13 +1,20 @@
 # Copyright (C) 2017 O.S. Systems Software LTDA.
 # This software is released under the MIT License
 
-from datetime import datetime, timedelta
 from . import oauth2
-from .clients import ClientManager
 
 
 class Hydra(oauth2.Client):
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, client_cache=None, **kwargs):
         super().__init__(*args, **kwargs)
-        self.clients = ClientManager(self)
+        self.client_cache = client_cache
+        self._clients = None
+
+    @property
+    def clients(self):
+        # Managers are built on first use to keep construction cheap
+        if self._clients is None:
+            from .clients import ClientManager
+            self._clients = ClientManager(self, cache=self.client_cache)
+        return self._clients
@@ -0,0 +1,171 @@
+# Copyright (C) 2017 O.S. Systems Software LTDA.
+# This software is released under the MIT License
+
+import bisect
+import logging
+import threading
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0)
+
+
+def endpoint_name(method, path):
+    # Client ids are the only variable path segment in Hydra's API
+    if path.startswith('/clients/'):
+        path = '/clients/{id}'
+    return '{} {}'.format(method, path)
+
+
+class RequestEvent:
+
+    __slots__ = ('endpoint', 'method', 'url', 'start_time', 'duration',
+                 'timings', 'status', 'bytes_sent', 'bytes_received',
+                 'retries', 'error')
+
+    def __init__(self, endpoint, method, url, start_time):
+        self.endpoint = endpoint
+        self.method = method
+        self.url = url
+        self.start_time = start_time
+        self.duration = None
+        self.timings = {}
+        self.status = None
+        self.bytes_sent = None
+        self.bytes_received = None
+        self.retries = 0
+        self.error = None
+
+
+class Hook:
+
+    def on_request(self, event):
+        raise NotImplementedError
+
+
+def dispatch(hooks, event):
+    for hook in hooks:
+        try:
+            hook.on_request(event)
+        except Exception:
+            logger.exception('Instrumentation hook %r failed', hook)
+
+
+class _Series:
+
+    def __init__(self, buckets):
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.errors = 0
+        self.statuses = defaultdict(int)
+
+
+class InMemoryHistogram(Hook):
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def on_request(self, event):
+        with self._lock:
+            series = self._series.get(event.endpoint)
+            if series is None:
+                series = self._series[event.endpoint] = _Series(self.buckets)
+            series.counts[bisect.bisect_left(
+                self.buckets, event.duration)] += 1
+            series.sum += event.duration
+            series.count += 1
+            if event.error is not None:
+                series.errors += 1
+            else:
+                series.statuses[event.status] += 1
+
+    def endpoints(self):
+        return sorted(self._series)
+
+    def count(self, endpoint):
+        series = self._series.get(endpoint)
+        return series.count if series else 0
+
+    def percentile(self, endpoint, quantile):
+        # Upper bound of the bucket holding the quantile; inf past the last
+        series = self._series.get(endpoint)
+        if not series or not series.count:
+            return None
+        rank = quantile * series.count
+        seen = 0
+        for bound, count in zip(self.buckets + (float('inf'),),
+                                series.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+
+    def prometheus(self, name='hydra_sdk_request_duration_seconds'):
+        lines = [
+            '# HELP {} Duration of Hydra requests by endpoint.'.format(name),
+            '# TYPE {} histogram'.format(name),
+        ]
+        with self._lock:
+            for endpoint in sorted(self._series):
+                series = self._series[endpoint]
+                label = 'endpoint="{}"'.format(endpoint)
+                cumulative = 0
+                for bound, count in zip(self.buckets, series.counts):
+                    cumulative += count
+                    lines.append('{}_bucket{{{},le="{}"}} {}'.format(
+                        name, label, bound, cumulative))
+                lines.append('{}_bucket{{{},le="+Inf"}} {}'.format(
+                    name, label, series.count))
+                lines.append('{}_sum{{{}}} {}'.format(name, label, series.sum))
+                lines.append('{}_count{{{}}} {}'.format(
+                    name, label, series.count))
+            lines.append('# TYPE hydra_sdk_responses_total counter')
+            for endpoint in sorted(self._series):
+                series = self._series[endpoint]
+                for status, count in sorted(series.statuses.items()):
+                    lines.append(
+                        'hydra_sdk_responses_total{{endpoint="{}",'
+                        'status="{}"}} {}'.format(endpoint, status, count))
+                if series.errors:
+                    lines.append(
+                        'hydra_sdk_responses_total{{endpoint="{}",'
+                        'status="error"}} {}'.format(endpoint, series.errors))
+        return '\n'.join(lines) + '\n'
+
+
+class OpenTelemetryHook(Hook):
+
+    def __init__(self, tracer=None):
+        if tracer is None:
+            try:
+                from opentelemetry import trace
+            except ImportError:  # pragma: no cover
+                raise ImportError('OpenTelemetryHook requires '
+                                  'opentelemetry-api')
+            tracer = trace.get_tracer('hydra')
+        self.tracer = tracer
+
+    def on_request(self, event):
+        start = int(event.start_time * 1e9)
+        span = self.tracer.start_span(
+            'hydra {}'.format(event.endpoint), start_time=start,
+            attributes={
+                'http.method': event.method,
+                'http.url': event.url,
+                'hydra.endpoint': event.endpoint,
+                'hydra.retries': event.retries,
+            })
+        if event.status is not None:
+            span.set_attribute('http.status_code', event.status)
+        if event.bytes_received is not None:
+            span.set_attribute('http.response_content_length',
+                               event.bytes_received)
+        for phase, seconds in event.timings.items():
+            span.set_attribute('hydra.timing.{}'.format(phase), seconds)
+        if event.error is not None:
+            span.record_exception(event.error)
+        span.end(end_time=start + int(event.duration * 1e9))
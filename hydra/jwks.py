@@ -0,0 +1,112 @@
+# Copyright (C) 2017 O.S. Systems Software LTDA.
+# This software is released under the MIT License
+
+import time
+from urllib.parse import urljoin
+
+from .singleflight import SingleFlight
+
+
+def _import_jwt():
+    try:
+        import jwt
+    except ImportError:  # pragma: no cover
+        raise ImportError(
+            'JWT validation requires PyJWT: pip install hydra-sdk[jwt]')
+    return jwt
+
+
+class JWKSCache:
+
+    def __init__(self, client, path='/.well-known/jwks.json',
+                 refresh_interval=300, min_refetch_interval=30):
+        self.client = client
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self.min_refetch_interval = min_refetch_interval
+        self._keys = {}
+        self._fetched_at = None
+        self._flight = SingleFlight()
+
+    def get_key(self, kid):
+        fetched_at = self._fetched_at
+        if fetched_at is None:
+            # Nothing to validate with yet, so the first callers wait
+            self._refresh_since(fetched_at)
+            return self._keys.get(kid)
+        age = time.monotonic() - fetched_at
+        key = self._keys.get(kid)
+        if key is not None:
+            if age >= self.refresh_interval:
+                # Keep validating with the current keys while they reload
+                self._flight.do_in_background(
+                    self.path, self._fetch_since, fetched_at)
+            return key
+        if age >= self.min_refetch_interval:
+            # Unknown kids usually mean the keys were rotated
+            self._refresh_since(fetched_at)
+            key = self._keys.get(kid)
+        return key
+
+    def refresh(self):
+        self._flight.do(self.path, self._fetch)
+
+    def _refresh_since(self, fetched_at):
+        # Concurrent callers share one fetch, and a caller that arrives
+        # after a newer fetch finished does not start another one
+        self._flight.do(self.path, self._fetch_since, fetched_at)
+
+    def _fetch_since(self, fetched_at):
+        if self._fetched_at == fetched_at:
+            self._fetch()
+
+    def _fetch(self):
+        jwt = _import_jwt()
+        fetched_at = time.monotonic()
+        response = self.client.request('GET', self.path, token=True)
+        if not response.ok:
+            # Keep serving the previous keys until the next attempt
+            self._fetched_at = fetched_at
+            return
+        keys = {}
+        for data in response.json().get('keys', []):
+            if data.get('use', 'sig') != 'sig':
+                continue
+            try:
+                key = jwt.PyJWK(data)
+            except jwt.PyJWTError:
+                continue
+            keys[key.key_id] = key
+        self._keys = keys
+        self._fetched_at = fetched_at
+
+
+class JWTValidator:
+
+    def __init__(self, client, issuer=None, audience=None, leeway=0,
+                 jwks=None):
+        self.client = client
+        self.issuer = issuer or urljoin(client.publichost, '/')
+        self.audience = audience
+        self.leeway = leeway
+        self.jwks = jwks or JWKSCache(client)
+
+    def validate(self, token):
+        jwt = _import_jwt()
+        try:
+            header = jwt.get_unverified_header(token.token)
+            key = self.jwks.get_key(header.get('kid'))
+            if key is None or header.get('alg') != key.algorithm_name:
+                return {'active': False}
+            claims = jwt.decode(
+                token.token, key.key, algorithms=[key.algorithm_name],
+                audience=self.audience, issuer=self.issuer,
+                leeway=self.leeway,
+                options={'require': ['exp'],
+                         'verify_aud': self.audience is not None})
+        except jwt.PyJWTError:
+            return {'active': False}
+        result = dict(claims, active=True, token_type='access_token')
+        if 'scope' not in result and 'scp' in claims:
+            result['scope'] = ' '.join(claims['scp'])
+        return result
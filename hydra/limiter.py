@@ -0,0 +1,142 @@
+# Copyright (C) 2017 O.S. Systems Software LTDA.
+# This software is released under the MIT License
+
+import threading
+import time
+from collections import defaultdict
+
+from .exceptions import LimitExceededError
+
+
+def endpoint_class(path):
+    if path.startswith('/oauth2/introspect'):
+        return 'introspection'
+    if path.startswith(('/oauth2/token', '/oauth2/revoke')):
+        return 'token'
+    if path.startswith('/oauth2/auth/'):
+        return 'consent'
+    return 'admin'
+
+
+class TokenBucket:
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or rate
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, timeout):
+        """Take a token, returning how long to wait before using it.
+
+        Returns None without taking anything when the wait would exceed
+        ``timeout``.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = max(0.0, (1 - self._tokens) / self.rate)
+            if wait > timeout:
+                return None
+            self._tokens -= 1
+            return wait
+
+
+class AIMDLimit:
+    """Concurrency limit adjusted from observed latency.
+
+    The limit grows by about one per round trip while calls succeed
+    under ``latency_threshold`` and the limit is actually in use, and is
+    cut by ``backoff`` when a call fails or is slower than the threshold.
+    """
+
+    def __init__(self, initial=20, minimum=1, maximum=200,
+                 latency_threshold=1.0, backoff=0.9):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_threshold = latency_threshold
+        self.backoff = backoff
+
+    def update(self, inflight, latency, ok):
+        if not ok or latency > self.latency_threshold:
+            self.limit = max(self.minimum, self.limit * self.backoff)
+        elif inflight * 2 >= self.limit:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+
+class Limiter:
+    """Client-side admission control for calls to Hydra.
+
+    Each call takes a token from its endpoint class bucket (when
+    ``rates`` configures one) and a slot under the adaptive concurrency
+    limit. Callers queue for at most ``max_wait`` seconds, or the
+    remaining deadline, and then get a LimitExceededError instead of
+    piling more load on an overloaded Hydra.
+    """
+
+    def __init__(self, rates=None, concurrency=None, max_wait=1.0):
+        self.buckets = {name: TokenBucket(*rate)
+                        for name, rate in (rates or {}).items()}
+        self.concurrency = concurrency or AIMDLimit()
+        self.max_wait = max_wait
+        self.inflight = 0
+        self.queued = defaultdict(int)
+        self.rejected = defaultdict(int)
+        self._condition = threading.Condition()
+
+    def acquire(self, path, timeout=None):
+        name = endpoint_class(path)
+        timeout = self.max_wait if timeout is None else min(
+            self.max_wait, timeout)
+        deadline = time.monotonic() + timeout
+        bucket = self.buckets.get(name)
+        if bucket is not None:
+            wait = bucket.reserve(timeout)
+            if wait is None:
+                return self._reject(name)
+            if wait:
+                self._count(self.queued, name)
+                time.sleep(wait)
+        with self._condition:
+            if self.inflight >= int(self.concurrency.limit):
+                self.queued[name] += 1
+                while self.inflight >= int(self.concurrency.limit):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.rejected[name] += 1
+                        raise LimitExceededError(
+                            'Concurrency limit reached for {} calls'.format(
+                                name))
+                    self._condition.wait(remaining)
+            self.inflight += 1
+        return time.monotonic()
+
+    def release(self, permit, ok=None):
+        latency = time.monotonic() - permit
+        with self._condition:
+            if ok is not None:
+                self.concurrency.update(self.inflight, latency, ok)
+            self.inflight -= 1
+            self._condition.notify()
+
+    def _count(self, counter, name):
+        with self._condition:
+            counter[name] += 1
+
+    def _reject(self, name):
+        self._count(self.rejected, name)
+        raise LimitExceededError('Rate limit reached for {} calls'.format(
+            name))
+
+    def stats(self):
+        with self._condition:
+            return {
+                'limit': int(self.concurrency.limit),
+                'inflight': self.inflight,
+                'queued': dict(self.queued),
+                'rejected': dict(self.rejected),
+            }
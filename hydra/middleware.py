@@ -0,0 +1,183 @@
+# Copyright (C) 2017 O.S. Systems Software LTDA.
+# This software is released under the MIT License
+
+"""Bearer token authentication middleware for WSGI and ASGI apps.
+
+Tokens are introspected through the client, so configure it with an
+``introspection_cache`` (and optionally a ``shared_cache``) to keep
+Hydra off the hot path. The validated Token is stored in the WSGI
+environ or the ASGI scope under ``hydra.token``.
+"""
+
+import asyncio
+import inspect
+import json
+import logging
+
+from .exceptions import HydraRequestError, HydraResponseError
+from .oauth2 import Token
+
+TOKEN_KEY = 'hydra.token'
+
+logger = logging.getLogger(__name__)
+
+
+def parse_bearer(header):
+    if header is None or len(header) < 8 or header[:7].lower() != 'bearer ':
+        return None
+    return header[7:].strip() or None
+
+
+def _quote(value):
+    # RFC 7230 quoted-string
+    return '"{}"'.format(value.replace('\\', '\\\\').replace('"', '\\"'))
+
+
+class _Denied(Exception):
+
+    def __init__(self, status, error, description):
+        super().__init__(description)
+        self.status = status
+        self.error = error
+        self.description = description
+
+    def headers(self):
+        challenge = 'Bearer'
+        if self.error:
+            challenge += ' error={}, error_description={}'.format(
+                _quote(self.error), _quote(self.description))
+        return [('Content-Type', 'application/json'),
+                ('WWW-Authenticate', challenge)]
+
+    def body(self):
+        return json.dumps({'error': self.error or 'unauthorized',
+                           'error_description': self.description}).encode()
+
+
+_STATUS_LINES = {401: '401 Unauthorized', 403: '403 Forbidden',
+                 503: '503 Service Unavailable'}
+
+
+class _Policy:
+
+    def __init__(self, hydra, scopes=(), audience=None):
+        self.hydra = hydra
+        self.scopes = frozenset(scopes)
+        self.audience = audience
+
+    def check(self, token, result):
+        if result is None:
+            raise _Denied(503, 'temporarily_unavailable',
+                          'Token introspection failed')
+        if not result.get('active'):
+            raise _Denied(401, 'invalid_token', 'The token is not active')
+        if self.scopes and not self.scopes.issubset(
+                (result.get('scope') or '').split()):
+            raise _Denied(403, 'insufficient_scope',
+                          'The token lacks the required scopes')
+        if self.audience is not None:
+            audience = result.get('aud') or ()
+            if isinstance(audience, str):
+                audience = (audience,)
+            if self.audience not in audience:
+                raise _Denied(401, 'invalid_token',
+                              'The token is not meant for this audience')
+        return Token(access_token=token, **result)
+
+
+def _missing():
+    return _Denied(401, None, 'A bearer token is required')
+
+
+def _unavailable(error):
+    # The error names internal hosts; callers only learn that Hydra
+    # could not be reached
+    logger.warning('Token introspection failed: %s', error)
+    return _Denied(503, 'temporarily_unavailable',
+                   'Token introspection is unavailable')
+
+
+class BearerTokenMiddleware(_Policy):
+    """WSGI middleware that requires an active bearer token."""
+
+    def __init__(self, app, hydra, scopes=(), audience=None):
+        super().__init__(hydra, scopes, audience)
+        self.app = app
+
+    def __call__(self, environ, start_response):
+        try:
+            environ[TOKEN_KEY] = self.authenticate(
+                environ.get('HTTP_AUTHORIZATION'))
+        except _Denied as denied:
+            start_response(_STATUS_LINES[denied.status], denied.headers())
+            return [denied.body()]
+        return self.app(environ, start_response)
+
+    def authenticate(self, header):
+        token = parse_bearer(header)
+        if token is None:
+            raise _missing()
+        try:
+            result = self.hydra.lookup_token(token)
+        except (HydraRequestError, HydraResponseError) as error:
+            raise _unavailable(error)
+        return self.check(token, result)
+
+
+class ASGIBearerTokenMiddleware(_Policy):
+    """ASGI middleware that requires an active bearer token.
+
+    Works with an AsyncHydra, or with a Hydra whose cache hits are
+    answered inline and misses are introspected in a worker thread.
+    """
+
+    def __init__(self, app, hydra, scopes=(), audience=None):
+        super().__init__(hydra, scopes, audience)
+        self.app = app
+        self._async = inspect.iscoroutinefunction(hydra.lookup_token)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] not in ('http', 'websocket'):
+            return await self.app(scope, receive, send)
+        header = None
+        for name, value in scope.get('headers', ()):
+            if name == b'authorization':
+                header = value.decode('latin-1')
+                break
+        try:
+            scope[TOKEN_KEY] = await self.authenticate(header)
+        except _Denied as denied:
+            if scope['type'] == 'websocket':
+                # Policy violation
+                return await send({'type': 'websocket.close', 'code': 1008})
+            await send({
+                'type': 'http.response.start',
+                'status': denied.status,
+                'headers': [(name.lower().encode(), value.encode())
+                            for name, value in denied.headers()],
+            })
+            return await send({'type': 'http.response.body',
+                               'body': denied.body()})
+        return await self.app(scope, receive, send)
+
+    async def authenticate(self, header):
+        token = parse_bearer(header)
+        if token is None:
+            raise _missing()
+        try:
+            result = await self._lookup(token)
+        except (HydraRequestError, HydraResponseError) as error:
+            raise _unavailable(error)
+        return self.check(token, result)
+
+    async def _lookup(self, token):
+        if self._async:
+            return await self.hydra.lookup_token(token)
+        cache = self.hydra.introspection_cache
+        if cache is not None:
+            result = cache.get(token)
+            if result is not None:
+                return result
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, self.hydra.lookup_token, token)
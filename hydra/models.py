@@ -0,0 +1,101 @@
+# Copyright (C) 2017 O.S. Systems Software LTDA.
+# This software is released under the MIT License
+
+import json
+from collections import namedtuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+if orjson is not None:
+    loads = orjson.loads
+
+    def dumps(obj):
+        return orjson.dumps(obj).decode()
+else:
+    loads = json.loads
+    dumps = json.dumps
+
+
+Field = namedtuple('Field', ['name', 'key', 'aliases', 'default', 'load',
+                             'dump'])
+
+
+def field(name, key=None, aliases=(), default=None, load=None, dump=None):
+    """Describe a model attribute and the JSON key it maps to.
+
+    When building an instance the aliases are tried in order and the
+    first truthy value wins; the canonical key is tried last unless it is
+    listed among the aliases. ``load`` converts the canonical key's value
+    when present and ``dump`` converts the attribute back when
+    serializing.
+    """
+    return Field(name, key or name, tuple(aliases), default, load, dump)
+
+
+def _compile_init(fields, namespace, post_init):
+    lines = ['def __init__(self, **kwargs):', '    get = kwargs.get']
+    for index, f in enumerate(fields):
+        value = 'get({!r})'.format(f.key)
+        if f.load is not None:
+            namespace['_load{}'.format(index)] = f.load
+            lines.append('    value = {}'.format(value))
+            lines.append('    if value is not None:')
+            lines.append('        value = _load{}(value)'.format(index))
+            value = 'value'
+        names = f.aliases if f.key in f.aliases else f.aliases + (f.key,)
+        lookups = [value if name == f.key else 'get({!r})'.format(name)
+                   for name in names]
+        if f.default is not None:
+            lookups.append(repr(f.default))
+        lines.append('    self.{} = {}'.format(f.name, ' or '.join(lookups)))
+    if post_init:
+        lines.append('    self.__post_init__()')
+    return lines
+
+
+def _compile_as_dict(fields, namespace):
+    lines = ['def as_dict(self):', '    data = {}']
+    for index, f in enumerate(fields):
+        value = 'self.{}'.format(f.name)
+        if f.dump is not None:
+            namespace['_dump{}'.format(index)] = f.dump
+            value = '_dump{}({})'.format(index, value)
+        lines.append('    value = {}'.format(value))
+        lines.append('    if value is not None:')
+        lines.append('        data[{!r}] = value'.format(f.key))
+    lines.append('    return data')
+    return lines
+
+
+class ModelMeta(type):
+
+    def __new__(mcs, name, bases, attrs):
+        fields = attrs.get('fields', ())
+        attrs['__slots__'] = tuple(f.name for f in fields) + tuple(
+            attrs.get('extra_slots', ()))
+        namespace = {}
+        source = _compile_init(
+            fields, namespace, '__post_init__' in attrs)
+        source += _compile_as_dict(fields, namespace)
+        exec('\n'.join(source), namespace)
+        attrs.setdefault('__init__', namespace['__init__'])
+        attrs.setdefault('as_dict', namespace['as_dict'])
+        return super().__new__(mcs, name, bases, attrs)
+
+
+class Model(metaclass=ModelMeta):
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(**loads(data))
+
+    @classmethod
+    def from_json_list(cls, data):
+        return [cls(**item) for item in loads(data)]
+
+    def to_json(self):
+        return dumps(self.as_dict())
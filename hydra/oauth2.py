@@ -1,71 +1,405 @@
 # Copyright (C) 2017 O.S. Systems Software LTDA.
 # This software is released under the MIT License
 
-from datetime import datetime, timedelta
+import threading
+import time
+from datetime import datetime
 from urllib.parse import urljoin
 
-import requests
+from .balancer import LoadBalancer
+from .cache import TokenStore
+from .exceptions import (
+    CircuitOpenError, DeadlineExceededError, HydraRequestError,
+    HydraResponseError)
+from .instrumentation import RequestEvent, dispatch, endpoint_name
+from .models import Model, field
+from .resilience import IDEMPOTENT_METHODS, RetryPolicy, clip_timeout
+from .singleflight import SingleFlight
+from .transports import RequestsTransport
 
 
-class Token:
+class Token(Model):
 
-    def __init__(self, **kwargs):
+    fields = (
+        field('token', 'access_token'),
+        field('type', 'token_type'),
+        field('expires_in', default=0),
+        field('scope'),
+        field('aud'),
+        field('client_id'),
+        field('exp'),
+        field('ext'),
+        field('iat'),
+        field('iss'),
+        field('nbf'),
+        field('obfuscated_subject'),
+        field('sub'),
+        field('username'),
+    )
+    extra_slots = ('issue_time', 'deadline', 'lifetime')
+
+    def __post_init__(self):
         self.issue_time = datetime.now()
-        self.expires_in = kwargs.get('expires_in', 0)
-        self.scope = kwargs.get('scope')
-        self.token = kwargs.get('access_token')
-        self.type = kwargs.get('token_type')
-        self.aud = kwargs.get('aud')
-        self.client_id = kwargs.get('client_id')
-        self.exp = kwargs.get('exp')
-        self.ext = kwargs.get('exp')
-        self.iat = kwargs.get('iat')
-        self.iss = kwargs.get('iss')
-        self.nbf = kwargs.get('nbf')
-        self.obfuscated_subject = kwargs.get('obfuscated_subject')
-        self.sub = kwargs.get('sub')
-        self.username = kwargs.get('username')
-
-    def is_expired(self):
-        expiration_date = self.issue_time + timedelta(seconds=self.expires_in)
-        return datetime.now() > expiration_date
+        # Expiry is tracked on the monotonic clock so that wall clock
+        # steps cannot extend or cut short a token's life
+        lifetime = self.expires_in
+        if self.exp:
+            remaining = self.exp - time.time()
+            lifetime = min(lifetime, remaining) if lifetime else remaining
+        self.deadline = time.monotonic() + lifetime
+        self.lifetime = lifetime
+
+    def is_expired(self, margin=0):
+        return time.monotonic() >= self.deadline - margin
+
+    def needs_refresh(self, margin):
+        # A margin as long as the token's life would have every call
+        # refresh it, and every refreshed token would be just as short
+        return self.is_expired(min(margin, self.lifetime / 2))
 
     def __str__(self):
         return '{} {}'.format(self.type, self.token)
 
 
+def _balance(hosts):
+    # A list of replicas (or a configured LoadBalancer) spreads requests;
+    # the first replica stays the plane's nominal host.
+    if isinstance(hosts, str):
+        return hosts, None
+    if not isinstance(hosts, LoadBalancer):
+        hosts = list(hosts)
+        if len(hosts) == 1:
+            return hosts[0], None
+        hosts = LoadBalancer(hosts)
+    return hosts.nodes[0].url, hosts
+
+
 class Client:
 
-    def __init__(self, publichost, adminhost, client, secret):
-        self.publichost = publichost
-        self.adminhost = adminhost
+    def __init__(self, publichost, adminhost, client, secret,
+                 pool_connections=10, pool_maxsize=10, pool_block=False,
+                 keep_alive=True, introspection_cache=None,
+                 token_refresh_margin=30, hooks=None, timeout=(5, 30),
+                 deadline=None, retry=RetryPolicy(), circuit_breakers=None,
+                 transport=None, shared_cache=None, limiter=None):
+        self.publichost, self.public_balancer = _balance(publichost)
+        self.adminhost, self.admin_balancer = _balance(adminhost)
         self.client = client
         self.secret = secret
-        self._tokens = {}
+        self.pool_maxsize = pool_maxsize
+        if transport is None:
+            transport = RequestsTransport(
+                pool_connections=pool_connections,
+                pool_maxsize=pool_maxsize, pool_block=pool_block,
+                keep_alive=keep_alive)
+        self.transport = transport
+        self.introspection_cache = introspection_cache
+        self.shared_cache = shared_cache
+        self.token_refresh_margin = token_refresh_margin
+        self.jwt_validator = None
+        self.hooks = list(hooks or ())
+        self.timeout = timeout
+        self.deadline = deadline
+        self.retry = retry
+        self.circuit_breakers = circuit_breakers
+        self.limiter = limiter
+        self._tokens = TokenStore()
+        self._token_flight = SingleFlight()
+        self._introspection_flight = SingleFlight()
+        # Bumped by every revoke_token, so a lookup that was in flight
+        # meanwhile does not cache the token as active again
+        self._revocations = 0
+        self._revocations_lock = threading.Lock()
+        self._flow = None
+        self._flow_lock = threading.Lock()
+        self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self._flow is not None:
+            self._flow.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        self.transport.close()
 
-    def request(self, method, path, token=False, **kwargs):
-        if token:
-            url = urljoin(self.publichost, path)
-            return self._basic_request(method, url, **kwargs)
-        url = urljoin(self.adminhost, path)
-        return self._admin_request(method, url, **kwargs)
+    @property
+    def flow(self):
+        """Login/consent helper sharing this client's connections."""
+        if self._flow is None:
+            with self._flow_lock:
+                if self._flow is None:
+                    from .flow import LoginConsentFlow
+                    self._flow = LoginConsentFlow(
+                        self, max_workers=self.pool_maxsize)
+        return self._flow
+
+    def request(self, method, path, token=False, endpoint=None,
+                idempotent=None, deadline=None, **kwargs):
+        host = self.publichost if token else self.adminhost
+        balancer = self.public_balancer if token else self.admin_balancer
+        url = urljoin(host, path)
+        send = self._basic_request if token else self._admin_request
+        endpoint = endpoint or endpoint_name(method, path)
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        retry = self.retry
+        retries = retry.retries if retry is not None and idempotent else 0
+        if deadline is None:
+            deadline = self.deadline
+        expires = time.monotonic() + deadline if deadline else None
+        timeout = kwargs.pop('timeout', self.timeout)
+        attempt = 0
+        while True:
+            permit = node = outcome = breaker = None
+            healthy = False
+            try:
+                if self.limiter is not None:
+                    wait = None
+                    if expires is not None:
+                        wait = expires - time.monotonic()
+                    permit = self.limiter.acquire(path, wait)
+                if balancer is not None:
+                    # Every attempt picks again, so retries land on a
+                    # replica that is more likely to be healthy
+                    node = balancer.acquire()
+                    host = node.url
+                    url = urljoin(host, path)
+                if expires is not None:
+                    remaining = expires - time.monotonic()
+                    if remaining <= 0:
+                        raise DeadlineExceededError(
+                            'Deadline exceeded for {} {}'.format(method, url))
+                    kwargs['timeout'] = clip_timeout(timeout, remaining)
+                elif timeout is not None:
+                    kwargs['timeout'] = timeout
+                if self.circuit_breakers is not None:
+                    breaker = self.circuit_breakers.get(host)
+                    if breaker is not None and not breaker.allow():
+                        breaker = None
+                        raise CircuitOpenError(
+                            'Circuit open for {}'.format(host))
+                try:
+                    response = self._send(
+                        send, method, url, endpoint, attempt, kwargs)
+                except self.transport.errors as error:
+                    outcome = False
+                    if attempt >= retries:
+                        raise HydraRequestError(
+                            '{} {} failed: {}'.format(method, url, error)
+                        ) from error
+                else:
+                    if node is not None or permit is not None:
+                        outcome = response.status_code < 500
+                    if (retry is None or
+                            response.status_code not in retry.statuses):
+                        healthy = True
+                        return response
+                    if attempt >= retries:
+                        raise HydraResponseError(
+                            '{} {} returned {}'.format(
+                                method, url, response.status_code), response)
+            finally:
+                if breaker is not None:
+                    # Every admitted request settles the breaker, even
+                    # one cut short by an unexpected error; otherwise a
+                    # half-open trial would never close or reopen
+                    if healthy:
+                        breaker.record_success()
+                    else:
+                        breaker.record_failure()
+                if node is not None:
+                    balancer.release(node, outcome)
+                if permit is not None:
+                    self.limiter.release(permit, outcome)
+            delay = retry.delay(attempt)
+            if expires is not None and time.monotonic() + delay >= expires:
+                raise DeadlineExceededError(
+                    'Deadline exceeded for {} {}'.format(method, url))
+            time.sleep(delay)
+            attempt += 1
+
+    def _send(self, send, method, url, endpoint, attempt, kwargs):
+        if not self.hooks:
+            return send(method, url, **kwargs)
+        event = RequestEvent(endpoint, method, url, time.time())
+        event.retries = attempt
+        started = time.perf_counter()
+        try:
+            response = send(method, url, **kwargs)
+        except Exception as error:
+            event.error = error
+            raise
+        else:
+            event.status = response.status_code
+            if not kwargs.get('stream'):
+                event.bytes_received = len(response.content)
+            body = response.request.body if response.request else None
+            event.bytes_sent = len(body) if body else 0
+            # requests and buffered httpx responses measure elapsed up to
+            # the parsed response headers; other transports leave it out
+            if response.elapsed is not None:
+                event.timings['ttfb'] = response.elapsed.total_seconds()
+        finally:
+            event.duration = time.perf_counter() - started
+            if 'ttfb' in event.timings:
+                event.timings['body'] = max(
+                    event.duration - event.timings['ttfb'], 0.0)
+            dispatch(self.hooks, event)
+        return response
 
     def _admin_request(self, method, url, **kwargs):
-        return requests.request(method, url, **kwargs)
+        return self.transport.request(method, url, **kwargs)
 
     def _basic_request(self, method, url, scope=None, **kwargs):
         kwargs['auth'] = (self.client, self.secret)
-        return requests.request(method, url, **kwargs)
+        return self.transport.request(method, url, **kwargs)
+
+    def get_access_token(self, scopes=None):
+        if isinstance(scopes, str):
+            scopes = scopes.split()
+        key = frozenset(scopes or ())
+        token = self._tokens.get(key)
+        if token is None or token.is_expired():
+            token = self._shared_access_token(key)
+        if token is not None and not token.is_expired():
+            if token.needs_refresh(self.token_refresh_margin):
+                self._token_flight.do_in_background(
+                    key, self._fetch_access_token, key)
+            return token
+        return self._token_flight.do(key, self._fetch_access_token, key)
+
+    def _shared_access_token(self, scopes):
+        if self.shared_cache is None:
+            return None
+        data = self.shared_cache.get_token(self.client, scopes)
+        if data is None:
+            return None
+        token = self._tokens[scopes] = Token(**data)
+        return token
+
+    def _fetch_access_token(self, scopes):
+        data = {'grant_type': 'client_credentials'}
+        if scopes:
+            data['scope'] = ' '.join(sorted(scopes))
+        response = self.request(
+            'POST', '/oauth2/token', token=True, data=data)
+        if response.ok:
+            token = Token(**response.json())
+            self._tokens[scopes] = token
+            if self.shared_cache is not None:
+                self.shared_cache.set_token(self.client, scopes, token)
+            return token
 
     def instrospect_token(self, token):
+        return self.lookup_token(token.token)
+
+    def lookup_token(self, token):
+        """Introspect a raw access token string, answering from the
+        introspection and shared caches when they hold it."""
+        cache = self.introspection_cache
+        if cache is not None:
+            result = cache.get(token)
+            if result is not None:
+                return result
+        if self.shared_cache is not None:
+            revocations = self._revocations
+            result = self.shared_cache.get_introspection(token)
+            if result is not None:
+                if cache is not None:
+                    with self._revocations_lock:
+                        if revocations == self._revocations:
+                            cache.set(token, result)
+                return result
+        # Concurrent callers asking about the same token share one request
+        return self._introspection_flight.do(token, self._introspect, token)
+
+    def _introspect(self, token):
+        revocations = self._revocations
         response = self.request(
-            'POST', '/oauth2/introspect', data={'token': token.token})
+            'POST', '/oauth2/introspect', idempotent=True,
+            data={'token': token})
         if response.ok:
-            return response.json()
+            result = response.json()
+            with self._revocations_lock:
+                if revocations == self._revocations:
+                    if self.introspection_cache is not None:
+                        self.introspection_cache.set(token, result)
+                    if self.shared_cache is not None:
+                        self.shared_cache.set_introspection(token, result)
+            return result
+
+    def introspect_many(self, tokens, max_workers=None):
+        """Introspect tokens concurrently, returning results in input
+        order. A token whose lookup failed gets None, like a rejected
+        instrospect_token, instead of failing the whole batch.
+
+        Cache hits are answered inline and misses run on a thread pool
+        of pool_maxsize workers kept by the client; passing max_workers
+        uses a pool of that size for this call only."""
+        tokens = [token.token for token in tokens]
+        results = {}
+        misses = []
+        cache = self.introspection_cache
+        for token in dict.fromkeys(tokens):
+            result = cache.get(token) if cache is not None else None
+            if result is None:
+                misses.append(token)
+            else:
+                results[token] = result
+        if len(misses) == 1:
+            results[misses[0]] = self._lookup_token_quietly(misses[0])
+        elif misses:
+            if max_workers is None:
+                executor = self._introspection_executor()
+                results.update(zip(misses, executor.map(
+                    self._lookup_token_quietly, misses)))
+            else:
+                from concurrent.futures import ThreadPoolExecutor
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    results.update(zip(misses, executor.map(
+                        self._lookup_token_quietly, misses)))
+        return [results[token] for token in tokens]
+
+    def _introspection_executor(self):
+        # Kept for the client's life: starting threads on every burst
+        # would cost more than the lookups they parallelize
+        if self._executor is None:
+            with self._flow_lock:
+                if self._executor is None:
+                    from concurrent.futures import ThreadPoolExecutor
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.pool_maxsize,
+                        thread_name_prefix='hydra-introspect')
+        return self._executor
+
+    def _lookup_token_quietly(self, token):
+        try:
+            return self.lookup_token(token)
+        except (HydraRequestError, HydraResponseError):
+            return None
+
+    def validate_token(self, token):
+        if self.jwt_validator is None:
+            from .jwks import JWTValidator
+            self.jwt_validator = JWTValidator(self)
+        return self.jwt_validator.validate(token)
 
     def revoke_token(self, token):
         response = self.request(
-            'POST', '/oauth2/revoke', token=True, data={'token': token.token})
+            'POST', '/oauth2/revoke', token=True, idempotent=True,
+            data={'token': token.token})
+        with self._revocations_lock:
+            self._revocations += 1
+            if self.introspection_cache is not None:
+                self.introspection_cache.pop(token.token)
+            if self.shared_cache is not None:
+                self.shared_cache.delete_introspection(token.token)
         return response.ok
 
     def get_login_request(self, challenge):
@@ -118,8 +452,7 @@ class Client:
         response = self.request(
             'DELETE', '/oauth2/auth/sessions/consent',
             params={'subject': user})
-        if response.ok:
-            response.json()
+        return response.ok
 
     def revokes_consent_sessions_oAuth2_client(self, user, client):
         response = self.request(
@@ -127,12 +460,56 @@ class Client:
             params={'subject': user, 'client': client})
         return response.ok
 
-    def lists_all_consent_sessions_user(self, user):
+    def lists_all_consent_sessions_user(self, user, stream=False):
+        if stream:
+            response = self.request(
+                'GET', '/oauth2/auth/sessions/consent',
+                params={'subject': user}, stream=True)
+            if response.ok:
+                from .streaming import iter_response_array
+                return iter_response_array(response)
+            response.close()
+            return None
         response = self.request(
             'GET', '/oauth2/auth/sessions/consent', params={'subject': user})
         if response.ok:
             return response.json()
 
+    def revoke_consent_sessions_many(self, items, max_workers=8,
+                                     progress=None, report=None,
+                                     checkpoint=None):
+        """Revoke consent sessions for many subjects.
+
+        Items are subjects, whose sessions are all revoked, or
+        (subject, client) pairs, which revoke only that client's.
+        """
+        from .bulk import run_report
+        return run_report(self._revoke_consent_sessions, items, max_workers,
+                          progress, report, checkpoint)
+
+    def _revoke_consent_sessions(self, item):
+        if isinstance(item, str):
+            return self.revokes_all_previous_consent_session_user(item)
+        return self.revokes_consent_sessions_oAuth2_client(*item)
+
+    def invalidate_authentication_sessions_many(self, users, max_workers=8,
+                                                progress=None, report=None,
+                                                checkpoint=None):
+        from .bulk import run_report
+        return run_report(self.invalidates_users_authentication_session,
+                          users, max_workers, progress, report, checkpoint)
+
+    def iter_consent_sessions(self, users, max_workers=8):
+        """Yield a BulkResult per user, with the sessions as value.
+
+        Results come in completion order with a bounded number of
+        requests in flight.
+        """
+        from .bulk import iter_many
+        for _, result in iter_many(self.lists_all_consent_sessions_user,
+                                   users, max_workers):
+            yield result
+
     def logs_user_out_deleting_session_cookie(self):
         response = self.request(
             'GET', '/oauth2/auth/sessions/login/revoke')
@@ -0,0 +1,153 @@
+# Copyright (C) 2017 O.S. Systems Software LTDA.
+# This software is released under the MIT License
+
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from .cache import introspection_ttl, token_key
+
+logger = logging.getLogger(__name__)
+
+
+class SQLiteCache:
+    """Cache shared by every process on a host through one SQLite file.
+
+    The database runs in WAL mode, so readers never block the writer.
+    Reads go through a memory-mapped view of the file. Expiry uses wall
+    clock time because monotonic clocks are not comparable across
+    processes.
+
+    Expired rows are deleted every ``purge_every`` writes. The cache is
+    best effort: a SQLite error (such as the database staying locked
+    for ``timeout`` seconds) is logged and treated as a miss or a
+    skipped write, so lookups fall back to Hydra.
+    """
+
+    def __init__(self, path, ttl=60, negative_ttl=5, timeout=0.5,
+                 mmap_size=64 * 1024 * 1024, purge_every=1000):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.timeout = timeout
+        self.mmap_size = mmap_size
+        self.purge_every = purge_every
+        self._writes = itertools.count(1)
+        self._local = threading.local()
+        self._inherited = []
+        # Cached tokens are credentials: keep the file private to the user
+        os.close(os.open(path, os.O_CREAT | os.O_RDWR, 0o600))
+        # The setup connection is not kept, so a master process that
+        # preloads the app does not hand an open connection to workers
+        connection = self._connect()
+        try:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS entries ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, '
+                'expires REAL NOT NULL)')
+        finally:
+            connection.close()
+
+    def _connect(self):
+        connection = sqlite3.connect(
+            self.path, timeout=self.timeout, isolation_level=None)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        connection.execute('PRAGMA mmap_size={:d}'.format(self.mmap_size))
+        return connection
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        pid = os.getpid()
+        if connection is not None and self._local.pid != pid:
+            # SQLite connections must not cross fork(); closing one in
+            # the child is unsafe too, so it is only kept out of reach
+            self._inherited.append(connection)
+            connection = None
+        if connection is None:
+            connection = self._local.connection = self._connect()
+            self._local.pid = pid
+        return connection
+
+    def close(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            if self._local.pid == os.getpid():
+                connection.close()
+            self._local.connection = None
+
+    def get(self, key):
+        try:
+            row = self._connection().execute(
+                'SELECT value, expires FROM entries WHERE key = ?',
+                (key,)).fetchone()
+        except sqlite3.Error as error:
+            logger.warning('Reading the shared cache failed: %s', error)
+            return None
+        if row is None or row[1] <= time.time():
+            return None
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            self.delete(key)
+            return
+        try:
+            self._connection().execute(
+                'INSERT OR REPLACE INTO entries (key, value, expires) '
+                'VALUES (?, ?, ?)',
+                (key, json.dumps(value), time.time() + ttl))
+        except sqlite3.Error as error:
+            logger.warning('Writing the shared cache failed: %s', error)
+            return
+        if next(self._writes) % self.purge_every == 0:
+            self.purge()
+
+    def delete(self, key):
+        try:
+            self._connection().execute(
+                'DELETE FROM entries WHERE key = ?', (key,))
+        except sqlite3.Error as error:
+            # The entry lives on until it expires
+            logger.warning('Deleting from the shared cache failed: %s',
+                           error)
+
+    def purge(self):
+        try:
+            self._connection().execute(
+                'DELETE FROM entries WHERE expires <= ?', (time.time(),))
+        except sqlite3.Error as error:
+            logger.warning('Purging the shared cache failed: %s', error)
+
+    def get_introspection(self, token):
+        return self.get('introspect:' + token_key(token))
+
+    def set_introspection(self, token, result):
+        self.set('introspect:' + token_key(token), result,
+                 introspection_ttl(result, self.ttl, self.negative_ttl))
+
+    def delete_introspection(self, token):
+        self.delete('introspect:' + token_key(token))
+
+    def get_token(self, client, scopes):
+        data = self.get(self._token_key(client, scopes))
+        if data is None:
+            return None
+        expires_at = data.pop('expires_at')
+        data['expires_in'] = int(expires_at - time.time())
+        return data
+
+    def set_token(self, client, scopes, token):
+        remaining = token.deadline - time.monotonic()
+        data = token.as_dict()
+        data['expires_at'] = time.time() + remaining
+        self.set(self._token_key(client, scopes), data, remaining)
+
+    @staticmethod
+    def _token_key(client, scopes):
+        return 'token:{}:{}'.format(client, ' '.join(sorted(scopes)))
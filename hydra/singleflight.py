@@ -0,0 +1,67 @@
+# Copyright (C) 2017 O.S. Systems Software LTDA.
+# This software is released under the MIT License
+
+import threading
+
+
+class _Call:
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def pending(self, key):
+        return key in self._calls
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        return self._lead(key, call, fn, *args, **kwargs)
+
+    def _lead(self, key, call, fn, *args, **kwargs):
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def do_in_background(self, key, fn, *args, **kwargs):
+        # The call is registered before the thread starts, so callers
+        # that arrive meanwhile neither start another thread nor a
+        # second request
+        with self._lock:
+            if key in self._calls:
+                return None
+            call = self._calls[key] = _Call()
+        thread = threading.Thread(
+            target=self._run_quietly, args=(key, call, fn) + args,
+            kwargs=kwargs, daemon=True)
+        thread.start()
+        return thread
+
+    def _run_quietly(self, key, call, fn, *args, **kwargs):
+        try:
+            self._lead(key, call, fn, *args, **kwargs)
+        except Exception:  # the next foreground call retries
+            pass
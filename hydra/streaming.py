@@ -0,0 +1,70 @@
+# Copyright (C) 2017 O.S. Systems Software LTDA.
+# This software is released under the MIT License
+
+import codecs
+import json
+import re
+
+_WHITESPACE = re.compile(r'\s*')
+# What can follow a JSON number prefix: more of it, or the end of the data
+_NUMBER_CONTINUES = frozenset(['', '.', 'e', 'E', '+', '-'] +
+                              list('0123456789'))
+
+# What may come next while walking the array
+_OPEN, _FIRST, _VALUE, _SEPARATOR = range(4)
+
+
+def iter_json_array(chunks):
+    """Yield the elements of a JSON array from an iterable of byte chunks.
+
+    Only the element being decoded and the undecoded tail of the last
+    chunk are held in memory, so peak memory does not grow with the
+    number of elements.
+    """
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    pos = 0
+    state = _OPEN
+    for chunk in chunks:
+        buffer = buffer[pos:] + text.decode(chunk)
+        pos = 0
+        while True:
+            pos = _WHITESPACE.match(buffer, pos).end()
+            if pos == len(buffer):
+                break
+            char = buffer[pos]
+            if state == _OPEN:
+                if char != '[':
+                    raise ValueError('Expected a JSON array')
+                state = _FIRST
+                pos += 1
+            elif char == ']' and state in (_FIRST, _SEPARATOR):
+                return
+            elif state == _SEPARATOR:
+                if char != ',':
+                    raise ValueError('Expected "," or "]" at {!r}'.format(
+                        buffer[pos:pos + 20]))
+                state = _VALUE
+                pos += 1
+            else:
+                try:
+                    value, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    break  # Incomplete element, wait for more data
+                if (isinstance(value, (int, float)) and
+                        buffer[end:end + 1] in _NUMBER_CONTINUES):
+                    break  # The number may continue in the next chunk
+                yield value
+                pos = end
+                state = _SEPARATOR
+    raise ValueError('Truncated JSON array')
+
+
+def iter_response_array(response, chunk_size=65536):
+    """Stream the elements of a JSON array response, then close it."""
+    try:
+        for value in iter_json_array(response.iter_content(chunk_size)):
+            yield value
+    finally:
+        response.close()
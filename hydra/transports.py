@@ -0,0 +1,247 @@
+# Copyright (C) 2017 O.S. Systems Software LTDA.
+# This software is released under the MIT License
+
+import json as jsonlib
+import threading
+from base64 import b64encode
+from urllib.parse import urlencode, urlsplit
+
+
+def _origin(url):
+    parts = urlsplit(url)
+    return '{}://{}'.format(parts.scheme, parts.netloc)
+
+
+def parse_links(header):
+    links = {}
+    for part in header.split(','):
+        pieces = part.split(';')
+        url = pieces[0].strip().strip('<>')
+        link = {'url': url}
+        for param in pieces[1:]:
+            key, _, value = param.strip().partition('=')
+            link[key] = value.strip('"\'')
+        links[link.get('rel') or url] = link
+    return links
+
+
+def encode_body(data=None, json=None, headers=None):
+    headers = dict(headers or {})
+    if json is not None:
+        headers.setdefault('Content-Type', 'application/json')
+        return jsonlib.dumps(json).encode(), headers
+    if data is not None:
+        headers.setdefault('Content-Type',
+                           'application/x-www-form-urlencoded')
+        if isinstance(data, dict):
+            data = urlencode(data, doseq=True)
+        if isinstance(data, str):
+            data = data.encode()
+        return data, headers
+    return None, headers
+
+
+def basic_auth(auth):
+    credentials = '{}:{}'.format(*auth).encode()
+    return 'Basic ' + b64encode(credentials).decode()
+
+
+class Response:
+
+    def __init__(self, status_code, headers=None, content=None, url=None,
+                 elapsed=None, chunks=None, close=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.url = url
+        # Time to the response headers, or None when not measured
+        self.elapsed = elapsed
+        self.request = None
+        self._content = content
+        self._chunks = chunks
+        self._close = close
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    @property
+    def content(self):
+        if self._content is None:
+            self._content = b''.join(self.iter_content())
+        return self._content
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8')
+
+    @property
+    def links(self):
+        header = self.headers.get('Link') or self.headers.get('link')
+        return parse_links(header) if header else {}
+
+    def json(self):
+        return jsonlib.loads(self.content)
+
+    def iter_content(self, chunk_size=65536):
+        if self._content is not None:
+            for start in range(0, len(self._content), chunk_size):
+                yield self._content[start:start + chunk_size]
+            return
+        try:
+            for chunk in self._chunks(chunk_size):
+                yield chunk
+        finally:
+            self.close()
+
+    def close(self):
+        if self._close is not None:
+            self._close()
+            self._close = None
+
+
+class Transport:
+
+    # Exceptions that mean the request did not complete and may be retried
+    errors = ()
+
+    def request(self, method, url, params=None, data=None, json=None,
+                auth=None, headers=None, timeout=None, stream=False):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class RequestsTransport(Transport):
+
+    def __init__(self, pool_connections=10, pool_maxsize=10,
+                 pool_block=False, keep_alive=True):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.keep_alive = keep_alive
+        self._sessions = {}
+        self._sessions_lock = threading.Lock()
+
+    @property
+    def errors(self):
+        # Only looked up when a request raises, so requests is imported
+        # with the first session rather than with the client
+        import requests
+        return (requests.ConnectionError, requests.Timeout)
+
+    def close(self):
+        with self._sessions_lock:
+            sessions, self._sessions = self._sessions, {}
+        for session in sessions.values():
+            session.close()
+
+    def session(self, host):
+        session = self._sessions.get(host)
+        if session is not None:
+            return session
+        with self._sessions_lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = self._create_session()
+                self._sessions[host] = session
+        return session
+
+    def _create_session(self):
+        import requests
+        from requests.adapters import HTTPAdapter
+        session = requests.Session()
+        # pool_maxsize caps the connections kept per host; with pool_block
+        # it also becomes a hard limit on concurrent connections.
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=self.pool_block)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        if not self.keep_alive:
+            session.headers['Connection'] = 'close'
+        return session
+
+    def request(self, method, url, **kwargs):
+        return self.session(_origin(url)).request(method, url, **kwargs)
+
+
+class Urllib3Transport(Transport):
+
+    def __init__(self, num_pools=10, maxsize=10, block=False):
+        import urllib3
+        self.errors = (urllib3.exceptions.HTTPError,)
+        self._urllib3 = urllib3
+        self._pool = urllib3.PoolManager(
+            num_pools=num_pools, maxsize=maxsize, block=block,
+            retries=False)
+
+    def close(self):
+        self._pool.clear()
+
+    def request(self, method, url, params=None, data=None, json=None,
+                auth=None, headers=None, timeout=None, stream=False):
+        if params:
+            url = '{}?{}'.format(url, urlencode(params, doseq=True))
+        body, headers = encode_body(data, json, headers)
+        if auth is not None:
+            headers['Authorization'] = basic_auth(auth)
+        if isinstance(timeout, tuple):
+            timeout = self._urllib3.Timeout(
+                connect=timeout[0], read=timeout[1])
+        response = self._pool.request(
+            method, url, body=body, headers=headers, timeout=timeout,
+            redirect=True, preload_content=not stream)
+        if stream:
+            return Response(
+                response.status, dict(response.headers), url=url,
+                chunks=response.stream, close=response.release_conn)
+        return Response(response.status, dict(response.headers),
+                        response.data, url=url)
+
+
+class HttpxTransport(Transport):
+
+    def __init__(self, http2=False, max_connections=100,
+                 max_keepalive_connections=20, keepalive_expiry=5.0,
+                 transport=None):
+        import httpx
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                raise ImportError(
+                    'HTTP/2 requires h2: pip install hydra-sdk[http2]')
+        self.errors = (httpx.TransportError,)
+        self._httpx = httpx
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry)
+        # A single client multiplexes concurrent requests over one HTTP/2
+        # connection per host when the server supports it
+        self._client = httpx.Client(
+            http2=http2, limits=limits, transport=transport,
+            follow_redirects=True)
+
+    def close(self):
+        self._client.close()
+
+    def request(self, method, url, params=None, data=None, json=None,
+                auth=None, headers=None, timeout=None, stream=False):
+        if isinstance(timeout, tuple):
+            timeout = self._httpx.Timeout(timeout[1], connect=timeout[0])
+        body, headers = encode_body(data, json, headers)
+        request = self._client.build_request(
+            method, url, params=params, content=body, headers=headers,
+            timeout=timeout)
+        if auth is not None:
+            request.headers['Authorization'] = basic_auth(auth)
+        response = self._client.send(request, stream=stream)
+        if stream:
+            return Response(
+                response.status_code, response.headers, url=url,
+                chunks=response.iter_bytes, close=response.close)
+        return Response(response.status_code, response.headers,
+                        response.content, url=url, elapsed=response.elapsed)
@@ -13,6 +13,12 @@ setup(
     install_requires=[
         'requests==2.28.1',
     ],
+    extras_require={
+        'async': ['httpx'],
+        'http2': ['httpx[http2]'],
+        'jwt': ['PyJWT[crypto]'],
+        'orjson': ['orjson'],
+    },
     author='O.S. Systems Software LTDA',
     author_email='contato@ossystems.com.br',
     url='http://www.ossystems.com.br',
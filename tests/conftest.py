@@ -3,18 +3,20 @@
 
 import os
 
-import docker
 import pytest
 import tempfile
 import shutil
 
 
-@pytest.fixture(scope='session', autouse=True)
+@pytest.fixture(scope='session')
 def hydra_fixture():
+    # Only the live tests request this fixture; everything else runs
+    # offline against hydra.fake
     if os.environ.get('PYTHON_HYDRA_LOCAL'):
         yield
         return
 
+    import docker
     client = docker.from_env()
 
     container_hydra_server = client.containers.run(
@@ -0,0 +1,106 @@
+# Copyright (C) 2017 O.S. Systems Software LTDA.
+# This software is released under the MIT License
+
+import json
+import unittest
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+from hydra import AsyncHydra, Client
+from hydra.exceptions import HydraRequestError
+from hydra.oauth2 import Token
+
+
+@unittest.skipIf(httpx is None, 'httpx is not installed')
+class AsyncHydraTestCase(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.requests = []
+        self.responses = {}
+        self.hydra = AsyncHydra(
+            'http://localhost:4444', 'http://localhost:4445',
+            'client', 'secret',
+            transport=httpx.MockTransport(self.handler))
+        self.addAsyncCleanup(self.hydra.close)
+
+    def handler(self, request):
+        self.requests.append(request)
+        status, body = self.responses.get(
+            (request.method, request.url.path), (200, {}))
+        return httpx.Response(status, json=body)
+
+    async def test_can_instrospect_token(self):
+        self.responses['POST', '/oauth2/introspect'] = (200, {'active': True})
+        result = await self.hydra.instrospect_token(
+            Token(access_token='super-token'))
+        self.assertEqual(result, {'active': True})
+        request = self.requests[-1]
+        self.assertEqual(
+            str(request.url), 'http://localhost:4445/oauth2/introspect')
+        self.assertEqual(request.content, b'token=super-token')
+
+    async def test_can_revoke_token(self):
+        ok = await self.hydra.revoke_token(Token(access_token='super-token'))
+        self.assertTrue(ok)
+        request = self.requests[-1]
+        self.assertEqual(
+            str(request.url), 'http://localhost:4444/oauth2/revoke')
+        self.assertTrue(request.headers['Authorization'].startswith('Basic'))
+
+    async def test_can_accept_login_request(self):
+        self.responses['PUT', '/oauth2/auth/requests/login/accept'] = (
+            200, {'redirect_to': 'http://localhost/callback'})
+        result = await self.hydra.accept_login_request(
+            'challenge', {'subject': 'user'})
+        self.assertEqual(result['redirect_to'], 'http://localhost/callback')
+        request = self.requests[-1]
+        self.assertEqual(request.url.params['login_challenge'], 'challenge')
+        self.assertEqual(json.loads(request.content), {'subject': 'user'})
+
+    async def test_returns_none_on_error(self):
+        self.responses['GET', '/oauth2/auth/requests/consent'] = (404, {})
+        self.assertIsNone(await self.hydra.get_consent_request('challenge'))
+
+    async def test_can_create_client(self):
+        self.responses['POST', '/clients'] = (
+            201, {'client_id': 'id', 'client_name': 'new-client',
+                  'scope': 'devices products'})
+        client = await self.hydra.clients.create(
+            Client(name='new-client', scopes=['devices', 'products']))
+        self.assertEqual(client.id, 'id')
+        self.assertEqual(client.scopes, ['devices', 'products'])
+
+    async def test_can_list_all_clients(self):
+        self.responses['GET', '/clients'] = (
+            200, [{'client_id': 'a'}, {'client_id': 'b'}])
+        clients = await self.hydra.clients.all()
+        self.assertEqual([c.id for c in clients], ['a', 'b'])
+
+    async def test_reuses_one_pooled_client(self):
+        await self.hydra.clients.get('a')
+        session = self.hydra._http
+        await self.hydra.clients.get('b')
+        self.assertIs(self.hydra._http, session)
+
+    async def test_can_get_access_token(self):
+        self.responses['POST', '/oauth2/token'] = (
+            200, {'access_token': 'super-token', 'expires_in': 3600,
+                  'token_type': 'bearer'})
+        token = await self.hydra.get_access_token(['devices'])
+        self.assertEqual(token.token, 'super-token')
+        self.assertIs(await self.hydra.get_access_token(['devices']), token)
+        self.assertEqual(len(self.requests), 1)
+        self.assertEqual(
+            self.requests[0].content,
+            b'grant_type=client_credentials&scope=devices')
+
+    async def test_transport_errors_raise_request_error(self):
+        def refuse(request):
+            raise httpx.ConnectError('connection refused', request=request)
+
+        self.hydra.transport = httpx.MockTransport(refuse)
+        with self.assertRaises(HydraRequestError):
+            await self.hydra.lookup_token('super-token')
@@ -0,0 +1,102 @@
+# Copyright (C) 2017 O.S. Systems Software LTDA.
+# This software is released under the MIT License
+
+import unittest
+from collections import Counter
+from unittest.mock import patch
+
+from hydra import Hydra
+from hydra.balancer import LoadBalancer
+from hydra.fake import FakeHydra, FakeTransport
+from hydra.resilience import RetryPolicy
+
+
+class BalancerTestCase(unittest.TestCase):
+
+    def test_p2c_prefers_less_loaded_node(self):
+        balancer = LoadBalancer(['http://a', 'http://b'])
+        busy = balancer.acquire()
+        self.assertNotEqual(balancer.acquire(), busy)
+
+    def test_least_outstanding(self):
+        balancer = LoadBalancer(['http://a', 'http://b', 'http://c'],
+                                strategy=LoadBalancer.LEAST_OUTSTANDING)
+        nodes = {balancer.acquire().url for _ in range(3)}
+        self.assertEqual(nodes, {'http://a', 'http://b', 'http://c'})
+
+    @patch('time.monotonic')
+    def test_ejects_and_probes_failing_node(self, monotonic):
+        monotonic.return_value = 0
+        balancer = LoadBalancer(['http://a', 'http://b'],
+                                failure_threshold=2, ejection_time=10)
+        bad = balancer.nodes[0]
+        for _ in range(2):
+            bad.outstanding += 1
+            balancer.release(bad, ok=False)
+        self.assertFalse(bad.healthy)
+        for _ in range(5):
+            node = balancer.acquire()
+            self.assertEqual(node.url, 'http://b')
+            balancer.release(node, ok=True)
+
+        monotonic.return_value = 10
+        probe = balancer.acquire()
+        self.assertIs(probe, bad)
+        balancer.release(probe, ok=False)
+        # A failed probe doubles the ejection time
+        self.assertEqual(bad.ejected_until, 30)
+
+        monotonic.return_value = 30
+        probe = balancer.acquire()
+        self.assertIs(probe, bad)
+        balancer.release(probe, ok=True)
+        self.assertTrue(bad.healthy)
+
+    def test_fails_open_when_every_node_is_ejected(self):
+        balancer = LoadBalancer(['http://a'], failure_threshold=1)
+        node = balancer.acquire()
+        balancer.release(node, ok=False)
+        self.assertIs(balancer.acquire(), node)
+
+
+class FlakyTransport(FakeTransport):
+
+    errors = (ConnectionError,)
+
+    def __init__(self, hydra, down):
+        super().__init__(hydra)
+        self.down = down
+        self.hosts = Counter()
+
+    def request(self, method, url, **kwargs):
+        host = url.split('/')[2]
+        self.hosts[host] += 1
+        if host in self.down:
+            raise ConnectionError(host)
+        return super().request(method, url, **kwargs)
+
+
+class ClientBalancingTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.fake = FakeHydra()
+        self.fake.add_client('abc')
+
+    def test_spreads_requests_over_replicas(self):
+        transport = FlakyTransport(self.fake, down=())
+        hydra = Hydra('http://public', ['http://a', 'http://b'],
+                      'client', 'secret', transport=transport)
+        self.assertEqual(hydra.adminhost, 'http://a')
+        for _ in range(20):
+            self.assertEqual(hydra.clients.get('abc').id, 'abc')
+        self.assertEqual(set(transport.hosts), {'a', 'b'})
+
+    def test_retries_and_ejects_failing_replica(self):
+        transport = FlakyTransport(self.fake, down=('a',))
+        hydra = Hydra('http://public', ['http://a', 'http://b'],
+                      'client', 'secret', transport=transport,
+                      retry=RetryPolicy(retries=3, backoff=0))
+        for _ in range(20):
+            self.assertEqual(hydra.clients.get('abc').id, 'abc')
+        self.assertLessEqual(transport.hosts['a'], 3)
+        self.assertFalse(hydra.admin_balancer.nodes[0].healthy)
@@ -0,0 +1,160 @@
+# Copyright (C) 2017 O.S. Systems Software LTDA.
+# This software is released under the MIT License
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest.mock import Mock, patch
+
+from hydra import Client, Hydra
+from hydra.bulk import BulkReport, iter_many, run_many, run_report
+from hydra.exceptions import HydraResponseError
+from hydra.fake import FakeHydra, FakeTransport
+
+
+class RunManyTestCase(unittest.TestCase):
+
+    def test_returns_results_in_input_order(self):
+        results = run_many(lambda n: n * 2, [3, 1, 2], max_workers=3)
+        self.assertEqual([r.value for r in results], [6, 2, 4])
+        self.assertTrue(all(r.ok for r in results))
+
+    def test_failures_do_not_abort_the_batch(self):
+        def fn(n):
+            if n == 2:
+                raise ValueError('boom')
+            return n
+
+        results = run_many(fn, [1, 2, 3])
+        self.assertEqual([r.ok for r in results], [True, False, True])
+        self.assertIsInstance(results[1].error, ValueError)
+
+    def test_empty_result_is_a_failure(self):
+        result, = run_many(lambda n: None, [1])
+        self.assertFalse(result.ok)
+        self.assertIsInstance(result.error, HydraResponseError)
+
+    def test_reports_progress(self):
+        progress = Mock()
+        run_many(lambda n: n, [1, 2, 3], progress=progress)
+        self.assertEqual(progress.call_count, 3)
+        last = progress.call_args[0][0]
+        self.assertEqual((last.completed, last.failed, last.total),
+                         (3, 0, 3))
+
+    def test_bounds_work_in_flight(self):
+        lock = threading.Lock()
+        state = {'running': 0, 'peak': 0}
+
+        def fn(n):
+            with lock:
+                state['running'] += 1
+                state['peak'] = max(state['peak'], state['running'])
+            with lock:
+                state['running'] -= 1
+            return n
+
+        pulled = []
+
+        def items():
+            for n in range(100):
+                pulled.append(n)
+                yield n
+
+        results = iter_many(fn, items(), max_workers=2)
+        next(results)
+        self.assertLessEqual(len(pulled), 5)
+        self.assertEqual(len(list(results)), 99)
+        self.assertLessEqual(state['peak'], 2)
+
+
+class ClientManagerBulkTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.hydra = Hydra('http://localhost:4444', 'http://localhost:4445',
+                           'client', 'secret')
+        patcher = patch('requests.Session.request')
+        self.request = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_create_many(self):
+        def respond(method, url, json=None, **kwargs):
+            ok = json['client_name'] != 'bad'
+            return Mock(ok=ok, json=Mock(return_value=json))
+
+        self.request.side_effect = respond
+        clients = [Client(name='a'), Client(name='bad'), Client(name='c')]
+        results = self.hydra.clients.create_many(clients, max_workers=2)
+        self.assertEqual([r.ok for r in results], [True, False, True])
+        self.assertEqual(results[0].value.name, 'a')
+        self.assertIs(results[1].item, clients[1])
+
+    def test_delete_many(self):
+        self.request.return_value = Mock(ok=True)
+        results = self.hydra.clients.delete_many(['a', 'b'])
+        self.assertTrue(all(r.ok for r in results))
+        self.assertEqual(self.request.call_count, 2)
+
+
+class BulkReportTestCase(unittest.TestCase):
+
+    def test_resumes_from_saved_report(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'report.json')
+        down = {'b', ('c', 'x')}
+
+        def fn(item):
+            return item not in down
+
+        report = run_report(fn, ['a', 'b', ('c', 'x')], checkpoint=path)
+        self.assertFalse(report.ok)
+        self.assertEqual(sorted(map(str, report.failed_items())),
+                         ["('c', 'x')", 'b'])
+
+        down.clear()
+        calls = []
+        report = run_report(lambda item: calls.append(item) or True,
+                            ['a', 'b', ['c', 'x']],
+                            report=BulkReport.load(path))
+        self.assertTrue(report.ok)
+        self.assertEqual(len(report), 3)
+        self.assertNotIn('a', calls)
+
+
+class SessionBulkTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.fake = FakeHydra()
+        for subject in ('alice', 'bob'):
+            for client in ('web', 'cli'):
+                self.fake.add_consent_request(
+                    subject + client, subject, client_id=client)
+                self.fake.consent_sessions[subject].append(
+                    {'consent_request':
+                     self.fake.consent_requests[subject + client]})
+        self.fake.login_sessions.update(['alice', 'bob'])
+        self.hydra = Hydra('http://hydra', 'http://hydra', 'client',
+                           'secret', transport=FakeTransport(self.fake))
+
+    def test_revokes_consent_sessions(self):
+        report = self.hydra.revoke_consent_sessions_many(
+            ['alice', ('bob', 'web')])
+        self.assertTrue(report.ok)
+        self.assertEqual(report.succeeded, {'alice', ('bob', 'web')})
+        self.assertNotIn('alice', self.fake.consent_sessions)
+        self.assertEqual(len(self.fake.consent_sessions['bob']), 1)
+
+    def test_invalidates_authentication_sessions(self):
+        report = self.hydra.invalidate_authentication_sessions_many(
+            ['alice', 'bob'])
+        self.assertTrue(report.ok)
+        self.assertEqual(self.fake.login_sessions, set())
+
+    def test_iter_consent_sessions(self):
+        results = {result.item: result.value for result in
+                   self.hydra.iter_consent_sessions(['alice', 'carol'])}
+        self.assertEqual(len(results['alice']), 2)
+        self.assertEqual(results['carol'], [])
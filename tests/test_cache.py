@@ -0,0 +1,126 @@
+# Copyright (C) 2017 O.S. Systems Software LTDA.
+# This software is released under the MIT License
+
+import time
+import unittest
+from unittest.mock import patch
+
+from hydra.cache import IntrospectionCache, TokenStore, TTLCache
+from hydra.oauth2 import Client, Token
+
+
+class TTLCacheTestCase(unittest.TestCase):
+
+    def test_get_and_set(self):
+        cache = TTLCache()
+        self.assertIsNone(cache.get('a'))
+        cache.set('a', 1)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_evicts_least_recently_used(self):
+        cache = TTLCache(maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    @patch('time.monotonic')
+    def test_entries_expire(self, monotonic):
+        monotonic.return_value = 100
+        cache = TTLCache(ttl=10)
+        cache.set('a', 1)
+        monotonic.return_value = 110
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['expirations'], 1)
+        self.assertEqual(len(cache), 0)
+
+    def test_ttl_is_bounded_by_max_ttl(self):
+        cache = TTLCache(ttl=10)
+        cache.set('a', 1, ttl=1000)
+        deadline, _ = cache._data['a']
+        self.assertLessEqual(deadline, time.monotonic() + 10)
+
+
+class IntrospectionCacheTestCase(unittest.TestCase):
+
+    def test_does_not_keep_raw_tokens(self):
+        cache = IntrospectionCache()
+        cache.set('super-token', {'active': True})
+        self.assertNotIn('super-token', cache._data)
+        self.assertEqual(cache.get('super-token'), {'active': True})
+
+    def test_entries_never_outlive_token_exp(self):
+        cache = IntrospectionCache(ttl=60)
+        cache.set('super-token', {'active': True, 'exp': time.time() - 1})
+        self.assertIsNone(cache.get('super-token'))
+
+    def test_inactive_tokens_use_negative_ttl(self):
+        cache = IntrospectionCache(ttl=60, negative_ttl=2)
+        cache.set('super-token', {'active': False})
+        deadline, _ = cache._data[cache.key('super-token')]
+        self.assertLessEqual(deadline, time.monotonic() + 2)
+
+
+class TokenStoreTestCase(unittest.TestCase):
+
+    @patch('time.monotonic')
+    def test_expired_tokens_are_purged(self, monotonic):
+        monotonic.return_value = 0
+        store = TokenStore()
+        for index in range(10):
+            store[index] = Token(access_token=str(index),
+                                 expires_in=index + 1)
+        self.assertEqual(len(store), 10)
+        monotonic.return_value = 5
+        self.assertEqual(store.purge(), 5)
+        self.assertNotIn(4, store)
+        self.assertEqual(store[5].token, '5')
+
+    @patch('time.monotonic')
+    def test_replaced_token_is_not_purged_early(self, monotonic):
+        monotonic.return_value = 0
+        store = TokenStore()
+        store.set('a', Token(access_token='old', expires_in=1))
+        store.set('a', Token(access_token='new', expires_in=100))
+        monotonic.return_value = 10
+        self.assertEqual(store.purge(), 0)
+        self.assertEqual(store.get('a').token, 'new')
+
+    def test_stale_entries_are_compacted(self):
+        store = TokenStore()
+        for _ in range(1000):
+            store.set('a', Token(access_token='t', expires_in=60))
+        self.assertLess(len(store._heap), 100)
+
+
+class ClientIntrospectionCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = IntrospectionCache()
+        self.client = Client(
+            'http://localhost:4444', 'http://localhost:4445',
+            'client', 'secret', introspection_cache=self.cache)
+        self.token = Token(access_token='super-token')
+
+    @patch('requests.Session.request')
+    def test_instrospect_token_uses_cache(self, request):
+        request.return_value.ok = True
+        request.return_value.json.return_value = {'active': True}
+        self.client.instrospect_token(self.token)
+        result = self.client.instrospect_token(self.token)
+        self.assertEqual(result, {'active': True})
+        self.assertEqual(request.call_count, 1)
+        self.assertEqual(self.cache.stats()['hits'], 1)
+
+    @patch('requests.Session.request')
+    def test_revoke_token_evicts_cache_entry(self, request):
+        request.return_value.json.return_value = {'active': True}
+        self.client.instrospect_token(self.token)
+        self.client.revoke_token(self.token)
+        self.assertIsNone(self.cache.get('super-token'))
+        self.assertEqual(self.cache.stats()['invalidations'], 1)
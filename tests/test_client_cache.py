@@ -0,0 +1,86 @@
+# Copyright (C) 2017 O.S. Systems Software LTDA.
+# This software is released under the MIT License
+
+import unittest
+
+from hydra import Client, Hydra
+from hydra.cache import TTLCache
+from hydra.fake import FakeHydra, FakeTransport
+
+
+class ClientCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.fake = FakeHydra()
+        self.fake.add_client('abc', client_name='old', scope='a b')
+        self.cache = TTLCache(maxsize=1000, ttl=60)
+        self.hydra = Hydra('http://hydra', 'http://hydra', 'client',
+                           'secret', transport=FakeTransport(self.fake),
+                           client_cache=self.cache)
+
+    def test_get_reads_through(self):
+        self.assertEqual(self.hydra.clients.get('abc').name, 'old')
+        client = self.hydra.clients.get('abc')
+        self.assertEqual(client.scopes, ['a', 'b'])
+        self.assertEqual(self.fake.calls, 1)
+        self.assertEqual(self.cache.stats()['hits'], 1)
+
+    def test_returned_clients_are_copies(self):
+        self.hydra.clients.get('abc').name = 'changed'
+        self.assertEqual(self.hydra.clients.get('abc').name, 'old')
+
+    def test_update_refreshes_entry(self):
+        client = self.hydra.clients.get('abc')
+        client.name = 'new'
+        self.hydra.clients.update(client)
+        calls = self.fake.calls
+        self.assertEqual(self.hydra.clients.get('abc').name, 'new')
+        self.assertEqual(self.fake.calls, calls)
+
+    def test_delete_invalidates_entry(self):
+        self.hydra.clients.get('abc')
+        self.assertTrue(self.hydra.clients.delete('abc'))
+        self.assertIsNone(self.hydra.clients.get('abc'))
+
+    def test_create_caches_without_secret(self):
+        self.hydra.clients.create(Client(client_id='new', secret='s'))
+        calls = self.fake.calls
+        client = self.hydra.clients.get('new')
+        self.assertIsNone(client.secret)
+        self.assertEqual(self.fake.calls, calls)
+
+    def test_warm_preloads_every_client(self):
+        for index in range(120):
+            self.fake.add_client('client-{}'.format(index))
+        self.assertEqual(self.hydra.clients.warm(page_size=50), 121)
+        calls = self.fake.calls
+        self.assertEqual(self.hydra.clients.get('client-7').id, 'client-7')
+        self.assertEqual(self.hydra.clients.get('abc').scopes, ['a', 'b'])
+        self.assertEqual(self.fake.calls, calls)
+
+    def test_read_racing_a_write_is_not_cached(self):
+        request = self.hydra.request
+
+        def update_during_get(method, path, **kwargs):
+            response = request(method, path, **kwargs)
+            if method == 'GET':
+                self.hydra.clients.update(Client(client_id='abc', name='new'))
+            return response
+
+        self.hydra.request = update_during_get
+        self.assertEqual(self.hydra.clients.get('abc').name, 'old')
+        self.hydra.request = request
+        self.assertEqual(self.hydra.clients.get('abc').name, 'new')
+
+    def test_warm_requires_cache(self):
+        hydra = Hydra('http://hydra', 'http://hydra', 'client', 'secret',
+                      transport=FakeTransport(self.fake))
+        with self.assertRaises(ValueError):
+            hydra.clients.warm()
+
+    def test_disabled_by_default(self):
+        hydra = Hydra('http://hydra', 'http://hydra', 'client', 'secret',
+                      transport=FakeTransport(self.fake))
+        hydra.clients.get('abc')
+        hydra.clients.get('abc')
+        self.assertEqual(self.fake.calls, 2)
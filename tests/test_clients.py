@@ -3,9 +3,12 @@
 
 import unittest
 
+import pytest
+
 from hydra import Hydra, Client
 
 
+@pytest.mark.usefixtures('hydra_fixture')
 class ClientsTestCase(unittest.TestCase):
 
     def setUp(self):
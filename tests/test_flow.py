@@ -0,0 +1,120 @@
+# Copyright (C) 2017 O.S. Systems Software LTDA.
+# This software is released under the MIT License
+
+import threading
+import unittest
+from unittest.mock import Mock, patch
+
+from hydra import Hydra
+from hydra.exceptions import HydraResponseError
+from hydra.fake import FakeHydra, FakeTransport
+
+
+class LoginConsentFlowTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.fake = FakeHydra()
+        self.hydra = Hydra('http://hydra', 'http://hydra', 'client',
+                           'secret', transport=FakeTransport(self.fake))
+        self.addCleanup(self.hydra.close)
+
+    def test_login_accepts_authenticated_user(self):
+        self.fake.add_login_request('login', skip=False)
+        result = self.hydra.flow.login('login', lambda: 'alice',
+                                       remember=True)
+        self.assertTrue(result.accepted)
+        self.assertFalse(result.skipped)
+        self.assertIn('login_verifier', result.redirect_to)
+        self.assertIn('alice', self.fake.login_sessions)
+        self.assertEqual(
+            set(result.timings),
+            {'get_login_request', 'authenticate', 'accept_login_request',
+             'total'})
+
+    def test_login_skip_accepts_without_authenticating(self):
+        self.fake.add_login_request('login', subject='bob', skip=True)
+        authenticate = Mock()
+        result = self.hydra.flow.login('login', authenticate,
+                                       concurrent=False)
+        self.assertTrue(result.skipped)
+        authenticate.assert_not_called()
+        self.assertIn('bob', self.fake.login_sessions)
+
+    def test_login_rejects_failed_authentication(self):
+        self.fake.add_login_request('login')
+        result = self.hydra.flow.login('login', lambda: None)
+        self.assertFalse(result.accepted)
+        self.assertIn('error=access_denied', result.redirect_to)
+
+    def test_authentication_runs_while_fetching(self):
+        fetching = threading.Event()
+        get_login_request = self.hydra.get_login_request
+
+        def slow_get(challenge):
+            fetching.set()
+            return get_login_request(challenge)
+
+        self.hydra.get_login_request = slow_get
+        self.fake.add_login_request('login')
+
+        def authenticate():
+            self.assertTrue(fetching.wait(1))
+            return 'alice'
+
+        self.assertTrue(self.hydra.flow.login('login', authenticate).accepted)
+
+    def test_unknown_challenge_raises(self):
+        with self.assertRaises(HydraResponseError):
+            self.hydra.flow.login('missing', lambda: 'alice')
+
+    def test_consent_grants_scopes_and_session(self):
+        self.fake.add_consent_request('consent', 'alice',
+                                      requested_scope=['openid', 'devices'])
+        self.hydra.flow.prefetch_consent('consent')
+        result = self.hydra.flow.consent(
+            'consent', lambda request: ['openid'],
+            session=lambda: {'id_token': {'email': 'a@example.com'}})
+        self.assertTrue(result.accepted)
+        session, = self.fake.consent_sessions['alice']
+        self.assertEqual(session['grant_scope'], ['openid'])
+        self.assertIn('get_consent_request', result.timings)
+        self.assertIn('session', result.timings)
+
+    def test_prefetches_are_bounded(self):
+        flow = self.hydra.flow
+        flow.max_prefetched = 2
+        for challenge in ('a', 'b', 'c'):
+            self.fake.add_consent_request(challenge, 'alice')
+            flow.prefetch_consent(challenge)
+        self.assertEqual(list(flow._prefetched), ['b', 'c'])
+
+    @patch('time.monotonic')
+    def test_abandoned_prefetches_expire(self, monotonic):
+        monotonic.return_value = 0
+        flow = self.hydra.flow
+        self.fake.add_consent_request('abandoned', 'alice')
+        self.fake.add_consent_request('consent', 'alice')
+        flow.prefetch_consent('abandoned')
+        monotonic.return_value = flow.prefetch_ttl
+        flow.prefetch_consent('consent')
+        self.assertEqual(list(flow._prefetched), ['consent'])
+        monotonic.return_value = flow.prefetch_ttl * 2
+        result = flow.consent('consent', lambda request: ['openid'])
+        self.assertTrue(result.accepted)
+        self.assertEqual(len(flow._prefetched), 0)
+
+    def test_consent_skip_grants_requested_scopes(self):
+        self.fake.add_consent_request('consent', 'alice', skip=True,
+                                      requested_scope=['openid'])
+        grant = Mock()
+        result = self.hydra.flow.consent('consent', grant)
+        self.assertTrue(result.skipped)
+        grant.assert_not_called()
+        session, = self.fake.consent_sessions['alice']
+        self.assertEqual(session['grant_scope'], ['openid'])
+
+    def test_consent_rejection(self):
+        self.fake.add_consent_request('consent', 'alice')
+        result = self.hydra.flow.consent('consent', lambda request: None)
+        self.assertFalse(result.accepted)
+        self.assertEqual(self.fake.consent_sessions['alice'], [])
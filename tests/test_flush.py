@@ -0,0 +1,89 @@
+# Copyright (C) 2017 O.S. Systems Software LTDA.
+# This software is released under the MIT License
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import Mock, patch
+
+from hydra import Hydra
+from hydra.exceptions import HydraResponseError
+from hydra.fake import FakeHydra, FakeTransport
+from hydra.flush import FlushScheduler, rfc3339
+
+NOW = 1500000000.0
+
+
+class FlushSchedulerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.state = os.path.join(directory, 'flush.json')
+        self.since = datetime.fromtimestamp(NOW - 10000, timezone.utc)
+        self.client = Mock()
+        self.client.flush_expired_oAuth2_access_tokens.return_value = Mock()
+
+    def test_rfc3339(self):
+        self.assertEqual(rfc3339(NOW), '2017-07-14T02:40:00Z')
+
+    @patch('time.time', return_value=NOW)
+    def test_walks_windows_until_caught_up(self, _):
+        scheduler = FlushScheduler(self.client, self.since, window=1000,
+                                   pause=0)
+        scheduler.run()
+        calls = [call[0][0]['notAfter'] for call in
+                 self.client.flush_expired_oAuth2_access_tokens.call_args_list]
+        # Fast flushes double the window: 1000, 2000, 4000, then up to now
+        self.assertEqual(calls, [rfc3339(NOW - 9000), rfc3339(NOW - 7000),
+                                 rfc3339(NOW - 3000), rfc3339(NOW)])
+        self.assertTrue(scheduler.caught_up)
+
+    @patch('time.time', return_value=NOW)
+    def test_shrinks_window_when_flushes_are_slow(self, _):
+        scheduler = FlushScheduler(self.client, self.since, window=1000,
+                                   target_duration=1.0)
+        with patch('time.monotonic', side_effect=[0, 2]):
+            scheduler.step()
+        self.assertEqual(scheduler.window, 500)
+
+    @patch('time.time', return_value=NOW)
+    def test_resumes_from_state(self, _):
+        scheduler = FlushScheduler(self.client, self.since, window=1000,
+                                   state_path=self.state)
+        scheduler.step()
+        resumed = FlushScheduler(self.client, state_path=self.state)
+        self.assertEqual(resumed.cursor, NOW - 9000)
+        self.assertEqual(resumed.window, 2000)
+
+    def test_requires_start(self):
+        with self.assertRaises(ValueError):
+            FlushScheduler(self.client)
+
+    @patch('time.time', return_value=NOW)
+    def test_failed_flush_keeps_cursor(self, _):
+        self.client.flush_expired_oAuth2_access_tokens.return_value = None
+        scheduler = FlushScheduler(self.client, self.since)
+        with self.assertRaises(HydraResponseError):
+            scheduler.step()
+        self.assertEqual(scheduler.cursor, NOW - 10000)
+
+    def test_background_thread_flushes_fake_hydra(self):
+        fake = FakeHydra()
+        expired = fake.issue_token(expires_in=-100)
+        active = fake.issue_token()
+        hydra = Hydra('http://hydra', 'http://hydra', 'client', 'secret',
+                      transport=FakeTransport(fake))
+        scheduler = FlushScheduler(
+            hydra, datetime.fromtimestamp(time.time() - 3600, timezone.utc),
+            window=600, pause=0).start(interval=60)
+        for _ in range(100):
+            if scheduler.caught_up:
+                break
+            time.sleep(0.01)
+        scheduler.stop(timeout=1)
+        self.assertNotIn(expired, fake.tokens)
+        self.assertIn(active, fake.tokens)
@@ -0,0 +1,62 @@
+# Copyright (C) 2017 O.S. Systems Software LTDA.
+# This software is released under the MIT License
+
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+# py.test only puts tests/ on the path, and benchmarks is not installed
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.importtime import measure  # noqa: E402
+
+# Generous enough for slow CI machines, tight enough to catch the HTTP
+# stack or asyncio sneaking back into the import path
+IMPORT_BUDGET_MS = {
+    'import hydra': 20,
+    'from hydra import Hydra': 150,
+}
+
+HEAVY_MODULES = ('requests', 'urllib3', 'httpx', 'asyncio', 'jwt',
+                 'sqlite3', 'concurrent.futures', 'hydra.clients')
+
+
+def imported_modules(statement):
+    output = subprocess.run(
+        [sys.executable, '-c', statement +
+         '; import sys, json; print(json.dumps(sorted(sys.modules)))'],
+        cwd=ROOT, stdout=subprocess.PIPE, universal_newlines=True,
+        check=True).stdout
+    return set(json.loads(output))
+
+
+class ImportTestCase(unittest.TestCase):
+
+    def test_import_budget(self):
+        for statement, budget in IMPORT_BUDGET_MS.items():
+            total, modules = measure(statement, runs=3)
+            self.assertLess(total / 1e3, budget,
+                            '{}: {}'.format(statement, modules[:5]))
+
+    def test_constructing_hydra_does_not_load_http_stack(self):
+        modules = imported_modules(
+            "from hydra import Hydra; Hydra('http://a', 'http://b', 'c', 's')")
+        self.assertFalse(modules.intersection(HEAVY_MODULES))
+
+    def test_managers_load_on_first_use(self):
+        modules = imported_modules(
+            "from hydra import Hydra; "
+            "Hydra('http://a', 'http://b', 'c', 's').clients")
+        self.assertIn('hydra.clients', modules)
+        self.assertNotIn('requests', modules)
+
+    def test_lazy_exports(self):
+        import hydra
+        self.assertEqual(hydra.Client.__module__, 'hydra.clients')
+        self.assertIn('AsyncHydra', dir(hydra))
+        with self.assertRaises(AttributeError):
+            hydra.Missing
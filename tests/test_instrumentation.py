@@ -0,0 +1,141 @@
+# Copyright (C) 2017 O.S. Systems Software LTDA.
+# This software is released under the MIT License
+
+import unittest
+from datetime import timedelta
+from unittest.mock import Mock, patch
+
+import requests
+
+from hydra import Hydra
+from hydra.exceptions import HydraRequestError
+from hydra.fake import FakeHydra, FakeTransport
+from hydra.resilience import RetryPolicy
+from hydra.instrumentation import (
+    Hook, InMemoryHistogram, OpenTelemetryHook, RequestEvent, endpoint_name)
+from hydra.oauth2 import Token
+
+
+def make_response(status=200, content=b'{"active": true}'):
+    response = requests.Response()
+    response.status_code = status
+    response._content = content
+    response.elapsed = timedelta(milliseconds=1)
+    response.request = requests.Request(
+        'POST', 'http://localhost:4445/oauth2/introspect',
+        data={'token': 'super-token'}).prepare()
+    return response
+
+
+class RecordingHook(Hook):
+
+    def __init__(self):
+        self.events = []
+
+    def on_request(self, event):
+        self.events.append(event)
+
+
+class RequestHooksTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.hook = RecordingHook()
+        self.hydra = Hydra('http://localhost:4444', 'http://localhost:4445',
+                           'client', 'secret', hooks=[self.hook])
+        patcher = patch('requests.Session.request',
+                        return_value=make_response())
+        self.request = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_endpoint_names(self):
+        self.assertEqual(endpoint_name('GET', '/clients/abc'),
+                         'GET /clients/{id}')
+        self.assertEqual(endpoint_name('POST', '/oauth2/introspect'),
+                         'POST /oauth2/introspect')
+
+    def test_emits_event_per_request(self):
+        self.hydra.instrospect_token(Token(access_token='super-token'))
+        event, = self.hook.events
+        self.assertEqual(event.endpoint, 'POST /oauth2/introspect')
+        self.assertEqual(event.status, 200)
+        self.assertEqual(event.bytes_received, 16)
+        self.assertEqual(event.bytes_sent, len('token=super-token'))
+        self.assertEqual(event.timings['ttfb'], 0.001)
+        self.assertGreaterEqual(event.duration, 0)
+
+    def test_unmeasured_ttfb_is_left_out(self):
+        hydra = Hydra('http://hydra', 'http://hydra', 'client', 'secret',
+                      hooks=[self.hook], transport=FakeTransport(FakeHydra()))
+        hydra.clients.get('abc')
+        event, = self.hook.events
+        self.assertNotIn('ttfb', event.timings)
+        self.assertNotIn('body', event.timings)
+
+    def test_explicit_endpoint_name(self):
+        self.hydra.request('GET', '/clients/abc', endpoint='clients.get')
+        self.assertEqual(self.hook.events[0].endpoint, 'clients.get')
+
+    def test_records_errors_and_retries(self):
+        self.request.side_effect = requests.ConnectionError()
+        self.hydra.retry = RetryPolicy(backoff=0)
+        with self.assertRaises(HydraRequestError):
+            self.hydra.clients.get('abc')
+        self.assertEqual([e.retries for e in self.hook.events], [0, 1, 2])
+        event = self.hook.events[-1]
+        self.assertIsInstance(event.error, requests.ConnectionError)
+        self.assertEqual(event.endpoint, 'GET /clients/{id}')
+
+    def test_failing_hook_does_not_break_requests(self):
+        broken = Mock(on_request=Mock(side_effect=RuntimeError))
+        self.hydra.hooks.insert(0, broken)
+        self.assertEqual(
+            self.hydra.instrospect_token(Token(access_token='t')),
+            {'active': True})
+        self.assertEqual(len(self.hook.events), 1)
+
+
+class InMemoryHistogramTestCase(unittest.TestCase):
+
+    def event(self, duration, status=200, endpoint='GET /clients'):
+        event = RequestEvent(endpoint, 'GET', 'http://hydra/clients', 0.0)
+        event.duration = duration
+        event.status = status
+        return event
+
+    def test_percentiles(self):
+        histogram = InMemoryHistogram(buckets=(0.1, 1.0))
+        for duration in (0.05, 0.05, 0.5, 2.0):
+            histogram.on_request(self.event(duration))
+        self.assertEqual(histogram.count('GET /clients'), 4)
+        self.assertEqual(histogram.percentile('GET /clients', 0.5), 0.1)
+        self.assertEqual(histogram.percentile('GET /clients', 0.75), 1.0)
+        self.assertEqual(histogram.percentile('GET /clients', 0.99),
+                         float('inf'))
+
+    def test_prometheus_export(self):
+        histogram = InMemoryHistogram(buckets=(0.1,))
+        histogram.on_request(self.event(0.05))
+        histogram.on_request(self.event(0.5, status=500))
+        text = histogram.prometheus()
+        self.assertIn('hydra_sdk_request_duration_seconds_bucket'
+                      '{endpoint="GET /clients",le="0.1"} 1', text)
+        self.assertIn('hydra_sdk_request_duration_seconds_count'
+                      '{endpoint="GET /clients"} 2', text)
+        self.assertIn('hydra_sdk_responses_total'
+                      '{endpoint="GET /clients",status="500"} 1', text)
+
+
+class OpenTelemetryHookTestCase(unittest.TestCase):
+
+    def test_creates_span(self):
+        tracer = Mock()
+        event = RequestEvent('GET /clients', 'GET', 'http://hydra/clients', 2)
+        event.duration = 0.5
+        event.status = 200
+        OpenTelemetryHook(tracer).on_request(event)
+        tracer.start_span.assert_called_once()
+        self.assertEqual(tracer.start_span.call_args[1]['start_time'],
+                         2000000000)
+        span = tracer.start_span.return_value
+        span.set_attribute.assert_any_call('http.status_code', 200)
+        span.end.assert_called_once_with(end_time=2500000000)
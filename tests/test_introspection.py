@@ -0,0 +1,102 @@
+# Copyright (C) 2017 O.S. Systems Software LTDA.
+# This software is released under the MIT License
+
+import threading
+import time
+import unittest
+from unittest.mock import Mock, patch
+
+import requests
+
+from hydra.cache import IntrospectionCache
+from hydra.oauth2 import Client, Token
+
+
+class IntrospectManyTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.client = Client('http://localhost:4444', 'http://localhost:4445',
+                             'client', 'secret')
+        patcher = patch('requests.Session.request', side_effect=self.serve)
+        self.request = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.release = threading.Event()
+        self.release.set()
+
+    def serve(self, method, url, data=None, **kwargs):
+        if url.endswith('/introspect'):
+            self.release.wait(1)
+        if data['token'] == 'down':
+            raise requests.ConnectionError()
+        result = {'active': data['token'] != 'bad', 'sub': data['token']}
+        return Mock(status_code=200, ok=True, json=Mock(return_value=result))
+
+    def test_returns_results_in_input_order(self):
+        tokens = [Token(access_token=value) for value in ('a', 'b', 'a', 'c')]
+        results = self.client.introspect_many(tokens)
+        self.assertEqual([r['sub'] for r in results], ['a', 'b', 'a', 'c'])
+
+    def test_deduplicates_tokens(self):
+        tokens = [Token(access_token=value) for value in ('a', 'a', 'bad')]
+        results = self.client.introspect_many(tokens, max_workers=2)
+        self.assertEqual(self.request.call_count, 2)
+        self.assertFalse(results[2]['active'])
+
+    def test_failed_lookup_does_not_fail_batch(self):
+        self.client.retry = None
+        tokens = [Token(access_token=value) for value in ('a', 'down', 'b')]
+        results = self.client.introspect_many(tokens)
+        self.assertEqual(results[0]['sub'], 'a')
+        self.assertIsNone(results[1])
+        self.assertEqual(results[2]['sub'], 'b')
+
+    def test_reuses_one_executor_until_closed(self):
+        tokens = [Token(access_token=value) for value in ('a', 'b')]
+        self.client.introspect_many(tokens)
+        executor = self.client._executor
+        self.client.introspect_many(tokens)
+        self.assertIs(self.client._executor, executor)
+        self.client.close()
+        self.assertIsNone(self.client._executor)
+
+    def test_cache_hits_skip_the_executor(self):
+        self.client.introspection_cache = cache = IntrospectionCache()
+        cache.set('a', {'active': True, 'sub': 'a'})
+        cache.set('b', {'active': True, 'sub': 'b'})
+        tokens = [Token(access_token=value) for value in ('a', 'b', 'c')]
+        results = self.client.introspect_many(tokens)
+        self.assertEqual([r['sub'] for r in results], ['a', 'b', 'c'])
+        self.assertEqual(self.request.call_count, 1)
+        self.assertIsNone(self.client._executor)
+
+    def test_concurrent_callers_share_request(self):
+        self.release.clear()
+        results = []
+
+        def introspect():
+            results.append(
+                self.client.instrospect_token(Token(access_token='a')))
+
+        threads = [threading.Thread(target=introspect) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.05)
+        self.release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.request.call_count, 1)
+        self.assertEqual(len(results), 8)
+
+    def test_revoke_during_lookup_is_not_undone(self):
+        self.client.introspection_cache = cache = IntrospectionCache()
+        self.release.clear()
+        token = Token(access_token='a')
+        thread = threading.Thread(
+            target=self.client.instrospect_token, args=(token,))
+        thread.start()
+        while self.request.call_count == 0:
+            time.sleep(0.01)
+        self.client.revoke_token(token)
+        self.release.set()
+        thread.join()
+        self.assertIsNone(cache.get('a'))
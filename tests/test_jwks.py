@@ -0,0 +1,156 @@
+# Copyright (C) 2017 O.S. Systems Software LTDA.
+# This software is released under the MIT License
+
+import json
+import threading
+import time
+import unittest
+from unittest.mock import Mock, patch
+
+try:
+    import jwt
+    from cryptography.hazmat.primitives.asymmetric import rsa
+except ImportError:  # pragma: no cover
+    jwt = None
+
+from hydra.jwks import JWKSCache, JWTValidator
+from hydra.oauth2 import Client, Token
+
+
+def generate_key(kid):
+    private_key = rsa.generate_private_key(
+        public_exponent=65537, key_size=2048)
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(
+        private_key.public_key()))
+    jwk.update({'kid': kid, 'alg': 'RS256', 'use': 'sig'})
+    return private_key, jwk
+
+
+@unittest.skipIf(jwt is None, 'PyJWT is not installed')
+class JWTValidatorTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.private_key, cls.jwk = generate_key('key-1')
+        cls.other_private_key, cls.other_jwk = generate_key('key-2')
+
+    def setUp(self):
+        self.client = Client(
+            'http://localhost:4444', 'http://localhost:4445',
+            'client', 'secret')
+        self.jwks = {'keys': [self.jwk]}
+        patcher = patch('requests.Session.request', side_effect=self.serve)
+        self.request = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def serve(self, method, url, **kwargs):
+        self.assertEqual(url, 'http://localhost:4444/.well-known/jwks.json')
+        return Mock(ok=True, json=Mock(return_value=self.jwks))
+
+    def encode(self, private_key=None, kid='key-1', **claims):
+        now = int(time.time())
+        payload = {
+            'iss': 'http://localhost:4444/',
+            'sub': 'user',
+            'client_id': 'client',
+            'scp': ['devices', 'products'],
+            'aud': ['api'],
+            'iat': now,
+            'nbf': now,
+            'exp': now + 60,
+        }
+        payload.update(claims)
+        return Token(access_token=jwt.encode(
+            payload, private_key or self.private_key, algorithm='RS256',
+            headers={'kid': kid}))
+
+    def test_validates_token_locally(self):
+        result = self.client.validate_token(self.encode())
+        self.assertTrue(result['active'])
+        self.assertEqual(result['sub'], 'user')
+        self.assertEqual(result['scope'], 'devices products')
+        self.assertEqual(self.request.call_count, 1)
+
+    def test_keys_are_cached(self):
+        self.client.validate_token(self.encode())
+        self.client.validate_token(self.encode())
+        self.assertEqual(self.request.call_count, 1)
+
+    def test_rejects_expired_token(self):
+        token = self.encode(exp=int(time.time()) - 10)
+        self.assertEqual(self.client.validate_token(token), {'active': False})
+
+    def test_rejects_token_not_yet_valid(self):
+        token = self.encode(nbf=int(time.time()) + 60)
+        self.assertFalse(self.client.validate_token(token)['active'])
+
+    def test_rejects_wrong_issuer(self):
+        token = self.encode(iss='http://evil/')
+        self.assertFalse(self.client.validate_token(token)['active'])
+
+    def test_checks_audience_when_configured(self):
+        self.client.jwt_validator = JWTValidator(self.client, audience='api')
+        self.assertTrue(self.client.validate_token(self.encode())['active'])
+        token = self.encode(aud=['other'])
+        self.assertFalse(self.client.validate_token(token)['active'])
+
+    def test_rejects_bad_signature(self):
+        token = self.encode(private_key=self.other_private_key)
+        self.assertFalse(self.client.validate_token(token)['active'])
+
+    def test_refetches_keys_on_unknown_kid(self):
+        self.client.jwt_validator = JWTValidator(
+            self.client, jwks=JWKSCache(self.client, min_refetch_interval=0))
+        self.client.validate_token(self.encode())
+        self.jwks = {'keys': [self.jwk, self.other_jwk]}
+        token = self.encode(private_key=self.other_private_key, kid='key-2')
+        self.assertTrue(self.client.validate_token(token)['active'])
+        self.assertEqual(self.request.call_count, 2)
+
+    def test_unknown_kid_refetch_is_rate_limited(self):
+        self.client.validate_token(self.encode())
+        token = self.encode(private_key=self.other_private_key, kid='key-2')
+        self.assertFalse(self.client.validate_token(token)['active'])
+        self.assertFalse(self.client.validate_token(token)['active'])
+        self.assertEqual(self.request.call_count, 1)
+
+    @patch('time.monotonic')
+    def test_concurrent_unknown_kids_share_one_refetch(self, monotonic):
+        monotonic.return_value = 0
+        self.client.validate_token(self.encode())
+        monotonic.return_value = 100
+        tokens = [self.encode(private_key=self.other_private_key,
+                              kid='key-{}'.format(index))
+                  for index in range(20)]
+        threads = [threading.Thread(target=self.client.validate_token,
+                                    args=(token,)) for token in tokens]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.request.call_count, 2)
+
+    @patch('time.monotonic')
+    def test_stale_keys_are_refreshed_in_background(self, monotonic):
+        monotonic.return_value = 0
+        self.client.validate_token(self.encode())
+        release = threading.Event()
+        serve = self.request.side_effect
+
+        def slow_serve(*args, **kwargs):
+            release.wait(5)
+            return serve(*args, **kwargs)
+
+        self.request.side_effect = slow_serve
+        monotonic.return_value = 400
+        self.assertTrue(self.client.validate_token(self.encode())['active'])
+        jwks = self.client.jwt_validator.jwks
+        # the validator did not wait for the reload
+        self.assertEqual(jwks._fetched_at, 0)
+        release.set()
+        for _ in range(500):
+            if jwks._fetched_at == 400:
+                break
+            time.sleep(0.01)
+        self.assertEqual(jwks._fetched_at, 400)
+        self.assertEqual(self.request.call_count, 2)
@@ -0,0 +1,91 @@
+# Copyright (C) 2017 O.S. Systems Software LTDA.
+# This software is released under the MIT License
+
+import threading
+import unittest
+from unittest.mock import patch
+
+from hydra import Hydra
+from hydra.exceptions import LimitExceededError
+from hydra.fake import FakeHydra, FakeTransport
+from hydra.limiter import AIMDLimit, Limiter, TokenBucket, endpoint_class
+from hydra.oauth2 import Token
+
+
+class TokenBucketTestCase(unittest.TestCase):
+
+    @patch('time.monotonic', return_value=0)
+    def test_reserves_within_timeout(self, monotonic):
+        bucket = TokenBucket(rate=10, burst=2)
+        self.assertEqual(bucket.reserve(0), 0)
+        self.assertEqual(bucket.reserve(0), 0)
+        self.assertIsNone(bucket.reserve(0))
+        self.assertAlmostEqual(bucket.reserve(1), 0.1)
+        monotonic.return_value = 1
+        self.assertEqual(bucket.reserve(0), 0)
+
+
+class AIMDLimitTestCase(unittest.TestCase):
+
+    def test_increases_additively_and_decreases_multiplicatively(self):
+        limit = AIMDLimit(initial=10, latency_threshold=0.5, backoff=0.5)
+        limit.update(inflight=10, latency=0.1, ok=True)
+        self.assertAlmostEqual(limit.limit, 10.1)
+        limit.update(inflight=1, latency=0.1, ok=True)
+        self.assertAlmostEqual(limit.limit, 10.1)
+        limit.update(inflight=10, latency=1.0, ok=True)
+        self.assertAlmostEqual(limit.limit, 5.05)
+        limit.update(inflight=10, latency=0.1, ok=False)
+        self.assertAlmostEqual(limit.limit, 2.525)
+
+
+class LimiterTestCase(unittest.TestCase):
+
+    def test_endpoint_classes(self):
+        self.assertEqual(endpoint_class('/oauth2/introspect'),
+                         'introspection')
+        self.assertEqual(endpoint_class('/oauth2/token'), 'token')
+        self.assertEqual(endpoint_class('/oauth2/auth/requests/login'),
+                         'consent')
+        self.assertEqual(endpoint_class('/clients/abc'), 'admin')
+
+    def test_rejects_after_bounded_wait(self):
+        limiter = Limiter(concurrency=AIMDLimit(initial=1), max_wait=0.01)
+        permit = limiter.acquire('/clients')
+        with self.assertRaises(LimitExceededError):
+            limiter.acquire('/clients')
+        limiter.release(permit)
+        limiter.release(limiter.acquire('/clients'))
+        self.assertEqual(limiter.stats(), {
+            'limit': 1, 'inflight': 0,
+            'queued': {'admin': 1}, 'rejected': {'admin': 1}})
+
+    def test_queued_call_proceeds_when_slot_frees(self):
+        limiter = Limiter(concurrency=AIMDLimit(initial=1), max_wait=5)
+        permit = limiter.acquire('/clients')
+        threading.Timer(0.05, limiter.release, (permit,)).start()
+        limiter.release(limiter.acquire('/clients'))
+        self.assertEqual(limiter.stats()['queued'], {'admin': 1})
+
+    def test_rate_limits_per_endpoint_class(self):
+        limiter = Limiter(rates={'introspection': (1, 1)}, max_wait=0)
+        limiter.release(limiter.acquire('/oauth2/introspect'))
+        with self.assertRaises(LimitExceededError):
+            limiter.acquire('/oauth2/introspect')
+        limiter.release(limiter.acquire('/clients'))
+        self.assertEqual(limiter.stats()['rejected'], {'introspection': 1})
+
+
+class ClientLimiterTestCase(unittest.TestCase):
+
+    def test_requests_go_through_limiter(self):
+        fake = FakeHydra()
+        token = fake.issue_token()
+        limiter = Limiter(rates={'introspection': (1, 1)}, max_wait=0)
+        hydra = Hydra('http://hydra', 'http://hydra', 'client', 'secret',
+                      transport=FakeTransport(fake), limiter=limiter)
+        self.assertTrue(hydra.instrospect_token(Token(access_token=token)))
+        with self.assertRaises(LimitExceededError):
+            hydra.instrospect_token(Token(access_token='other'))
+        self.assertEqual(limiter.stats()['inflight'], 0)
+        self.assertEqual(fake.calls, 1)
@@ -0,0 +1,163 @@
+# Copyright (C) 2017 O.S. Systems Software LTDA.
+# This software is released under the MIT License
+
+import asyncio
+import json
+import unittest
+from unittest.mock import Mock
+from wsgiref.util import setup_testing_defaults
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+from hydra import AsyncHydra, Hydra
+from hydra.cache import IntrospectionCache
+from hydra.exceptions import HydraRequestError
+from hydra.fake import FakeHydra, FakeTransport
+from hydra.middleware import (
+    ASGIBearerTokenMiddleware, BearerTokenMiddleware, _quote, parse_bearer)
+
+
+def wsgi_app(environ, start_response):
+    start_response('200 OK', [])
+    return [environ['hydra.token'].sub.encode()]
+
+
+async def asgi_app(scope, receive, send):
+    await send({'type': 'http.response.start', 'status': 200,
+                'headers': []})
+    await send({'type': 'http.response.body',
+                'body': scope['hydra.token'].sub.encode()})
+
+
+class ParseBearerTestCase(unittest.TestCase):
+
+    def test_parse_bearer(self):
+        self.assertEqual(parse_bearer('Bearer abc'), 'abc')
+        self.assertEqual(parse_bearer('bearer  abc '), 'abc')
+        self.assertIsNone(parse_bearer('Basic abc'))
+        self.assertIsNone(parse_bearer('Bearer '))
+        self.assertIsNone(parse_bearer(None))
+
+    def test_quote_escapes_header_values(self):
+        self.assertEqual(_quote('say "hi" \\ bye'), '"say \\"hi\\" \\\\ bye"')
+
+
+class MiddlewareTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.fake = FakeHydra()
+        self.token = self.fake.issue_token(
+            scope='devices openid', subject='alice', aud=['api'])
+        self.hydra = Hydra('http://hydra', 'http://hydra', 'client',
+                           'secret', transport=FakeTransport(self.fake),
+                           introspection_cache=IntrospectionCache())
+
+    def call_wsgi(self, middleware, authorization=None):
+        environ = {}
+        setup_testing_defaults(environ)
+        if authorization is not None:
+            environ['HTTP_AUTHORIZATION'] = authorization
+        start_response = Mock()
+        body = b''.join(middleware(environ, start_response))
+        status, headers = start_response.call_args[0]
+        return status, dict(headers), body
+
+    def call_asgi(self, middleware, authorization=None):
+        headers = []
+        if authorization is not None:
+            headers.append((b'authorization', authorization.encode()))
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        asyncio.run(middleware({'type': 'http', 'headers': headers},
+                               None, send))
+        return messages[0]['status'], messages[1]['body']
+
+    def test_wsgi_accepts_valid_token(self):
+        middleware = BearerTokenMiddleware(
+            wsgi_app, self.hydra, scopes=['devices'], audience='api')
+        status, _, body = self.call_wsgi(
+            middleware, 'Bearer ' + self.token)
+        self.assertEqual((status, body), ('200 OK', b'alice'))
+        self.call_wsgi(middleware, 'Bearer ' + self.token)
+        self.assertEqual(self.fake.calls, 1)
+
+    def test_wsgi_rejections(self):
+        middleware = BearerTokenMiddleware(wsgi_app, self.hydra,
+                                           scopes=['admin'])
+        status, headers, _ = self.call_wsgi(middleware)
+        self.assertEqual(status, '401 Unauthorized')
+        self.assertEqual(headers['WWW-Authenticate'], 'Bearer')
+        status, headers, _ = self.call_wsgi(middleware, 'Bearer unknown')
+        self.assertEqual(status, '401 Unauthorized')
+        self.assertIn('invalid_token', headers['WWW-Authenticate'])
+        status, _, body = self.call_wsgi(middleware, 'Bearer ' + self.token)
+        self.assertEqual(status, '403 Forbidden')
+        self.assertEqual(json.loads(body)['error'], 'insufficient_scope')
+
+    def test_wsgi_audience(self):
+        middleware = BearerTokenMiddleware(wsgi_app, self.hydra,
+                                           audience='other')
+        status, _, _ = self.call_wsgi(middleware, 'Bearer ' + self.token)
+        self.assertEqual(status, '401 Unauthorized')
+
+    def test_wsgi_hydra_unavailable(self):
+        error = HydraRequestError(
+            'POST http://hydra-admin.internal:4445/oauth2/introspect '
+            'failed: "connection refused"')
+        self.hydra.lookup_token = Mock(side_effect=error)
+        middleware = BearerTokenMiddleware(wsgi_app, self.hydra)
+        with self.assertLogs('hydra.middleware', 'WARNING'):
+            status, headers, body = self.call_wsgi(
+                middleware, 'Bearer ' + self.token)
+        self.assertEqual(status, '503 Service Unavailable')
+        self.assertNotIn(b'internal', body)
+        self.assertNotIn('internal', headers['WWW-Authenticate'])
+        self.assertEqual(
+            headers['WWW-Authenticate'],
+            'Bearer error="temporarily_unavailable", '
+            'error_description="Token introspection is unavailable"')
+
+    def test_asgi_with_sync_client(self):
+        middleware = ASGIBearerTokenMiddleware(
+            asgi_app, self.hydra, scopes=['devices'])
+        self.assertEqual(self.call_asgi(middleware, 'Bearer ' + self.token),
+                         (200, b'alice'))
+        self.assertEqual(self.call_asgi(middleware, 'Bearer ' + self.token),
+                         (200, b'alice'))
+        self.assertEqual(self.fake.calls, 1)
+        status, _ = self.call_asgi(middleware)
+        self.assertEqual(status, 401)
+
+    def test_asgi_with_async_client(self):
+        class AsyncStub:
+            async def lookup_token(stub, token):
+                return self.hydra.lookup_token(token)
+
+        middleware = ASGIBearerTokenMiddleware(asgi_app, AsyncStub(),
+                                               scopes=['admin'])
+        status, _ = self.call_asgi(middleware, 'Bearer ' + self.token)
+        self.assertEqual(status, 403)
+
+    @unittest.skipIf(httpx is None, 'httpx is not installed')
+    def test_asgi_async_client_unavailable(self):
+        def refuse(request):
+            raise httpx.ConnectError('connection refused', request=request)
+
+        hydra = AsyncHydra('http://hydra', 'http://hydra', 'client',
+                           'secret', transport=httpx.MockTransport(refuse))
+        middleware = ASGIBearerTokenMiddleware(asgi_app, hydra)
+        with self.assertLogs('hydra.middleware', 'WARNING'):
+            status, _ = self.call_asgi(middleware, 'Bearer ' + self.token)
+        self.assertEqual(status, 503)
+
+    def test_asgi_passes_through_lifespan(self):
+        app = Mock(return_value=asyncio.sleep(0))
+        middleware = ASGIBearerTokenMiddleware(app, self.hydra)
+        asyncio.run(middleware({'type': 'lifespan'}, None, None))
+        app.assert_called_once_with({'type': 'lifespan'}, None, None)
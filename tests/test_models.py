@@ -0,0 +1,75 @@
+# Copyright (C) 2017 O.S. Systems Software LTDA.
+# This software is released under the MIT License
+
+import json
+import unittest
+
+from hydra.clients import Client
+from hydra.models import Model, field
+from hydra.oauth2 import Token
+
+
+class Sample(Model):
+
+    fields = (
+        field('id', 'sample_id'),
+        field('name', 'sample_name', aliases=['name']),
+        field('tags', 'tags', default=[], load=str.split, dump=' '.join),
+    )
+
+
+class ModelTestCase(unittest.TestCase):
+
+    def test_uses_slots(self):
+        sample = Sample(sample_id='a')
+        self.assertFalse(hasattr(sample, '__dict__'))
+        with self.assertRaises(AttributeError):
+            sample.unknown = 1
+
+    def test_aliases_take_precedence(self):
+        sample = Sample(name='alias', sample_name='canonical')
+        self.assertEqual(sample.name, 'alias')
+        self.assertEqual(Sample(sample_name='canonical').name, 'canonical')
+
+    def test_converters_and_defaults(self):
+        sample = Sample(tags='a b')
+        self.assertEqual(sample.tags, ['a', 'b'])
+        self.assertEqual(Sample().tags, [])
+        self.assertIsNot(Sample().tags, Sample().tags)
+        self.assertEqual(sample.as_dict(), {'tags': 'a b'})
+
+    def test_json_round_trip(self):
+        sample = Sample.from_json('{"sample_id": "a", "tags": "x y"}')
+        self.assertEqual(json.loads(sample.to_json()),
+                         {'sample_id': 'a', 'tags': 'x y'})
+        samples = Sample.from_json_list('[{"sample_id": "a"}, {}]')
+        self.assertEqual([s.id for s in samples], ['a', None])
+
+
+class ClientModelTestCase(unittest.TestCase):
+
+    def test_reads_aliases(self):
+        client = Client(client_id='id', client_name='name',
+                        client_secret='secret', client_uri='uri')
+        self.assertEqual((client.id, client.name, client.secret, client.uri),
+                         ('id', 'name', 'secret', 'uri'))
+
+    def test_scope_string_precedes_scopes_list(self):
+        self.assertEqual(Client(scope='a b', scopes=['c']).scopes, ['a', 'b'])
+        self.assertEqual(Client(scopes=['c']).scopes, ['c'])
+
+    def test_as_dict_skips_empty_values(self):
+        client = Client(client_id='id', scopes=['a', 'b'])
+        self.assertEqual(client.as_dict(),
+                         {'client_id': 'id', 'scope': 'a b'})
+
+
+class TokenModelTestCase(unittest.TestCase):
+
+    def test_token_keeps_issue_time(self):
+        token = Token(access_token='t', ext={'foo': 'bar'})
+        self.assertIsNotNone(token.issue_time)
+        self.assertEqual(token.ext, {'foo': 'bar'})
+        self.assertEqual(token.as_dict(),
+                         {'access_token': 't', 'expires_in': 0,
+                          'ext': {'foo': 'bar'}})
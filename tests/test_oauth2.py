@@ -1,11 +1,15 @@
 # Copyright (C) 2017 O.S. Systems Software LTDA.
 # This software is released under the MIT License
 
+import threading
+import time
 import unittest
 from unittest.mock import Mock, patch
 
 from hydra.oauth2 import Client, Token
 
+TIMEOUT = (5, 30)
+
 
 class TokenTestCase(unittest.TestCase):
 
@@ -37,6 +41,26 @@ class TokenTestCase(unittest.TestCase):
         token = Token(**self.data)
         self.assertTrue(token.is_expired())
 
+    def test_token_is_expired_with_margin(self):
+        token = Token(**self.data)
+        self.assertFalse(token.is_expired(margin=5))
+        self.assertTrue(token.is_expired(margin=15))
+
+    def test_token_expiry_uses_exp(self):
+        token = Token(access_token='t', exp=time.time() + 60)
+        self.assertFalse(token.is_expired())
+        self.assertTrue(token.is_expired(margin=61))
+        token = Token(access_token='t', expires_in=3600,
+                      exp=time.time() - 1)
+        self.assertTrue(token.is_expired())
+
+    @patch('time.time')
+    def test_token_expiry_ignores_wall_clock_steps(self, wall):
+        wall.return_value = 1000
+        token = Token(access_token='t', exp=1060)
+        wall.return_value = 5000
+        self.assertFalse(token.is_expired())
+
 
 class ClientTestCase(unittest.TestCase):
 
@@ -63,7 +87,7 @@ class ClientTestCase(unittest.TestCase):
         self.assertEqual(c.client, 'client')
         self.assertEqual(c.secret, 'secret')
 
-    @patch('requests.request')
+    @patch('requests.Session.request')
     def test_request_with_basic_authentication(self, request):
         c = Client(**self.data)
         c.request(
@@ -71,18 +95,19 @@ class ClientTestCase(unittest.TestCase):
             auth=('client', 'secret'), json={'token': 'foobar'})
         request.assert_called_with(
             'POST', 'http://localhost:4445/oauth2/token',
-            auth=('client', 'secret'), json={'token': 'foobar'})
+            auth=('client', 'secret'), json={'token': 'foobar'},
+            timeout=TIMEOUT)
 
-    @patch('requests.request')
+    @patch('requests.Session.request')
     def test_request_with_token_authentication(self, request):
         request.return_value.json.return_value = self.token_response
         c = Client(**self.data)
         c.request('GET', '/clients', token=True)
         auth = ('client', 'secret')
         request.assert_called_with(
-            'GET', 'http://localhost:4444/clients', auth=auth)
+            'GET', 'http://localhost:4444/clients', auth=auth, timeout=TIMEOUT)
 
-    @patch('requests.request')
+    @patch('requests.Session.request')
     def test_can_instrospect_token(self, request):
         request.return_value.json.return_value = self.token_response
         c = Client(**self.data)
@@ -90,9 +115,9 @@ class ClientTestCase(unittest.TestCase):
         data = {'token': 'super-token'}
         request.assert_called_with(
             'POST', 'http://localhost:4445/oauth2/introspect',
-            data=data)
+            data=data, timeout=TIMEOUT)
 
-    @patch('requests.request')
+    @patch('requests.Session.request')
     def test_can_revoke_token(self, request):
         c = Client(**self.data)
         c.revoke_token(self.token)
@@ -100,18 +125,18 @@ class ClientTestCase(unittest.TestCase):
         auth = ('client', 'secret')
         request.assert_called_with(
             'POST', 'http://localhost:4444/oauth2/revoke',
-            data=data, auth=auth)
+            data=data, auth=auth, timeout=TIMEOUT)
 
-    @patch('requests.request')
+    @patch('requests.Session.request')
     def test_can_get_login_request(self, request):
         c = Client(**self.data)
         c.get_login_request(self.challenge)
         request.assert_called_with(
             'GET',
             'http://localhost:4445/oauth2/auth/requests/login',
-            params={'login_challenge': self.challenge})
+            params={'login_challenge': self.challenge}, timeout=TIMEOUT)
 
-    @patch('requests.request')
+    @patch('requests.Session.request')
     def test_can_accept_login_request(self, request):
         c = Client(**self.data)
         accept_config = {
@@ -124,18 +149,18 @@ class ClientTestCase(unittest.TestCase):
             'PUT',
             'http://localhost:4445/oauth2/auth/requests/login/accept',
             params={'login_challenge': self.challenge},
-            json=accept_config)
+            json=accept_config, timeout=TIMEOUT)
 
-    @patch('requests.request')
+    @patch('requests.Session.request')
     def test_can_get_consent_request(self, request):
         c = Client(**self.data)
         c.get_consent_request(self.challenge)
         request.assert_called_with(
             'GET',
             'http://localhost:4445/oauth2/auth/requests/consent',
-            params={'consent_challenge': self.challenge})
+            params={'consent_challenge': self.challenge}, timeout=TIMEOUT)
 
-    @patch('requests.request')
+    @patch('requests.Session.request')
     def test_can_accept_consent_request(self, request):
         c = Client(**self.data)
         accept_config = {
@@ -150,9 +175,9 @@ class ClientTestCase(unittest.TestCase):
             'PUT',
             'http://localhost:4445/oauth2/auth/requests/consent/accept',
             params={'consent_challenge': self.challenge},
-            json=accept_config)
+            json=accept_config, timeout=TIMEOUT)
 
-    @patch('requests.request')
+    @patch('requests.Session.request')
     def test_can_reject_login_request(self, request):
         c = Client(**self.data)
         reject_config = {
@@ -167,9 +192,9 @@ class ClientTestCase(unittest.TestCase):
             'PUT',
             'http://localhost:4445/oauth2/auth/requests/login/reject',
             params={'login_challenge': self.challenge},
-            json=reject_config)
+            json=reject_config, timeout=TIMEOUT)
 
-    @patch('requests.request')
+    @patch('requests.Session.request')
     def test_can_reject_consent_request(self, request):
         c = Client(**self.data)
         reject_config = {
@@ -184,9 +209,9 @@ class ClientTestCase(unittest.TestCase):
             'PUT',
             'http://localhost:4445/oauth2/auth/requests/consent/reject',
             params={'consent_challenge': self.challenge},
-            json=reject_config)
+            json=reject_config, timeout=TIMEOUT)
 
-    @patch('requests.request')
+    @patch('requests.Session.request')
     def test_can_revokes_all_previous_consent_session_user(self, request):
         c = Client(**self.data)
         user = 'user'
@@ -194,10 +219,10 @@ class ClientTestCase(unittest.TestCase):
         request.assert_called_once_with(
             'DELETE',
             'http://localhost:4445/oauth2/auth/sessions/consent',
-            params={'subject': user}
+            params={'subject': user}, timeout=TIMEOUT
         )
 
-    @patch('requests.request')
+    @patch('requests.Session.request')
     def test_can_revoke_consent_sessions_oAuth2_client(self, request):
         c = Client(**self.data)
         user = 'user'
@@ -206,9 +231,9 @@ class ClientTestCase(unittest.TestCase):
         request.assert_called_with(
             'DELETE',
             'http://localhost:4445/oauth2/auth/sessions/consent',
-            params={'subject': user, 'client': client})
+            params={'subject': user, 'client': client}, timeout=TIMEOUT)
 
-    @patch('requests.request')
+    @patch('requests.Session.request')
     def test_can_lists_all_consent_sessions_user(self, request):
         c = Client(**self.data)
         user = 'user'
@@ -216,12 +241,158 @@ class ClientTestCase(unittest.TestCase):
         request.assert_called_once_with(
             'GET',
             'http://localhost:4445/oauth2/auth/sessions/consent',
-            params={'subject': user})
+            params={'subject': user}, timeout=TIMEOUT)
 
-    @patch('requests.request')
+    @patch('requests.Session.request')
     def test_can_logs_user_out_deleting_session_cookie(self, request):
         c = Client(**self.data)
         c.logs_user_out_deleting_session_cookie()
         request.assert_called_once_with(
             'GET',
-            'http://localhost:4445/oauth2/auth/sessions/login/revoke')
+            'http://localhost:4445/oauth2/auth/sessions/login/revoke',
+            timeout=TIMEOUT)
+
+
+class ClientSessionTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.client = Client(
+            'http://localhost:4444', 'http://localhost:4445',
+            'client', 'secret', pool_maxsize=4)
+        self.transport = self.client.transport
+        self.addCleanup(self.client.close)
+
+    @patch('requests.Session.request')
+    def test_reuses_session_per_host(self, request):
+        self.client.request('GET', '/clients')
+        self.client.request('GET', '/clients')
+        self.client.request('POST', '/oauth2/revoke', token=True)
+        self.assertEqual(len(self.transport._sessions), 2)
+        self.assertIs(
+            self.transport.session('http://localhost:4445'),
+            self.transport._sessions['http://localhost:4445'])
+
+    def test_session_adapter_uses_pool_settings(self):
+        session = self.transport.session('http://localhost:4445')
+        adapter = session.get_adapter('http://localhost:4445')
+        self.assertEqual(adapter._pool_maxsize, 4)
+
+    def test_session_without_keep_alive(self):
+        client = Client('http://localhost:4444', 'http://localhost:4445',
+                        'client', 'secret', keep_alive=False)
+        session = client.transport.session('http://localhost:4445')
+        self.assertEqual(session.headers['Connection'], 'close')
+
+    def test_close_releases_sessions(self):
+        with patch('requests.Session.close') as close:
+            with self.client as client:
+                client.transport.session('http://localhost:4444')
+                client.transport.session('http://localhost:4445')
+            self.assertEqual(close.call_count, 2)
+        self.assertEqual(self.transport._sessions, {})
+
+
+class ClientCredentialsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.client = Client(
+            'http://localhost:4444', 'http://localhost:4445',
+            'client', 'secret', token_refresh_margin=5)
+        self.token_response = {
+            'scope': 'devices products',
+            'expires_in': 3600,
+            'access_token': 'super-token',
+            'token_type': 'bearer'
+        }
+
+    @patch('requests.Session.request')
+    def test_can_get_access_token(self, request):
+        request.return_value.json.return_value = self.token_response
+        token = self.client.get_access_token(['products', 'devices'])
+        self.assertEqual(token.token, 'super-token')
+        request.assert_called_once_with(
+            'POST', 'http://localhost:4444/oauth2/token',
+            data={'grant_type': 'client_credentials',
+                  'scope': 'devices products'},
+            auth=('client', 'secret'), timeout=TIMEOUT)
+
+    @patch('requests.Session.request')
+    def test_access_token_is_cached_per_scope_set(self, request):
+        request.return_value.json.return_value = self.token_response
+        token = self.client.get_access_token(['devices', 'products'])
+        self.assertIs(
+            self.client.get_access_token('products devices'), token)
+        self.client.get_access_token(['devices'])
+        self.assertEqual(request.call_count, 2)
+
+    @patch('requests.Session.request')
+    def test_expired_access_token_is_fetched_again(self, request):
+        self.token_response['expires_in'] = 0
+        request.return_value.json.return_value = self.token_response
+        self.client.get_access_token()
+        self.client.get_access_token()
+        self.assertEqual(request.call_count, 2)
+
+    @patch('time.monotonic')
+    @patch('requests.Session.request')
+    def test_access_token_is_refreshed_before_expiry(self, request,
+                                                     monotonic):
+        monotonic.return_value = 0
+        self.token_response['expires_in'] = 8
+        request.return_value.json.return_value = self.token_response
+        token = self.client.get_access_token()
+        self.assertIs(self.client.get_access_token(), token)
+        self.assertEqual(request.call_count, 1)
+        monotonic.return_value = 4
+        self.token_response = dict(self.token_response, expires_in=3600,
+                                   access_token='new-token')
+        request.return_value.json.return_value = self.token_response
+        self.assertIs(self.client.get_access_token(), token)
+        for _ in range(100):
+            if self.client._tokens[frozenset()] is not token:
+                break
+            time.sleep(0.01)
+        self.assertEqual(self.client.get_access_token().token, 'new-token')
+
+    @patch('time.monotonic')
+    @patch('requests.Session.request')
+    def test_short_lived_token_is_not_refreshed_on_every_call(
+            self, request, monotonic):
+        monotonic.return_value = 0
+        self.token_response['expires_in'] = 4
+        request.return_value.json.return_value = self.token_response
+        for _ in range(100):
+            self.client.get_access_token()
+        self.assertEqual(request.call_count, 1)
+        # past half its life the token is refreshed once
+        monotonic.return_value = 2
+        for _ in range(100):
+            self.client.get_access_token()
+        for _ in range(100):
+            if not self.client._token_flight.pending(frozenset()):
+                break
+            time.sleep(0.01)
+        self.assertEqual(request.call_count, 2)
+
+    @patch('requests.Session.request')
+    def test_concurrent_callers_share_one_fetch(self, request):
+        release = threading.Event()
+
+        def slow_request(*args, **kwargs):
+            release.wait(1)
+            return Mock(ok=True, json=Mock(return_value=self.token_response))
+
+        request.side_effect = slow_request
+        tokens = []
+        threads = [
+            threading.Thread(
+                target=lambda: tokens.append(self.client.get_access_token()))
+            for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(request.call_count, 1)
+        self.assertEqual(len({id(token) for token in tokens}), 1)
@@ -0,0 +1,81 @@
+# Copyright (C) 2017 O.S. Systems Software LTDA.
+# This software is released under the MIT License
+
+import unittest
+from unittest.mock import Mock, call, patch
+
+from hydra import Hydra
+from hydra.exceptions import HydraResponseError
+
+TIMEOUT = (5, 30)
+
+
+def page(ids, links=None):
+    data = [{'client_id': client_id} for client_id in ids]
+    return Mock(ok=True, json=Mock(return_value=data), links=links or {})
+
+
+class IterAllTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.hydra = Hydra('http://localhost:4444', 'http://localhost:4445',
+                           'client', 'secret')
+        patcher = patch('requests.Session.request')
+        self.request = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_follows_limit_and_offset(self):
+        self.request.side_effect = [page(['a', 'b']), page(['c'])]
+        clients = [c.id for c in self.hydra.clients.iter_all(page_size=2)]
+        self.assertEqual(clients, ['a', 'b', 'c'])
+        self.assertEqual(self.request.call_args_list, [
+            call('GET', 'http://localhost:4445/clients',
+                 params={'limit': 2, 'offset': 0}, timeout=TIMEOUT),
+            call('GET', 'http://localhost:4445/clients',
+                 params={'limit': 2, 'offset': 2}, timeout=TIMEOUT),
+        ])
+
+    def test_stops_on_empty_page(self):
+        self.request.side_effect = [page(['a', 'b']), page([])]
+        clients = list(self.hydra.clients.iter_all(page_size=2))
+        self.assertEqual(len(clients), 2)
+        self.assertEqual(self.request.call_count, 2)
+
+    def test_follows_link_header(self):
+        next_link = {'url': '/clients?limit=2&offset=2', 'rel': 'next'}
+        self.request.side_effect = [
+            page(['a', 'b'], {'next': next_link}),
+            page(['c', 'd'], {'first': {'url': '/clients'}}),
+        ]
+        clients = [c.id for c in self.hydra.clients.iter_all(page_size=2)]
+        self.assertEqual(clients, ['a', 'b', 'c', 'd'])
+        self.request.assert_called_with(
+            'GET', 'http://localhost:4445/clients',
+            params={'limit': '2', 'offset': '2'}, timeout=TIMEOUT)
+
+    def test_is_lazy(self):
+        self.request.side_effect = [page(['a', 'b']), page(['c'])]
+        clients = self.hydra.clients.iter_all(page_size=2)
+        self.assertEqual(self.request.call_count, 0)
+        next(clients)
+        self.assertEqual(self.request.call_count, 1)
+
+    def test_prefetches_next_page(self):
+        self.request.side_effect = [page(['a', 'b']), page(['c'])]
+        clients = self.hydra.clients.iter_all(page_size=2, prefetch=True)
+        self.assertEqual([c.id for c in clients], ['a', 'b', 'c'])
+        self.assertEqual(self.request.call_count, 2)
+
+    def test_failed_page_raises(self):
+        self.request.side_effect = [page(['a', 'b']), Mock(ok=False)]
+        clients = self.hydra.clients.iter_all(page_size=2)
+        self.assertEqual(next(clients).id, 'a')
+        self.assertEqual(next(clients).id, 'b')
+        with self.assertRaises(HydraResponseError):
+            next(clients)
+
+    def test_failed_prefetched_page_raises(self):
+        self.request.side_effect = [page(['a', 'b']), Mock(ok=False)]
+        clients = self.hydra.clients.iter_all(page_size=2, prefetch=True)
+        with self.assertRaises(HydraResponseError):
+            list(clients)
@@ -0,0 +1,166 @@
+# Copyright (C) 2017 O.S. Systems Software LTDA.
+# This software is released under the MIT License
+
+import unittest
+from unittest.mock import Mock, patch
+
+import requests
+
+from hydra import Hydra
+from hydra.exceptions import (
+    CircuitOpenError, DeadlineExceededError, HydraRequestError,
+    HydraResponseError)
+from hydra.oauth2 import Token
+from hydra.resilience import CircuitBreaker, CircuitBreakers, RetryPolicy
+
+
+class RetryTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.hydra = Hydra('http://localhost:4444', 'http://localhost:4445',
+                           'client', 'secret',
+                           retry=RetryPolicy(retries=2, backoff=0))
+        patcher = patch('requests.Session.request')
+        self.request = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_passes_timeout(self):
+        self.hydra.clients.get('abc')
+        self.assertEqual(self.request.call_args[1]['timeout'], (5, 30))
+
+    def test_retries_idempotent_calls_on_transient_errors(self):
+        self.request.side_effect = [
+            requests.ConnectionError(), Mock(status_code=503),
+            Mock(status_code=200, ok=True,
+                 json=Mock(return_value={'client_id': 'abc'}))]
+        self.assertEqual(self.hydra.clients.get('abc').id, 'abc')
+        self.assertEqual(self.request.call_count, 3)
+
+    def test_retries_introspection(self):
+        self.request.side_effect = [
+            Mock(status_code=502),
+            Mock(status_code=200, json=Mock(return_value={'active': True}))]
+        result = self.hydra.instrospect_token(Token(access_token='t'))
+        self.assertEqual(result, {'active': True})
+
+    def test_does_not_retry_non_idempotent_calls(self):
+        self.request.side_effect = requests.ConnectionError()
+        with self.assertRaises(HydraRequestError):
+            self.hydra.request('POST', '/clients', json={})
+        self.assertEqual(self.request.call_count, 1)
+
+    def test_raises_response_error_when_retries_are_exhausted(self):
+        self.request.return_value = Mock(status_code=503)
+        with self.assertRaises(HydraResponseError) as context:
+            self.hydra.clients.get('abc')
+        self.assertEqual(context.exception.response.status_code, 503)
+        self.assertEqual(self.request.call_count, 3)
+
+    def test_client_errors_are_returned(self):
+        self.request.return_value = Mock(status_code=404, ok=False)
+        self.assertIsNone(self.hydra.clients.get('abc'))
+        self.assertEqual(self.request.call_count, 1)
+
+    @patch('time.monotonic')
+    def test_deadline_bounds_timeout(self, monotonic):
+        monotonic.return_value = 100.0
+        self.hydra.request('GET', '/clients', deadline=2)
+        self.assertEqual(self.request.call_args[1]['timeout'], (2, 2))
+
+    @patch('random.uniform', lambda low, high: high)
+    def test_deadline_stops_retries(self):
+        self.hydra.retry = RetryPolicy(retries=5, backoff=10)
+        self.request.return_value = Mock(status_code=503)
+        with self.assertRaises(DeadlineExceededError):
+            self.hydra.request('GET', '/clients', deadline=0.5)
+        self.assertEqual(self.request.call_count, 1)
+
+
+class CircuitBreakerTestCase(unittest.TestCase):
+
+    @patch('time.monotonic')
+    def test_opens_and_recovers(self, monotonic):
+        monotonic.return_value = 0
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow())
+        monotonic.return_value = 10
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    @patch('time.monotonic')
+    def test_failed_trial_reopens(self, monotonic):
+        monotonic.return_value = 0
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+        breaker.record_failure()
+        monotonic.return_value = 10
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+
+    @patch('requests.Session.request')
+    def test_client_fails_fast_when_open(self, request):
+        request.side_effect = requests.ConnectionError()
+        hydra = Hydra('http://localhost:4444', 'http://localhost:4445',
+                      'client', 'secret', retry=None,
+                      circuit_breakers=CircuitBreakers(failure_threshold=2))
+        for _ in range(2):
+            with self.assertRaises(HydraRequestError):
+                hydra.clients.get('abc')
+        with self.assertRaises(CircuitOpenError):
+            hydra.clients.get('abc')
+        self.assertEqual(request.call_count, 2)
+        # the public host has its own breaker
+        request.side_effect = None
+        hydra.revoke_token(Token(access_token='t'))
+
+    @patch('time.monotonic')
+    @patch('requests.Session.request')
+    def test_unexpected_error_settles_trial(self, request, monotonic):
+        monotonic.return_value = 0
+        request.side_effect = requests.ConnectionError()
+        hydra = Hydra('http://localhost:4444', 'http://localhost:4445',
+                      'client', 'secret', retry=None,
+                      circuit_breakers=CircuitBreakers(
+                          failure_threshold=1, reset_timeout=10))
+        breaker = hydra.circuit_breakers.get('http://localhost:4445')
+        with self.assertRaises(HydraRequestError):
+            hydra.clients.get('abc')
+        monotonic.return_value = 10
+        request.side_effect = requests.exceptions.ChunkedEncodingError()
+        with self.assertRaises(requests.exceptions.ChunkedEncodingError):
+            hydra.clients.get('abc')
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        monotonic.return_value = 20
+        request.side_effect = None
+        request.return_value = Mock(status_code=404, ok=False)
+        self.assertIsNone(hydra.clients.get('abc'))
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    @patch('time.monotonic')
+    @patch('requests.Session.request')
+    def test_expired_deadline_does_not_take_trial(self, request, monotonic):
+        monotonic.return_value = 0
+        request.side_effect = requests.ConnectionError()
+        hydra = Hydra('http://localhost:4444', 'http://localhost:4445',
+                      'client', 'secret', retry=None,
+                      circuit_breakers=CircuitBreakers(
+                          failure_threshold=1, reset_timeout=10))
+        breaker = hydra.circuit_breakers.get('http://localhost:4445')
+        with self.assertRaises(HydraRequestError):
+            hydra.clients.get('abc')
+        monotonic.side_effect = [10, 11]
+        with self.assertRaises(DeadlineExceededError):
+            hydra.request('GET', '/clients', deadline=1)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        monotonic.side_effect = None
+        monotonic.return_value = 10
+        request.side_effect = None
+        request.return_value = Mock(status_code=200, ok=True)
+        hydra.request('GET', '/clients')
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
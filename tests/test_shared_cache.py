@@ -0,0 +1,146 @@
+# Copyright (C) 2017 O.S. Systems Software LTDA.
+# This software is released under the MIT License
+
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import stat
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from hydra import Hydra
+from hydra.fake import FakeHydra, FakeTransport
+from hydra.oauth2 import Token
+from hydra.shared_cache import SQLiteCache
+
+
+def _write(path):
+    SQLiteCache(path).set('key', {'from': 'child'})
+
+
+def _write_inherited(cache, queue):
+    queue.put(id(cache._connection()))
+    cache.set('key', {'from': 'forked child'})
+
+
+class SQLiteCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'hydra.sqlite')
+        self.cache = SQLiteCache(self.path)
+        self.addCleanup(self.cache.close)
+
+    def test_set_and_get(self):
+        self.assertIsNone(self.cache.get('key'))
+        self.cache.set('key', {'a': 1})
+        self.assertEqual(self.cache.get('key'), {'a': 1})
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_file_is_private(self):
+        mode = stat.S_IMODE(os.stat(self.path).st_mode)
+        self.assertEqual(mode & 0o077, 0)
+
+    def test_entries_expire(self):
+        self.cache.set('key', 1, ttl=10)
+        with patch('time.time', return_value=time.time() + 11):
+            self.assertIsNone(self.cache.get('key'))
+            self.cache.purge()
+        count, = self.cache._connection().execute(
+            'SELECT COUNT(*) FROM entries').fetchone()
+        self.assertEqual(count, 0)
+
+    def test_is_shared_between_processes(self):
+        process = multiprocessing.Process(target=_write, args=(self.path,))
+        process.start()
+        process.join()
+        self.assertEqual(self.cache.get('key'), {'from': 'child'})
+
+    def test_expired_entries_are_purged_while_writing(self):
+        cache = SQLiteCache(self.path, purge_every=3)
+        self.addCleanup(cache.close)
+        cache.set('old', 1, ttl=10)
+        with patch('time.time', return_value=time.time() + 11):
+            cache.set('a', 1)
+            cache.set('b', 1)
+        keys = [key for key, in cache._connection().execute(
+            'SELECT key FROM entries')]
+        self.assertEqual(sorted(keys), ['a', 'b'])
+
+    def test_database_errors_are_misses(self):
+        self.cache.set('key', 1)
+        locked = sqlite3.OperationalError('database is locked')
+        with patch.object(self.cache, '_connection', side_effect=locked):
+            with self.assertLogs('hydra.shared_cache', 'WARNING'):
+                self.assertIsNone(self.cache.get('key'))
+                self.cache.set('key', 2)
+                self.cache.delete('key')
+        self.assertEqual(self.cache.get('key'), 1)
+
+    def test_setup_connection_is_not_kept(self):
+        cache = SQLiteCache(self.path)
+        self.assertIsNone(getattr(cache._local, 'connection', None))
+
+    def test_reconnects_after_fork(self):
+        connection = self.cache._connection()
+        with patch('os.getpid', return_value=os.getpid() + 1):
+            self.assertIsNot(self.cache._connection(), connection)
+            self.cache.set('key', 1)
+        self.assertEqual(self.cache.get('key'), 1)
+
+    @unittest.skipUnless(
+        'fork' in multiprocessing.get_all_start_methods(),
+        'fork is not available')
+    def test_forked_child_opens_its_own_connection(self):
+        parent = self.cache._connection()
+        context = multiprocessing.get_context('fork')
+        queue = context.Queue()
+        process = context.Process(
+            target=_write_inherited, args=(self.cache, queue))
+        process.start()
+        process.join()
+        self.assertNotEqual(queue.get(timeout=5), id(parent))
+        self.assertEqual(self.cache.get('key'), {'from': 'forked child'})
+
+
+class ClientSharedCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'hydra.sqlite')
+        self.fake = FakeHydra()
+        self.fake.add_client('client', 'secret', scope='devices')
+
+    def worker(self):
+        # Each Hydra instance stands in for one worker process
+        return Hydra('http://hydra', 'http://hydra', 'client', 'secret',
+                     transport=FakeTransport(self.fake),
+                     shared_cache=SQLiteCache(self.path))
+
+    def test_access_tokens_are_shared(self):
+        token = self.worker().get_access_token(['devices'])
+        calls = self.fake.calls
+        other = self.worker().get_access_token(['devices'])
+        self.assertEqual(other.token, token.token)
+        self.assertGreater(other.expires_in, 3500)
+        self.assertEqual(self.fake.calls, calls)
+
+    def test_introspection_results_are_shared(self):
+        token = Token(access_token=self.fake.issue_token())
+        self.assertTrue(self.worker().instrospect_token(token)['active'])
+        calls = self.fake.calls
+        self.assertTrue(self.worker().instrospect_token(token)['active'])
+        self.assertEqual(self.fake.calls, calls)
+
+    def test_revoke_evicts_shared_introspection(self):
+        token = Token(access_token=self.fake.issue_token())
+        first, second = self.worker(), self.worker()
+        first.instrospect_token(token)
+        second.revoke_token(token)
+        self.assertFalse(first.instrospect_token(token)['active'])
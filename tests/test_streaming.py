@@ -0,0 +1,83 @@
+# Copyright (C) 2017 O.S. Systems Software LTDA.
+# This software is released under the MIT License
+
+import json
+import types
+import unittest
+from unittest.mock import Mock
+
+from hydra import Hydra
+from hydra.fake import FakeHydra, FakeHydraServer, FakeTransport
+from hydra.streaming import iter_json_array, iter_response_array
+
+
+def chunked(data, size):
+    raw = json.dumps(data, ensure_ascii=False).encode()
+    return [raw[start:start + size] for start in range(0, len(raw), size)]
+
+
+class IterJsonArrayTestCase(unittest.TestCase):
+
+    def test_decodes_across_chunk_boundaries(self):
+        data = [{'client_id': 'é', 'scope': 'a ]b'}, 12345, -2.5e3, [],
+                None, True, 'x,y']
+        for size in (1, 2, 3, 7, 64):
+            self.assertEqual(list(iter_json_array(chunked(data, size))), data)
+
+    def test_empty_array(self):
+        self.assertEqual(list(iter_json_array([b' [ ', b' ] '])), [])
+
+    def test_yields_before_the_body_ends(self):
+        def chunks():
+            yield b'[{"a": 1}, '
+            raise AssertionError('read past the first element')
+
+        self.assertEqual(next(iter_json_array(chunks())), {'a': 1})
+
+    def test_rejects_malformed_input(self):
+        for raw in (b'{}', b'[1, 2', b'[1 2]', b''):
+            with self.assertRaises(ValueError):
+                list(iter_json_array([raw]))
+
+    def test_closes_response(self):
+        response = Mock(iter_content=Mock(return_value=[b'[1]']))
+        self.assertEqual(list(iter_response_array(response)), [1])
+        response.close.assert_called_once_with()
+
+
+class StreamingClientTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.fake = FakeHydra()
+        for index in range(50):
+            self.fake.add_client('client-{}'.format(index))
+        self.fake.add_consent_request('c', 'alice')
+        self.fake.consent_sessions['alice'].append(
+            {'consent_request': self.fake.consent_requests['c']})
+
+    def test_all_and_consent_sessions(self):
+        hydra = Hydra('http://hydra', 'http://hydra', 'client', 'secret',
+                      transport=FakeTransport(self.fake))
+        clients = hydra.clients.all(stream=True)
+        self.assertIsInstance(clients, types.GeneratorType)
+        self.assertEqual([client.id for client in clients],
+                         [client.id for client in hydra.clients.all()])
+        sessions = list(hydra.lists_all_consent_sessions_user(
+            'alice', stream=True))
+        self.assertEqual(sessions,
+                         hydra.lists_all_consent_sessions_user('alice'))
+
+    def test_all_streams_every_page(self):
+        hydra = Hydra('http://hydra', 'http://hydra', 'client', 'secret',
+                      transport=FakeTransport(self.fake))
+        clients = hydra.clients.iter_all(page_size=20, stream=True)
+        self.assertEqual(len(list(clients)), 50)
+        for index in range(50, 150):
+            self.fake.add_client('client-{}'.format(index))
+        self.assertEqual(len(list(hydra.clients.all(stream=True))), 150)
+
+    def test_streams_over_http(self):
+        with FakeHydraServer(self.fake) as server:
+            with Hydra(server.url, server.url, 'client', 'secret') as hydra:
+                ids = [client.id for client in hydra.clients.all(stream=True)]
+        self.assertEqual(len(ids), 50)
@@ -0,0 +1,105 @@
+# Copyright (C) 2017 O.S. Systems Software LTDA.
+# This software is released under the MIT License
+
+import unittest
+from unittest.mock import Mock, patch
+
+from hydra import Client, Hydra
+from hydra.exceptions import HydraResponseError
+
+
+class SyncTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.hydra = Hydra('http://localhost:4444', 'http://localhost:4445',
+                           'client', 'secret')
+        self.existing = [
+            {'client_id': 'same', 'client_name': 'same',
+             'scope': 'b a', 'redirect_uris': ['y', 'x']},
+            {'client_id': 'changed', 'client_name': 'old'},
+            {'client_id': 'stale', 'client_name': 'stale'},
+        ]
+        patcher = patch('requests.Session.request', side_effect=self.serve)
+        self.request = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def serve(self, method, url, json=None, params=None, **kwargs):
+        if method == 'GET':
+            offset = params['offset']
+            data = self.existing[offset:offset + params['limit']]
+            return Mock(ok=True, json=Mock(return_value=data), links={})
+        return Mock(ok=True, json=Mock(return_value=json))
+
+    def desired(self):
+        return [
+            Client(client_id='same', name='same', secret='s',
+                   scopes=['a', 'b'], redirect_uris=['x', 'y']),
+            Client(client_id='changed', name='new'),
+            Client(client_id='new', name='new'),
+        ]
+
+    def test_plan_only_contains_changes(self):
+        plan = self.hydra.clients.plan_sync(self.desired(), delete=True)
+        self.assertEqual([c.id for c in plan.create], ['new'])
+        self.assertEqual([c.id for c in plan.update], ['changed'])
+        self.assertEqual(plan.delete, ['stale'])
+        self.assertEqual([c.id for c in plan.unchanged], ['same'])
+        self.assertEqual(str(plan), '+ new\n~ changed\n- stale')
+
+    def test_dry_run_does_not_write(self):
+        result = self.hydra.clients.sync(self.desired(), dry_run=True)
+        self.assertEqual(result.plan.delete, [])
+        self.assertEqual(self.request.call_count, 1)
+
+    def test_sync_issues_only_needed_writes(self):
+        result = self.hydra.clients.sync(self.desired(), delete=True)
+        methods = sorted(
+            (c[0][0], c[0][1]) for c in self.request.call_args_list[1:])
+        self.assertEqual(methods, [
+            ('DELETE', 'http://localhost:4445/clients/stale'),
+            ('POST', 'http://localhost:4445/clients'),
+            ('PUT', 'http://localhost:4445/clients/changed'),
+        ])
+        self.assertTrue(all(r.ok for r in result.created + result.updated +
+                            result.deleted))
+
+    def test_ignores_server_defaults(self):
+        self.existing = [{
+            'client_id': 'x', 'client_name': 'x',
+            'grant_types': ['client_credentials'], 'response_types': ['code'],
+            'token_endpoint_auth_method': 'client_secret_basic',
+            'subject_type': 'public', 'client_secret_expires_at': 0,
+            'userinfo_signed_response_alg': 'none'}]
+        plan = self.hydra.clients.plan_sync([Client(client_id='x', name='x')])
+        self.assertEqual([c.id for c in plan.unchanged], ['x'])
+        self.assertEqual(plan.update, [])
+
+    def test_clearing_a_field_is_an_update(self):
+        self.existing = [
+            {'client_id': 'x', 'client_name': 'x', 'redirect_uris': ['a']},
+            {'client_id': 'y', 'client_name': 'y', 'contacts': ['b']}]
+        plan = self.hydra.clients.plan_sync([
+            Client(client_id='x', name='x', redirect_uris=[]),
+            Client(client_id='y', name='y')])
+        self.assertEqual([c.id for c in plan.update], ['x', 'y'])
+
+    def test_rejects_duplicate_ids(self):
+        with self.assertRaises(ValueError):
+            self.hydra.clients.plan_sync([
+                Client(client_id='x', name='a'),
+                Client(client_id='x', name='b')])
+
+    def test_pages_through_every_client(self):
+        self.existing = [{'client_id': str(index)} for index in range(3)]
+        plan = self.hydra.clients.plan_sync([], delete=True, page_size=2)
+        self.assertEqual(plan.delete, ['0', '1', '2'])
+
+    def test_requires_client_ids(self):
+        with self.assertRaises(ValueError):
+            self.hydra.clients.sync([Client(name='no-id')])
+
+    def test_fails_when_listing_fails(self):
+        self.request.side_effect = None
+        self.request.return_value = Mock(ok=False)
+        with self.assertRaises(HydraResponseError):
+            self.hydra.clients.sync(self.desired(), delete=True)
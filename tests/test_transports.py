@@ -0,0 +1,150 @@
+# Copyright (C) 2017 O.S. Systems Software LTDA.
+# This software is released under the MIT License
+
+import unittest
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+try:
+    import h2
+except ImportError:  # pragma: no cover
+    h2 = None
+
+from hydra import Client, Hydra
+from hydra.exceptions import HydraRequestError
+from hydra.fake import FakeHydra, FakeHydraServer, FakeTransport
+from hydra.oauth2 import Token
+from hydra.transports import (
+    HttpxTransport, RequestsTransport, Urllib3Transport, parse_links)
+
+
+class TransportScenarios:
+
+    def make_transport(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.fake = FakeHydra()
+        self.fake.add_client('client', 'secret', scope='hydra.clients')
+        self.hydra = self.make_hydra()
+        self.addCleanup(self.hydra.close)
+
+    def make_hydra(self):
+        return Hydra('http://localhost:4444', 'http://localhost:4445',
+                     'client', 'secret', transport=self.make_transport())
+
+    def test_client_crud(self):
+        client = self.hydra.clients.create(Client(
+            name='new-client', secret='client-secret',
+            scopes=['devices', 'products'],
+            redirect_uris=['http://localhost/callback']))
+        self.assertEqual(client.secret, 'client-secret')
+        self.assertEqual(self.hydra.clients.get(client.id).name, 'new-client')
+        client.name = 'renamed'
+        self.assertEqual(self.hydra.clients.update(client).name, 'renamed')
+        self.assertIn(client.id, [c.id for c in self.hydra.clients.all()])
+        self.assertTrue(self.hydra.clients.delete(client.id))
+        self.assertIsNone(self.hydra.clients.get(client.id))
+
+    def test_paginates_clients(self):
+        for index in range(5):
+            self.fake.add_client('c{}'.format(index))
+        clients = list(self.hydra.clients.iter_all(page_size=2))
+        self.assertEqual(len(clients), 6)
+
+    def test_token_introspection_and_revocation(self):
+        token = self.hydra.get_access_token(['hydra.clients'])
+        result = self.hydra.instrospect_token(token)
+        self.assertTrue(result['active'])
+        self.assertEqual(result['client_id'], 'client')
+        self.assertTrue(self.hydra.revoke_token(token))
+        self.assertFalse(self.hydra.instrospect_token(token)['active'])
+
+    def test_login_and_consent(self):
+        self.fake.add_login_request('login', skip=False)
+        self.assertFalse(self.hydra.get_login_request('login')['skip'])
+        accepted = self.hydra.accept_login_request('login', {'subject': 'u'})
+        self.assertIn('login_verifier', accepted['redirect_to'])
+        self.fake.add_consent_request('consent', 'u',
+                                      requested_scope=['devices'])
+        self.hydra.accept_consent_request(
+            'consent', {'grant_scope': ['devices']})
+        sessions = self.hydra.lists_all_consent_sessions_user('u')
+        self.assertEqual(sessions[0]['grant_scope'], ['devices'])
+        self.assertTrue(
+            self.hydra.revokes_all_previous_consent_session_user('u'))
+        self.assertEqual(self.hydra.lists_all_consent_sessions_user('u'), [])
+        self.assertIsNone(self.hydra.get_consent_request('missing'))
+
+
+class FakeTransportTestCase(TransportScenarios, unittest.TestCase):
+
+    def make_transport(self):
+        return FakeTransport(self.fake)
+
+
+class HTTPTransportScenarios(TransportScenarios):
+
+    def make_hydra(self):
+        server = FakeHydraServer(self.fake).start()
+        self.addCleanup(server.stop)
+        return Hydra(server.url, server.url, 'client', 'secret',
+                     transport=self.make_transport())
+
+    def test_connection_errors_are_retryable(self):
+        hydra = Hydra('http://127.0.0.1:9', 'http://127.0.0.1:9',
+                      'client', 'secret', retry=None,
+                      transport=self.make_transport())
+        self.addCleanup(hydra.close)
+        with self.assertRaises(HydraRequestError):
+            hydra.instrospect_token(Token(access_token='t'))
+
+
+class RequestsTransportTestCase(HTTPTransportScenarios, unittest.TestCase):
+
+    def make_transport(self):
+        return RequestsTransport()
+
+
+class Urllib3TransportTestCase(HTTPTransportScenarios, unittest.TestCase):
+
+    def make_transport(self):
+        return Urllib3Transport()
+
+
+@unittest.skipIf(httpx is None, 'httpx is not installed')
+class HttpxTransportTestCase(HTTPTransportScenarios, unittest.TestCase):
+
+    def make_transport(self):
+        return HttpxTransport()
+
+
+@unittest.skipIf(httpx is None or h2 is None, 'httpx[http2] is not installed')
+class HttpxHTTP2TransportTestCase(HTTPTransportScenarios, unittest.TestCase):
+
+    # The stand-in server only speaks HTTP/1.1, so this covers an
+    # HTTP/2-enabled client falling back to it
+    def make_transport(self):
+        return HttpxTransport(http2=True)
+
+
+@unittest.skipIf(httpx is None, 'httpx is not installed')
+class HttpxTransportOptionsTestCase(unittest.TestCase):
+
+    @unittest.skipIf(h2 is not None, 'h2 is installed')
+    def test_http2_without_h2_fails_clearly(self):
+        with self.assertRaisesRegex(ImportError, 'hydra-sdk\\[http2\\]'):
+            HttpxTransport(http2=True)
+
+
+class ParseLinksTestCase(unittest.TestCase):
+
+    def test_parses_link_header(self):
+        links = parse_links(
+            '</clients?limit=2&offset=0>; rel="first", '
+            '</clients?limit=2&offset=2>; rel="next"')
+        self.assertEqual(links['next']['url'], '/clients?limit=2&offset=2')
+        self.assertEqual(links['first']['rel'], 'first')